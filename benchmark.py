@@ -0,0 +1,428 @@
+"""
+Micro-benchmarks for the analysis hot paths
+
+Compares the vectorized implementations in main.py against the pandas
+reference implementations they replaced, checks that both agree, and
+measures the response encodings, chart downsampling, bar resampling and
+how the efficient frontier solver scales with the number of assets.
+
+Usage:
+    python benchmark.py [--repeat N]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from scipy.optimize import minimize
+
+from main import BarResampler, ColumnarFormat, Downsampler, IndicatorEngine, IndicatorState, NumpyJSONResponse, analyzer
+from portfolio import (CovarianceEstimator, FactorCovariance, MarkowitzPortfolio, frontier_workers, get_frontier_pool,
+                       shutdown_frontier_pool)
+
+
+def synthetic_bars(days: int, seed: int = 7) -> pd.DataFrame:
+    """Random-walk daily OHLCV bars on business days"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    close = 150 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    open_ = close * rng.uniform(0.98, 1.02, days)
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * rng.uniform(1.0, 1.03, days),
+        'Low': np.minimum(open_, close) * rng.uniform(0.97, 1.0, days),
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 10_000_000, days).astype(np.float64)
+    }, index=index)
+
+
+def legacy_indicator_frame(hist: pd.DataFrame) -> pd.DataFrame:
+    """The original pandas rolling/ewm indicator chain of process_stock_data"""
+    hist = hist.copy()
+    hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
+    hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
+    hist['EMA_12'] = hist['Close'].ewm(span=12).mean()
+    hist['EMA_26'] = hist['Close'].ewm(span=26).mean()
+    delta = hist['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    hist['RSI'] = 100 - (100 / (1 + gain / loss))
+    hist['MACD'] = hist['EMA_12'] - hist['EMA_26']
+    hist['MACD_signal'] = hist['MACD'].ewm(span=9).mean()
+    hist['BB_upper'] = hist['SMA_20'] + (hist['Close'].rolling(window=20).std() * 2)
+    hist['BB_lower'] = hist['SMA_20'] - (hist['Close'].rolling(window=20).std() * 2)
+    hist['Volatility'] = hist['Close'].pct_change().rolling(window=20).std() * np.sqrt(252)
+    hist['Volume_SMA'] = hist['Volume'].rolling(window=20).mean()
+    hist['Price_Change'] = hist['Close'].pct_change()
+    hist['Volume_Change'] = hist['Volume'].pct_change()
+    hist['High_Low_Ratio'] = hist['High'] / hist['Low']
+    return hist
+
+
+def legacy_process_stock_data(hist: pd.DataFrame, symbol: str) -> dict:
+    """The original pandas implementation of process_stock_data"""
+    hist = legacy_indicator_frame(hist)
+    fills = {'RSI': 50, 'High_Low_Ratio': 1}
+    data = {
+        'symbol': symbol,
+        'dates': hist.index.strftime('%Y-%m-%d').tolist(),
+        'open': hist['Open'].fillna(0).tolist(),
+        'high': hist['High'].fillna(0).tolist(),
+        'low': hist['Low'].fillna(0).tolist(),
+        'close': hist['Close'].fillna(0).tolist(),
+        'volume': hist['Volume'].fillna(0).tolist(),
+    }
+    for name in ['SMA_20', 'SMA_50', 'EMA_12', 'EMA_26', 'RSI', 'MACD', 'MACD_signal', 'BB_upper', 'BB_lower',
+                 'Volatility', 'Volume_SMA', 'Price_Change', 'Volume_Change', 'High_Low_Ratio']:
+        data[name.lower()] = hist[name].fillna(fills.get(name, 0)).tolist()
+    data['current_price'] = hist['Close'].iloc[-1] if not hist.empty else 0
+    return data
+
+
+def max_relative_diff(expected: dict, actual: dict) -> float:
+    """Largest elementwise relative difference over the numeric series of two payloads"""
+    worst = 0.0
+    for key, values in expected.items():
+        if key in ('symbol', 'dates', 'current_price'):
+            continue
+        assert key in actual, f"missing {key}"
+        expected_values, actual_values = np.asarray(values), np.asarray(actual[key])
+        scale = np.maximum(np.abs(expected_values), 1.0)
+        worst = max(worst, float(np.max(np.abs(expected_values - actual_values) / scale)))
+    assert list(expected) == list(actual), "payload keys differ"
+    assert expected['dates'] == actual['dates']
+    return worst
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of repeat calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_indicators(repeat: int):
+    print("process_stock_data (legacy pandas chain vs IndicatorEngine, full /api/stock payload)")
+    print(f"{'days':>8} {'legacy ms':>12} {'engine ms':>12} {'speedup':>9} {'max rel diff':>14}")
+    for days in (252, 1260, 5040, 25200):
+        hist = synthetic_bars(days)
+        diff = max_relative_diff(legacy_process_stock_data(hist, 'BENCH'),
+                                 analyzer.process_stock_data(hist, 'BENCH'))
+        legacy_ms = timed(lambda: legacy_process_stock_data(hist, 'BENCH'), repeat)
+        engine_ms = timed(lambda: analyzer.process_stock_data(hist, 'BENCH'), repeat)
+        print(f"{days:>8} {legacy_ms:>12.2f} {engine_ms:>12.2f} {legacy_ms / engine_ms:>8.1f}x {diff:>14.2e}")
+
+    print()
+    print("Indicator computation only (no list conversion)")
+    print(f"{'days':>8} {'legacy ms':>12} {'engine ms':>12} {'speedup':>9}")
+    for days in (252, 1260, 5040, 25200):
+        hist = synthetic_bars(days)
+        arrays = [np.ascontiguousarray(hist[column].to_numpy()) for column in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        legacy_ms = timed(lambda: legacy_indicator_frame(hist), repeat)
+        engine_ms = timed(lambda: IndicatorEngine.compute(*arrays), repeat)
+        print(f"{days:>8} {legacy_ms:>12.2f} {engine_ms:>12.2f} {legacy_ms / engine_ms:>8.1f}x")
+
+
+def bench_incremental(repeat: int):
+    print("Appending one bar (full IndicatorEngine recompute vs IndicatorState.update)")
+    print(f"{'days':>8} {'recompute ms':>14} {'update us':>11} {'max rel diff':>14}")
+    for days in (252, 1260, 5040):
+        hist = synthetic_bars(days + 1)
+        arrays = [np.ascontiguousarray(hist[column].to_numpy()) for column in ('Open', 'High', 'Low', 'Close', 'Volume')]
+        state = IndicatorState.from_bars(hist.iloc[:-1])
+        bar = hist.iloc[-1]
+        expected = {name: values[-1] for name, values in IndicatorEngine.compute(*arrays).items()}
+        actual = state.copy().update(bar['Open'], bar['High'], bar['Low'], bar['Close'], bar['Volume'])
+        diff = max(abs(actual[name] - expected[name]) / max(abs(expected[name]), 1.0) for name in expected)
+        recompute_ms = timed(lambda: IndicatorEngine.compute(*arrays), repeat)
+        copies = [state.copy() for _ in range(repeat)]
+        update_us = timed(lambda: copies.pop().update(bar['Open'], bar['High'], bar['Low'], bar['Close'], bar['Volume']),
+                          repeat) * 1000
+        print(f"{days:>8} {recompute_ms:>14.3f} {update_us:>11.1f} {diff:>14.2e}")
+
+
+def bench_encodings(repeat: int):
+    print("/api/stock payload encodings (JSON lists vs packed columnar vs Arrow IPC)")
+    formats = ['json', 'packed'] + (['arrow'] if ColumnarFormat.arrow_available() else [])
+    print(f"{'days':>8} " + " ".join(f"{name + ' ms':>10} {name + ' KB':>10}" for name in formats))
+    for days in (252, 1260, 5040):
+        hist = synthetic_bars(days)
+        metadata = {'symbol': 'BENCH', 'current_price': float(hist['Close'].iloc[-1])}
+        encoders = {
+            'json': lambda: json.dumps(analyzer.process_stock_data(hist, 'BENCH')).encode('utf-8'),
+            'packed': lambda: ColumnarFormat.pack(analyzer.compute_stock_columns(hist), metadata),
+            'arrow': lambda: ColumnarFormat.to_arrow(analyzer.compute_stock_columns(hist), metadata)
+        }
+        cells = []
+        for name in formats:
+            size = len(encoders[name]()) / 1024
+            cells.append(f"{timed(encoders[name], repeat):>10.2f} {size:>10.1f}")
+        print(f"{days:>8} " + " ".join(cells))
+
+
+def bench_downsampling(repeat: int, max_points: int = 1000):
+    print(f"Chart series downsampled to max_points={max_points} (full payload vs LTTB and min/max selection)")
+    print(f"{'days':>8} {'full KB':>10} " + " ".join(f"{name + ' ms':>10} {name + ' KB':>10}"
+                                                  for name in Downsampler.METHODS))
+    for days in (1260, 5040, 25200, 100800):
+        hist = synthetic_bars(days)
+        columns = analyzer.compute_stock_columns(hist)
+        close = columns['close']
+        full = len(json.dumps(analyzer.stock_payload('BENCH', columns, float(close[-1]), None))) / 1024
+        cells = []
+        for method in Downsampler.METHODS:
+            reduce = lambda: Downsampler.take(columns, Downsampler.indices(close, max_points, method), len(close))
+            size = len(json.dumps(analyzer.stock_payload('BENCH', reduce(), float(close[-1]), None))) / 1024
+            cells.append(f"{timed(reduce, repeat):>10.2f} {size:>10.1f}")
+        print(f"{days:>8} {full:>10.1f} " + " ".join(cells))
+
+
+def synthetic_minute_bars(days: int, seed: int = 7) -> pd.DataFrame:
+    """Regular-session minute bars for days weekdays, indexed in UTC like provider responses"""
+    sessions = pd.bdate_range(end='2024-12-31', periods=days)
+    index = (sessions.repeat(390) + pd.to_timedelta(np.tile(np.arange(570, 960), days), unit='min'))
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(index))))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.0002, len(index))),
+        'high': close * 1.0005,
+        'low': close * 0.9995,
+        'close': close,
+        'volume': rng.integers(100, 10_000, len(index)).astype(float)
+    }, index=index.tz_localize('America/New_York').tz_convert('UTC'))
+
+
+def bench_resample(repeat: int):
+    print("A year of minute bars to 5m/1h/1d (pandas resample vs BarResampler fed 50,000-row pages)")
+    print(f"{'interval':>8} {'rows':>9} {'pandas ms':>10} {'chunked ms':>11} {'speedup':>9} {'max rel diff':>14}")
+    minutes = synthetic_minute_bars(252)
+    local = minutes.tz_convert('America/New_York')
+    aggregations = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    for interval, rule in (('5m', '5min'), ('1h', '60min'), ('1d', '1D')):
+        def legacy():
+            return local.resample(rule, offset=None if interval == '1d' else '30min').agg(aggregations).dropna()
+
+        def chunked():
+            return BarResampler.resample(minutes, interval, chunk_size=50_000)
+
+        expected, actual = legacy().to_numpy(), chunked().to_numpy()
+        diff = float(np.max(np.abs(expected - actual) / np.abs(expected))) if expected.shape == actual.shape else np.inf
+        legacy_ms, chunked_ms = timed(legacy, repeat), timed(chunked, repeat)
+        print(f"{interval:>8} {len(minutes):>9} {legacy_ms:>10.2f} {chunked_ms:>11.2f} "
+              f"{legacy_ms / chunked_ms:>8.1f}x {diff:>14.2e}")
+
+
+def bench_panel(repeat: int):
+    print("Screening indicators for N symbols (one IndicatorEngine pass per symbol vs one pass on a 2-D panel)")
+    print(f"{'symbols':>8} {'per-symbol ms':>14} {'panel ms':>10} {'speedup':>9} {'max rel diff':>14}")
+    names = ['rsi', 'sma_20', 'sma_50', 'macd_signal', 'volatility']
+    for count in (24, 500, 3000):
+        frames = [synthetic_bars(252, seed=seed) for seed in range(count)]
+        panels = {column: np.column_stack([frame[column].to_numpy() for frame in frames])
+                  for column in ('Open', 'High', 'Low', 'Close', 'Volume')}
+
+        def per_symbol():
+            return [IndicatorEngine.compute(*(panels[column][:, i] for column in panels), names=names)
+                    for i in range(count)]
+
+        def panel():
+            return IndicatorEngine.compute(*panels.values(), names=names)
+
+        single, combined = per_symbol(), panel()
+        diff = max(float(np.nanmax(np.abs(combined[name][:, i] - single[i][name]) /
+                                   np.maximum(np.abs(single[i][name]), 1.0)))
+                   for name in names for i in range(0, count, max(1, count // 20)))
+        per_symbol_ms = timed(per_symbol, max(1, repeat // 4))
+        panel_ms = timed(panel, repeat)
+        print(f"{count:>8} {per_symbol_ms:>14.2f} {panel_ms:>10.2f} {per_symbol_ms / panel_ms:>8.1f}x {diff:>14.2e}")
+
+
+def frontier_payload(points: int, assets: int, seed: int = 7) -> dict:
+    """Efficient-frontier-shaped payload with NumPy weight arrays, as MarkowitzPortfolio returns it"""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(assets), size=points)
+    return {
+        'efficient_frontier': [{'return': np.float64(r), 'volatility': np.float64(v), 'sharpe_ratio': np.float64(r / v),
+                                'weights': w} for r, v, w in zip(rng.normal(0.1, 0.05, points),
+                                                                 rng.uniform(0.1, 0.4, points), weights)],
+        'optimal_portfolio': {'weights': weights[0], 'expected_return': np.float64(0.12)},
+        'asset_names': [f"S{i}" for i in range(assets)]
+    }
+
+
+def synthetic_returns(days: int, assets: int, seed: int = 7) -> pd.DataFrame:
+    """Daily returns of assets driven by three common factors plus idiosyncratic noise"""
+    rng = np.random.default_rng(seed)
+    loadings = rng.normal(1.0, 0.5, (3, assets))
+    factors = rng.normal(0.0003, 0.01, (days, 3))
+    drift = rng.uniform(-0.0002, 0.001, assets)
+    returns = drift + factors @ loadings / 3 + rng.normal(0, 0.015, (days, assets))
+    return pd.DataFrame(returns, columns=[f"S{i}" for i in range(assets)])
+
+
+def legacy_efficient_frontier(returns: pd.DataFrame, num_portfolios: int = 100) -> dict:
+    """The original frontier: cold-started SLSQP solves with finite-difference gradients"""
+    mu = returns.mean() * 252
+    cov = returns.cov() * 252
+    n = len(mu)
+    bounds = tuple((0, 1) for _ in range(n))
+
+    def variance(w):
+        return np.dot(w.T, np.dot(cov, w))
+
+    def negative_sharpe(w):
+        return -(np.sum(w * mu) - 0.02) / np.sqrt(variance(w))
+
+    frontier = []
+    for target in np.linspace(mu.min(), mu.max(), num_portfolios):
+        constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1},
+                       {'type': 'eq', 'fun': lambda x, t=target: np.sum(x * mu) - t}]
+        result = minimize(variance, np.full(n, 1 / n), method='SLSQP', bounds=bounds, constraints=constraints)
+        if result.success:
+            frontier.append(np.sqrt(variance(result.x)))
+    result = minimize(negative_sharpe, np.full(n, 1 / n), method='SLSQP', bounds=bounds,
+                      constraints=({'type': 'eq', 'fun': lambda x: np.sum(x) - 1}))
+    return {'volatilities': np.array(frontier), 'max_sharpe': -result.fun}
+
+
+def bench_frontier(repeat: int, asset_counts=(5, 10, 25, 50)):
+    print("Efficient frontier, 100 targets + max Sharpe (finite differences, cold starts vs analytic gradients, "
+          "warm starts)")
+    print(f"{'assets':>8} {'legacy ms':>11} {'engine ms':>11} {'speedup':>9} {'max vol diff':>13} {'sharpe diff':>12}")
+    for assets in asset_counts:
+        returns = synthetic_returns(252, assets)
+        # The legacy solver takes seconds at 50 assets, so it is timed once
+        legacy_ms = timed(lambda: legacy_efficient_frontier(returns), 1)
+        engine_ms = timed(lambda: MarkowitzPortfolio(returns).efficient_frontier(), max(1, repeat // 5))
+        legacy = legacy_efficient_frontier(returns)
+        engine = MarkowitzPortfolio(returns).efficient_frontier()
+        volatilities = np.array([portfolio['volatility'] for portfolio in engine['efficient_frontier']])
+        vol_diff = (float(np.max(np.abs(volatilities - legacy['volatilities'])))
+                    if len(volatilities) == len(legacy['volatilities']) else np.inf)
+        sharpe_diff = engine['optimal_portfolio']['sharpe_ratio'] - legacy['max_sharpe']
+        print(f"{assets:>8} {legacy_ms:>11.1f} {engine_ms:>11.1f} {legacy_ms / engine_ms:>8.1f}x "
+              f"{vol_diff:>13.2e} {sharpe_diff:>+12.2e}")
+
+
+def bench_frontier_parallel(repeat: int, points: int = 500, asset_counts=(50, 100)):
+    workers = frontier_workers()
+    print(f"Dense efficient frontier, {points} targets (one process vs process pool of {workers} workers)")
+    print(f"{'assets':>8} {'serial ms':>11} {'pool ms':>11} {'speedup':>9} {'max vol diff':>13}")
+    pool = get_frontier_pool()
+    try:
+        for assets in asset_counts:
+            portfolio = MarkowitzPortfolio(synthetic_returns(252, assets))
+            parallel = lambda: asyncio.run(portfolio.efficient_frontier_parallel(pool, points))
+            # First run starts the worker processes
+            parallel()
+            serial_ms = timed(lambda: portfolio.efficient_frontier(points), 1)
+            pool_ms = timed(parallel, max(1, repeat // 10))
+            expected = [p['volatility'] for p in portfolio.efficient_frontier(points)['efficient_frontier']]
+            actual = [p['volatility'] for p in parallel()['efficient_frontier']]
+            diff = float(np.max(np.abs(np.subtract(expected, actual)))) if len(expected) == len(actual) else np.inf
+            print(f"{assets:>8} {serial_ms:>11.1f} {pool_ms:>11.1f} {serial_ms / pool_ms:>8.1f}x {diff:>13.2e}")
+    finally:
+        shutdown_frontier_pool()
+
+
+def bench_covariance(repeat: int, asset_counts=(100, 500, 2000), portfolios: int = 10_000):
+    print(f"Covariance estimators on one year of returns (risk of {portfolios:,} portfolios, max-Sharpe solve up to "
+          f"250 assets)")
+    print(f"{'assets':>8} {'method':>12} {'build ms':>9} {'cov KB':>9} {'risk ms':>9} {'condition':>10} "
+          f"{'optimize ms':>12}")
+    for assets in asset_counts:
+        returns = synthetic_returns(252, assets)
+        weights = np.random.default_rng(7).dirichlet(np.ones(assets), portfolios)
+        for method in CovarianceEstimator.METHODS:
+            build_ms = timed(lambda: CovarianceEstimator.estimate(returns.to_numpy(), method), repeat)
+            cov = CovarianceEstimator.estimate(returns.to_numpy(), method)
+            if isinstance(cov, FactorCovariance):
+                size = cov.loadings.nbytes + cov.specific.nbytes
+                dense = cov.to_dense()
+            else:
+                size = cov.nbytes
+                dense = cov
+            risk_ms = timed(lambda: np.einsum('ij,ij->i', weights @ cov, weights), repeat)
+            eigenvalues = np.linalg.eigvalsh(dense)
+            condition = eigenvalues[-1] / eigenvalues[0] if eigenvalues[0] > 0 else np.inf
+            optimize = '-'
+            if assets <= 250:
+                portfolio = MarkowitzPortfolio(returns, method)
+                optimize = f"{timed(portfolio.optimize_portfolio, 1):.0f}"
+            print(f"{assets:>8} {method:>12} {build_ms:>9.1f} {size / 1024:>9.0f} {risk_ms:>9.1f} {condition:>10.1e} "
+                  f"{optimize:>12}")
+
+
+def bench_random_portfolios(repeat: int, portfolios: int = 100_000, asset_counts=(5, 50, 500)):
+    print(f"Random portfolio cloud, {portfolios:,} Dirichlet draws (portfolio_performance per draw vs chunked batches)")
+    print(f"{'assets':>8} {'loop ms':>10} {'batched ms':>11} {'speedup':>9} {'max vol diff':>13}")
+    for assets in asset_counts:
+        portfolio = MarkowitzPortfolio(synthetic_returns(252, assets))
+        weights = np.random.default_rng(7).dirichlet(np.ones(assets), portfolios)
+
+        def loop():
+            return np.array([portfolio.portfolio_performance(w) for w in weights])
+
+        loop_ms = timed(loop, 1)
+        batched_ms = timed(lambda: portfolio.random_portfolios(portfolios, seed=7), repeat)
+        # Same draws through both paths, to check the batched statistics
+        volatilities = np.sqrt(np.einsum('ij,ij->i', weights @ portfolio.cov, weights))
+        diff = float(np.max(np.abs(volatilities - loop()[:, 1])))
+        print(f"{assets:>8} {loop_ms:>10.1f} {batched_ms:>11.1f} {loop_ms / batched_ms:>8.1f}x {diff:>13.2e}")
+
+
+def bench_json(repeat: int):
+    print("JSON responses (FastAPI default jsonable_encoder + JSONResponse vs NumpyJSONResponse)")
+    print(f"{'payload':>28} {'default ms':>11} {'numpy ms':>10} {'speedup':>9}")
+    cases = [(f"stock {days} days", analyzer.process_stock_data(synthetic_bars(days), 'BENCH'))
+             for days in (252, 1260, 5040)]
+    cases += [(f"frontier {points}x{assets}", frontier_payload(points, assets))
+              for points, assets in ((50, 5), (200, 24), (1000, 50))]
+    for name, payload in cases:
+        # The default path cannot encode NumPy values, so it gets the hand-converted payload
+        plain = json.loads(NumpyJSONResponse(payload).body)
+        assert json.loads(JSONResponse(jsonable_encoder(plain)).body) == plain
+        default_ms = timed(lambda: JSONResponse(jsonable_encoder(plain)).body, repeat)
+        numpy_ms = timed(lambda: NumpyJSONResponse(payload).body, repeat)
+        print(f"{name:>28} {default_ms:>11.2f} {numpy_ms:>10.2f} {default_ms / numpy_ms:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='Timed repetitions per case (best is reported)')
+    args = parser.parse_args()
+    bench_indicators(args.repeat)
+    print()
+    bench_incremental(args.repeat)
+    print()
+    bench_panel(args.repeat)
+    print()
+    bench_encodings(args.repeat)
+    print()
+    bench_downsampling(args.repeat)
+    print()
+    bench_resample(args.repeat)
+    print()
+    bench_frontier(args.repeat)
+    print()
+    bench_frontier_parallel(args.repeat)
+    print()
+    bench_covariance(args.repeat)
+    print()
+    bench_random_portfolios(args.repeat)
+    print()
+    bench_json(args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,39 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.routing import APIRoute
+from fastapi.datastructures import DefaultPlaceholder
 from fastapi.templating import Jinja2Templates
 import logging
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 import json
+import math
+import operator
+import re
 from typing import List, Optional
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.utils import PlotlyJSONEncoder
-import requests
+import httpx
+import asyncio
+import functools
 import os
-from concurrent.futures import ThreadPoolExecutor
-from scipy.optimize import minimize
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from scipy.signal import lfilter
 # import ta  # Commented out due to installation issues
 import os
 from dotenv import load_dotenv
 
+from portfolio import CovarianceEstimator, MarkowitzPortfolio, get_frontier_pool, shutdown_frontier_pool
+
 # Load environment variables
 load_dotenv()
 
@@ -27,8 +41,106 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks"""
+    # Keep the supported universe warm in the background
+    if os.getenv('PREFETCH_ENABLED', 'true').lower() == 'true':
+        prefetch_scheduler.start()
+    if os.getenv('MARKET_SNAPSHOT_ENABLED', 'true').lower() == 'true':
+        market_snapshot.start()
+    yield
+    await market_snapshot.stop()
+    await prefetch_scheduler.stop()
+    # Release pooled upstream connections and frontier worker processes
+    await close_http_client()
+    shutdown_frontier_pool()
+
+# JSON rendering
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.warning("orjson not available - falling back to the standard json module for responses")
+
+def _json_default(obj):
+    """Encode the types orjson (or json) cannot serialize on its own"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _json_sanitize(obj):
+    """Convert NumPy values and replace NaN/Infinity with None for the standard json module"""
+    if isinstance(obj, dict):
+        return {key if isinstance(key, (str, int, float, bool)) or key is None else str(key): _json_sanitize(value)
+                for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_sanitize(value) for value in obj]
+    if isinstance(obj, (np.ndarray, np.generic, pd.Series, pd.Index, set, frozenset)):
+        return _json_sanitize(_json_default(obj))
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+def dumps_json(content) -> bytes:
+    """
+    Serialize a response payload to JSON bytes
+    
+    NumPy arrays and scalars are encoded natively (orjson) and NaN or
+    Infinity become null, so endpoints can return NumPy results as they are.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_json_sanitize(content), default=_json_default, allow_nan=False,
+                      separators=(',', ':')).encode('utf-8')
+
+class NumpyJSONResponse(JSONResponse):
+    """JSON response rendered with dumps_json"""
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+class NumpyJSONRoute(APIRoute):
+    """
+    Route that renders plain endpoint results with NumpyJSONResponse right away
+    
+    FastAPI would otherwise run every result through jsonable_encoder, which
+    walks it element by element in Python and rejects NumPy types. Endpoints
+    returning a Response, or declaring a response_model or response_class,
+    are left alone.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        response_model = kwargs.get('response_model')
+        response_class = kwargs.get('response_class')
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (asyncio.iscoroutinefunction(endpoint) and response_class in (None, NumpyJSONResponse) and
+                (response_model is None or isinstance(response_model, DefaultPlaceholder))):
+            status_code = kwargs.get('status_code') or 200
+            original = endpoint
+            
+            @functools.wraps(original)
+            async def endpoint(*args, **kw):
+                result = await original(*args, **kw)
+                if isinstance(result, Response):
+                    return result
+                return NumpyJSONResponse(result, status_code=status_code)
+        super().__init__(path, endpoint, **kwargs)
+
 # Create FastAPI app
-app = FastAPI(title="Financial Analysis Dashboard", version="1.0.0")
+app = FastAPI(title="Financial Analysis Dashboard", version="1.0.0", lifespan=lifespan,
+              default_response_class=NumpyJSONResponse)
+app.router.route_class = NumpyJSONRoute
 
 # Get the directory where this script is located
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -105,255 +217,2941 @@ async def api_status():
         ]
     }
 
-# Financial Analysis Class
-class FinancialAnalyzer:
+# US equity market calendar basics
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN_TIME = dt_time(9, 30)
+MARKET_CLOSE_TIME = dt_time(16, 0)
+
+# Period strings accepted by the API, mapped to calendar days of history
+PERIOD_DAYS = {'1y': 365, '6mo': 180, '3mo': 90, '1mo': 30}
+
+# Bar intervals served by the series endpoints: name -> minutes per bar (None for daily bars)
+BAR_INTERVALS = {'1m': 1, '5m': 5, '15m': 15, '30m': 30, '1h': 60, '1d': None}
+
+def market_now(now: Optional[datetime] = None) -> datetime:
+    """now (default: the current time) as an aware datetime in market time; naive values are read as host-local time"""
+    return now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+
+def period_date_range(period: str, end_date: Optional[datetime] = None) -> tuple:
+    """
+    Translate a period string (1y, 6mo, 3mo, 1mo) into a (start_date, end_date) pair
+    
+    The default end_date is the current market wall-clock time (naive), so
+    the range is in the same dates as the bars whatever the host timezone.
+    """
+    end_date = end_date or market_now().replace(tzinfo=None)
+    start_date = end_date - timedelta(days=PERIOD_DAYS.get(period, 365))
+    return start_date, end_date
+
+# In-process caching
+class TTLCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        """
+        Thread-safe, size-bounded LRU cache whose entries expire after a TTL
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting the least recently used
+            ttl: Time to live of an entry in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove key from the cache and return its value"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry is not None else default
+
+    def items(self) -> list:
+        """Snapshot of the live (non-expired) entries, least recently used first"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (stored_at, value) in self._entries.items()
+                    if now - stored_at <= self.ttl]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+class BarCache(TTLCache):
+    """
+    Cache of daily OHLCV bars keyed by (symbol, start date, end date)
+
+    A cached range answers any request for a sub-range of it, so a cached 1y
+    series also serves 6mo/3mo/1mo requests by slicing.
+    """
+
+    def get_range(self, symbol: str, start_date: datetime, end_date: datetime) -> Optional[pd.DataFrame]:
+        """Return bars for symbol covering [start_date, end_date], or None on a miss"""
+        start_day, end_day = start_date.date(), end_date.date()
+        for (cached_symbol, cached_start, cached_end), hist in reversed(self.items()):
+            if cached_symbol == symbol and cached_start <= start_day and cached_end >= end_day:
+                # Refresh LRU position and hit statistics of the covering entry
+                self.get((cached_symbol, cached_start, cached_end))
+                in_range = (hist.index >= pd.Timestamp(start_day)) & (hist.index <= pd.Timestamp(end_day))
+                return hist[in_range].copy()
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, symbol: str, start_date: datetime, end_date: datetime, hist: pd.DataFrame):
+        """Cache bars fetched for symbol over [start_date, end_date]"""
+        self.set((symbol, start_date.date(), end_date.date()), hist.copy())
+
+    def invalidate(self, symbol: str):
+        """Drop every cached range for symbol"""
+        for key, _ in self.items():
+            if key[0] == symbol:
+                self.pop(key)
+
+def last_completed_session(now: Optional[datetime] = None):
+    """Date of the most recent US trading session that has closed (weekends skipped, holidays not)"""
+    now = market_now(now)
+    day = now.date()
+    if now.weekday() >= 5 or now.time() < MARKET_CLOSE_TIME:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Whether US regular trading hours are in progress (holidays not considered)"""
+    now = market_now(now)
+    return now.weekday() < 5 and MARKET_OPEN_TIME <= now.time() < MARKET_CLOSE_TIME
+
+def latest_expected_session(now: Optional[datetime] = None):
+    """Date of the most recent session that may have bars, including one still in progress"""
+    now = market_now(now)
+    day = now.date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task
+
+    The first caller starts the work; callers arriving while it runs await the
+    same task instead of repeating the upstream fetch and computation.
+    """
+
     def __init__(self):
-        # Supported stocks
-        self.supported_stocks = [
-            'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX',
-            'AMD', 'INTC', 'CRM', 'ADBE', 'PYPL', 'UBER', 'LYFT', 'SQ',
-            'ROKU', 'ZM', 'DOCU', 'OKTA', 'SNOW', 'PLTR', 'CRWD', 'NET'
-        ]
-        
-        # Initialize Alpaca API
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, coroutine_factory):
+        """Await the in-flight task for key, starting coroutine_factory() if there is none"""
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            task = asyncio.ensure_future(coroutine_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        # Shield the shared task so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {'in_flight': len(self._inflight), 'started': self.started, 'coalesced': self.coalesced}
+
+# Persistent bar storage
+class BarStore:
+    """
+    On-disk store of daily OHLCV bars, one memory-mappable file per symbol
+
+    Each symbol is stored as a (6, n) float64 .npy array whose rows are the
+    columns date (days since epoch), open, high, low, close and volume, so
+    every column is contiguous and a date range is read straight from the
+    memory map. A small JSON sidecar records which calendar range has been
+    fetched from upstream, which lets callers fetch only the missing days,
+    and the provider and price adjustment of the stored bars, so bars on a
+    different price scale are never appended to them.
+    """
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, symbol: str) -> tuple:
+        safe_symbol = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        base = os.path.join(self.directory, safe_symbol)
+        return f"{base}.npy", f"{base}.meta.json"
+
+    def metadata(self, symbol: str) -> Optional[dict]:
+        """Return the sidecar of symbol (covered range, provider, adjustment), or None if not stored"""
+        _, meta_path = self._paths(symbol)
         try:
-            import alpaca_trade_api as tradeapi
-            self.alpaca_api = tradeapi.REST(
-                os.getenv('APCA_API_KEY_ID'),
-                os.getenv('APCA_SECRET_KEY'),
-                os.getenv('APCA_API_BASE_URL'),
-                api_version='v2'
-            )
-        except ImportError:
-            self.alpaca_api = None
-            logger.warning("Alpaca API not available - install alpaca-trade-api")
-        except Exception as e:
-            self.alpaca_api = None
-            logger.warning(f"Alpaca API initialization failed: {e}")
-        
-        # Polygon.io configuration
-        self.polygon_api_key = os.getenv('POLYGON_API_KEY')
-        self.polygon_base_url = os.getenv('POLYGON_BASE_URL')
-        
-        # Only use Alpaca and Polygon.io APIs
-        
-        # Thread pool for concurrent API calls
-        self.executor = None
-    
-    def get_stock_data(self, symbol: str, period: str = "1y") -> dict:
-        """Fetch stock data using Alpaca and Polygon.io APIs with Yahoo Finance fallback"""
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def coverage(self, symbol: str) -> Optional[tuple]:
+        """Return the (start, end) dates fetched from upstream for symbol, or None if not stored"""
+        meta = self.metadata(symbol)
         try:
-            # 1. Try Alpaca API first (user's primary API)
-            if self.alpaca_api:
-                try:
-                    hist = self.get_alpaca_data(symbol, period)
-                    if not hist.empty:
-                        logger.info(f"Got {len(hist)} data points for {symbol} from Alpaca")
-                        return self.process_stock_data(hist, symbol)
-                except Exception as e:
-                    logger.warning(f"Alpaca failed for {symbol}: {e}")
-            
-            # 2. Try Polygon.io API (user's secondary API)
-            try:
-                hist = self.get_polygon_stock_data(symbol, period)
-                if not hist.empty:
-                    logger.info(f"Got {len(hist)} data points for {symbol} from Polygon.io")
-                    return self.process_stock_data(hist, symbol)
-            except Exception as e:
-                logger.warning(f"Polygon.io failed for {symbol}: {e}")
-            
-            # 3. Try Yahoo Finance with multiple attempts (free fallback)
-            stock = yf.Ticker(symbol)
-            attempts = [
-                {'period': period, 'interval': '1d'},
-                {'period': '1y', 'interval': '1d'},
-                {'period': '6mo', 'interval': '1d'},
-                {'period': '3mo', 'interval': '1d'},
-                {'period': '1mo', 'interval': '1d'},
-            ]
-            
-            for attempt in attempts:
-                try:
-                    hist = stock.history(period=attempt['period'], interval=attempt['interval'])
-                    if not hist.empty and len(hist) > 10:
-                        logger.info(f"Got {len(hist)} data points for {symbol} from Yahoo Finance with period={attempt['period']}")
-                        return self.process_stock_data(hist, symbol)
-                except Exception as e:
-                    logger.warning(f"Yahoo Finance attempt failed for {symbol} with {attempt}: {e}")
-                    continue
-            
-            # 4. Last resort: try Yahoo Finance download
-            try:
-                hist = yf.download(symbol, period="1y", progress=False, show_errors=False)
-                if not hist.empty:
-                    logger.info(f"Got {len(hist)} data points for {symbol} using Yahoo Finance download")
-                    return self.process_stock_data(hist, symbol)
-            except Exception as e:
-                logger.warning(f"Yahoo Finance download failed for {symbol}: {e}")
-            
-            # 5. Final fallback: generate mock data for testing
-            logger.warning(f"All data sources failed for {symbol}, generating mock data for testing")
-            return self.generate_mock_data(symbol, period)
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error for {symbol}: {e}")
-            raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
-    
-    def get_alpaca_data(self, symbol: str, period: str) -> pd.DataFrame:
-        """Fetch data from Alpaca API"""
-        # Convert period to Alpaca format
-        end_date = datetime.now()
-        if period == "1y":
-            start_date = end_date - timedelta(days=365)
-        elif period == "6mo":
-            start_date = end_date - timedelta(days=180)
-        elif period == "3mo":
-            start_date = end_date - timedelta(days=90)
-        elif period == "1mo":
-            start_date = end_date - timedelta(days=30)
-        else:
-            start_date = end_date - timedelta(days=365)
-        
-        # Get bars from Alpaca
-        if self.alpaca_api:
-            try:
-                import alpaca_trade_api as tradeapi
-                bars = self.alpaca_api.get_bars(
-                    symbol,
-                    tradeapi.TimeFrame.Day,
-                    start=start_date.strftime('%Y-%m-%d'),
-                    end=end_date.strftime('%Y-%m-%d'),
-                    adjustment='raw'
-                ).df
-                return bars
-            except Exception as e:
-                logger.warning(f"Alpaca API error: {e}")
-                return pd.DataFrame()
-        return pd.DataFrame()
-    
-    def get_polygon_stock_data(self, symbol: str, period: str) -> pd.DataFrame:
-        """Fetch stock data from Polygon.io API"""
+            return (datetime.strptime(meta['covered_start'], '%Y-%m-%d').date(),
+                    datetime.strptime(meta['covered_end'], '%Y-%m-%d').date())
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def last_bar(self, symbol: str, on_or_before) -> Optional[tuple]:
+        """Return (date, close) of the last stored bar on or before the given date, or None"""
+        data_path, _ = self._paths(symbol)
         try:
-            if not self.polygon_api_key:
-                logger.warning("Polygon.io API key not configured")
-                return pd.DataFrame()
-            
-            # Calculate date range
-            end_date = datetime.now()
-            if period == "1y":
-                start_date = end_date - timedelta(days=365)
-            elif period == "6mo":
-                start_date = end_date - timedelta(days=180)
-            elif period == "3mo":
-                start_date = end_date - timedelta(days=90)
-            elif period == "1mo":
-                start_date = end_date - timedelta(days=30)
-            else:
-                start_date = end_date - timedelta(days=365)
-            
-            # Polygon.io aggregates endpoint
-            url = f"{self.polygon_base_url}/v2/aggs/ticker/{symbol}/range/1/day/{start_date.strftime('%Y-%m-%d')}/{end_date.strftime('%Y-%m-%d')}"
-            params = {'apikey': self.polygon_api_key}
-            
-            response = requests.get(url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if 'results' in data and data['results']:
-                    # Convert to DataFrame
-                    df_data = []
-                    for result in data['results']:
-                        df_data.append({
-                            'Open': result['o'],
-                            'High': result['h'],
-                            'Low': result['l'],
-                            'Close': result['c'],
-                            'Volume': result['v']
-                        })
-                    
-                    if df_data:
-                        df = pd.DataFrame(df_data)
-                        # Create date index
-                        dates = [datetime.fromtimestamp(result['t']/1000) for result in data['results']]
-                        df.index = dates
-                        df = df.sort_index()
-                        return df
-                
-            logger.warning(f"Polygon.io API returned no data for {symbol}")
+            columns = np.load(data_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        day = np.datetime64(on_or_before, 'D').astype(np.int64)
+        position = int(np.searchsorted(columns[0], day, side='right')) - 1
+        if position < 0:
+            return None
+        return (np.datetime64(int(columns[0, position]), 'D').astype(object), float(columns[4, position]))
+
+    def load(self, symbol: str, start_date: Optional[datetime] = None) -> Optional[pd.DataFrame]:
+        """Read stored bars for symbol from start_date onwards, touching only that slice of the file"""
+        data_path, _ = self._paths(symbol)
+        try:
+            columns = np.load(data_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+
+        first = 0
+        if start_date is not None:
+            start_day = np.datetime64(start_date.date(), 'D').astype(np.int64)
+            first = int(np.searchsorted(columns[0], start_day))
+        block = np.array(columns[:, first:])
+        del columns
+
+        index = pd.DatetimeIndex(block[0].astype('int64').astype('datetime64[D]').astype('datetime64[ns]'))
+        return pd.DataFrame(dict(zip(self.COLUMNS, block[1:])), index=index)
+
+    def write(self, symbol: str, hist: pd.DataFrame, covered_start, covered_end,
+              provider: Optional[str] = None, adjustment: Optional[str] = None, replace: bool = False):
+        """
+        Merge normalized bars into the stored file for symbol and extend its fetched range
+
+        Args:
+            symbol: Stock symbol
+            hist: Normalized bars (see FinancialAnalyzer.normalize_bars)
+            covered_start: First calendar date the fetch asked upstream for
+            covered_end: Last calendar date whose bar is final
+            provider: Name of the provider the bars came from
+            adjustment: Price adjustment of the bars (see MarketDataProvider.adjustment)
+            replace: Discard the stored bars and range instead of merging into them
+        """
+        data_path, meta_path = self._paths(symbol)
+        with self._lock:
+            stored = None if replace else self.load(symbol)
+            coverage = None if replace else self.coverage(symbol)
+            if stored is not None and not stored.empty:
+                hist = pd.concat([stored, hist[self.COLUMNS]])
+                hist = hist[~hist.index.duplicated(keep='last')].sort_index()
+            if coverage:
+                covered_start = min(covered_start, coverage[0])
+                covered_end = max(covered_end, coverage[1])
+
+            block = np.empty((len(self.COLUMNS) + 1, len(hist)), dtype=np.float64)
+            block[0] = hist.index.values.astype('datetime64[D]').astype(np.int64)
+            block[1:] = hist[self.COLUMNS].to_numpy(dtype=np.float64).T
+
+            # Write to temporary files and swap them in so readers never see a partial file
+            with open(f"{data_path}.tmp", "wb") as f:
+                np.save(f, block)
+            with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({'covered_start': covered_start.strftime('%Y-%m-%d'),
+                           'covered_end': covered_end.strftime('%Y-%m-%d'),
+                           'rows': len(hist),
+                           'provider': provider,
+                           'adjustment': adjustment}, f)
+            os.replace(f"{data_path}.tmp", data_path)
+            os.replace(f"{meta_path}.tmp", meta_path)
+
+# Shared, pooled HTTP client for upstream APIs
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(float(os.getenv('HTTP_TIMEOUT_SECONDS', '10')), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', '100')),
+                max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+            )
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Market data providers
+class MarketDataProvider:
+    """
+    Async source of daily OHLCV bars
+
+    Blocking client libraries are run in worker threads so a slow upstream
+    never stalls the event loop.
+    """
+    name = "provider"
+
+    # Price adjustment of the daily bars: raw, split (splits only) or all (splits and dividends)
+    adjustment = "raw"
+
+    # Days of minute bars requested at a time by iter_minute_bars
+    minute_chunk_days = 5
+
+    def is_configured(self) -> bool:
+        return True
+
+    async def get_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Fetch daily bars for symbol between start_date and end_date (empty DataFrame if none)"""
+        raise NotImplementedError
+
+    async def get_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """Fetch one-minute bars for symbol over the days start_date to end_date (empty DataFrame if none)"""
+        raise NotImplementedError
+
+    async def iter_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime):
+        """
+        Stream minute bars between start_date and end_date in time-ordered chunks
+
+        The default requests minute_chunk_days days at a time, so a long
+        range never has to be held in memory at once; providers that page
+        their responses yield pages instead.
+
+        Yields:
+            DataFrame of minute bars, indexed by bar start time
+        """
+        chunk_start = start_date
+        while chunk_start.date() <= end_date.date():
+            chunk_end = min(chunk_start + timedelta(days=self.minute_chunk_days - 1), end_date)
+            bars = await self.get_minute_bars(symbol, chunk_start, chunk_end)
+            if not bars.empty:
+                yield bars
+            chunk_start = chunk_end + timedelta(days=1)
+
+    async def get_bars_batch(self, symbols: List[str], start_date: datetime, end_date: datetime) -> dict:
+        """
+        Fetch daily bars for several symbols, returning {symbol: DataFrame}
+
+        The default runs get_bars concurrently with bounded concurrency;
+        providers with a multi-symbol endpoint override it. Symbols whose
+        request failed are left out, unless every request failed.
+        """
+        semaphore = asyncio.Semaphore(int(os.getenv('PROVIDER_BATCH_CONCURRENCY', '8')))
+
+        async def fetch(symbol):
+            async with semaphore:
+                return await self.get_bars(symbol, start_date, end_date)
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return {symbol: result for symbol, result in zip(symbols, results) if not isinstance(result, Exception)}
+
+class AlpacaProvider(MarketDataProvider):
+    name = "alpaca"
+
+    def __init__(self, api):
+        self.api = api
+
+    def is_configured(self) -> bool:
+        return self.api is not None
+
+    async def get_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        if not self.api:
             return pd.DataFrame()
-            
-        except Exception as e:
-            logger.warning(f"Polygon.io API error: {e}")
+        import alpaca_trade_api as tradeapi
+        bars = await asyncio.to_thread(
+            self.api.get_bars,
+            symbol,
+            tradeapi.TimeFrame.Day,
+            start=start_date.strftime('%Y-%m-%d'),
+            end=end_date.strftime('%Y-%m-%d'),
+            adjustment='raw'
+        )
+        return bars.df
+
+    async def get_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        if not self.api:
             return pd.DataFrame()
-    
-    def get_polygon_data(self, symbol: str, period: str) -> dict:
-        """Fetch additional data from Polygon.io"""
+        import alpaca_trade_api as tradeapi
+        # A date-only end is midnight, so ask for the following day to include the whole last session
+        bars = await asyncio.to_thread(
+            self.api.get_bars,
+            symbol,
+            tradeapi.TimeFrame.Minute,
+            start=start_date.strftime('%Y-%m-%d'),
+            end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+            adjustment='raw'
+        )
+        return bars.df
+
+    async def get_bars_batch(self, symbols: List[str], start_date: datetime, end_date: datetime) -> dict:
+        """Fetch daily bars for all symbols with one multi-symbol Alpaca bars request"""
+        if not self.api:
+            return {}
+        import alpaca_trade_api as tradeapi
+        bars = await asyncio.to_thread(
+            self.api.get_bars,
+            list(symbols),
+            tradeapi.TimeFrame.Day,
+            start=start_date.strftime('%Y-%m-%d'),
+            end=end_date.strftime('%Y-%m-%d'),
+            adjustment='raw'
+        )
+        df = bars.df
+        if df.empty or 'symbol' not in df.columns:
+            return {}
+        return {symbol: group.drop(columns='symbol') for symbol, group in df.groupby('symbol')}
+
+    async def get_latest_bar(self, symbol: str):
+        return await asyncio.to_thread(self.api.get_latest_bar, symbol)
+
+    async def get_latest_bars(self, symbols: List[str]) -> dict:
+        """Latest bar of every symbol in one request, as {symbol: bar}"""
+        return await asyncio.to_thread(self.api.get_latest_bars, list(symbols))
+
+class PolygonProvider(MarketDataProvider):
+    name = "polygon"
+    adjustment = "split"
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str]):
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def get_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        if not self.api_key:
+            logger.warning("Polygon.io API key not configured")
+            return pd.DataFrame()
+
+        pages = [page async for page in self.iter_aggregate_pages(symbol, start_date, end_date)]
+        if not pages:
+            logger.warning(f"Polygon.io API returned no data for {symbol}")
+            return pd.DataFrame()
+        return pd.concat(pages) if len(pages) > 1 else pages[0]
+
+    async def get_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        pages = [page async for page in self.iter_minute_bars(symbol, start_date, end_date)]
+        return pd.concat(pages) if pages else pd.DataFrame()
+
+    async def iter_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime):
+        """Stream minute aggregates one /v2/aggs page (up to 50,000 bars) at a time"""
+        if not self.api_key:
+            return
+        async for page in self.iter_aggregate_pages(symbol, start_date, end_date, multiplier=1, timespan='minute'):
+            yield page
+
+    async def iter_aggregate_pages(self, symbol: str, start_date: datetime, end_date: datetime,
+                                   multiplier: int = 1, timespan: str = 'day'):
+        """
+        Stream /v2/aggs results page by page, following next_url until the range is exhausted
+
+        Yields:
+            DataFrame of one page of bars (see parse_aggregates)
+        """
+        # Polygon.io aggregates endpoint
+        url = (f"{self.base_url}/v2/aggs/ticker/{symbol}/range/{multiplier}/{timespan}/"
+               f"{start_date.strftime('%Y-%m-%d')}/{end_date.strftime('%Y-%m-%d')}")
+        params = {'apikey': self.api_key, 'adjusted': 'true', 'sort': 'asc', 'limit': 50000}
+
+        while url:
+            response = await get_http_client().get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+
+            results = data.get('results')
+            if results:
+                yield self.parse_aggregates(results)
+
+            # next_url already carries the cursor and query; only the key has to be re-sent
+            url = data.get('next_url')
+            params = {'apikey': self.api_key}
+
+    @staticmethod
+    def parse_aggregates(results: list) -> pd.DataFrame:
+        """Build an OHLCV DataFrame column-wise from a page of Polygon.io aggregate results"""
+        df = pd.DataFrame.from_records(results, columns=['t', 'o', 'h', 'l', 'c', 'v'])
+        df.index = pd.to_datetime(df.pop('t').to_numpy(dtype=np.int64), unit='ms', utc=True).tz_convert(MARKET_TZ)
+        df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        return df
+
+    async def get_ticker_details(self, symbol: str) -> dict:
+        """Fetch company reference data from /v3/reference/tickers"""
+        if not self.api_key:
+            return {}
         try:
-            # Get company info
-            url = f"{self.polygon_base_url}/v3/reference/tickers/{symbol}"
-            params = {'apikey': self.polygon_api_key}
-            response = requests.get(url, params=params)
-            
+            url = f"{self.base_url}/v3/reference/tickers/{symbol}"
+            params = {'apikey': self.api_key}
+            response = await get_http_client().get(url, params=params)
+
             if response.status_code == 200:
                 return response.json()
             return {}
-        except:
+        except Exception:
+            return {}
+
+class YahooProvider(MarketDataProvider):
+    name = "yahoo"
+    adjustment = "all"
+
+    async def get_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        # Yahoo Finance treats end as exclusive
+        return await self.history(symbol, start=start_date.strftime('%Y-%m-%d'),
+                                  end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'), interval='1d')
+
+    async def get_minute_bars(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        # Yahoo Finance serves 1m bars for the last 30 days only, at most 8 days per request
+        return await self.history(symbol, start=start_date.strftime('%Y-%m-%d'),
+                                  end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'), interval='1m')
+
+    async def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        """Run yf.Ticker(symbol).history(**kwargs) in a worker thread"""
+        return await asyncio.to_thread(lambda: yf.Ticker(symbol).history(**kwargs))
+
+    async def info(self, symbol: str) -> dict:
+        """Run yf.Ticker(symbol).info in a worker thread"""
+        return await asyncio.to_thread(lambda: yf.Ticker(symbol).info)
+
+    async def download(self, symbols, **kwargs) -> pd.DataFrame:
+        """Run yf.download(symbols, **kwargs) in a worker thread"""
+        return await asyncio.to_thread(yf.download, symbols, progress=False, **kwargs)
+
+    async def get_bars_batch(self, symbols: List[str], start_date: datetime, end_date: datetime) -> dict:
+        """Fetch daily bars for all symbols with one yf.download call over the ticker list"""
+        df = await self.download(list(symbols), start=start_date.strftime('%Y-%m-%d'),
+                                 end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+                                 group_by='ticker', auto_adjust=True, threads=True)
+        if df.empty or not isinstance(df.columns, pd.MultiIndex):
             return {}
+        tickers = set(df.columns.get_level_values(0))
+        return {symbol: df[symbol].dropna(how='all') for symbol in symbols if symbol in tickers}
+
+# Provider health tracking
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 60,
+                 latency_alpha: float = 0.3):
+        """
+        Circuit breaker for one provider and request kind, with a latency estimate
+
+        The breaker opens after failure_threshold consecutive failures and
+        rejects calls until recovery_timeout has passed; it then lets a single
+        trial call through (half-open) and closes again if that succeeds.
+
+        Args:
+            name: Provider name and request kind, e.g. "alpaca:daily"
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_timeout: Seconds an open circuit waits before a trial call
+            latency_alpha: Smoothing factor of the exponentially weighted latency average
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_alpha = latency_alpha
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.avg_latency = None
+        self.opened_at = None
+        self.last_error = None
+        self.last_failure_at = None
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    def _trial_available(self, now: float) -> bool:
+        # A trial that never reported back (e.g. a cancelled request) is abandoned after recovery_timeout
+        return self._trial_started_at is None or now - self._trial_started_at >= self.recovery_timeout
+
+    def is_available(self) -> bool:
+        """Whether allow_request() would currently let a call through, without reserving a trial"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'closed':
+                return True
+            if self.state == 'open':
+                return now - self.opened_at >= self.recovery_timeout
+            return self._trial_available(now)
+
+    def allow_request(self) -> bool:
+        """Whether a call may be sent to the provider now; reserves the trial call of a half-open circuit"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and now - self.opened_at >= self.recovery_timeout:
+                self.state = 'half_open'
+                self._trial_started_at = None
+            if self.state == 'half_open' and self._trial_available(now):
+                self._trial_started_at = now
+                return True
+            return False
+
+    def _record_latency(self, latency: float):
+        if self.avg_latency is None:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.latency_alpha * (latency - self.avg_latency)
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self._record_latency(latency)
+            self.total_successes += 1
+            self.consecutive_failures = 0
+            self.state = 'closed'
+            self._trial_started_at = None
+
+    def record_failure(self, latency: float, error=None):
+        with self._lock:
+            self._record_latency(latency)
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            self.last_failure_at = datetime.now().isoformat()
+            if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_started_at = None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == 'open':
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'total_successes': self.total_successes,
+                'total_failures': self.total_failures,
+                'avg_latency_ms': round(self.avg_latency * 1000, 1) if self.avg_latency is not None else None,
+                'last_error': self.last_error,
+                'last_failure_at': self.last_failure_at,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None
+            }
+
+class ProviderRouter:
+    """
+    Orders market data providers by health and latency, skipping open circuits and unconfigured providers
+
+    Health is tracked per (provider, request kind): daily bars and minute
+    bars are separate failure domains (a plan without minute data says
+    nothing about daily bars), so each kind has its own breakers and routing.
+    """
+
+    KINDS = ('daily', 'intraday')
+
+    def __init__(self, providers: List[MarketDataProvider]):
+        self.providers = providers
+        self.breakers = {
+            (provider.name, kind): CircuitBreaker(
+                f"{provider.name}:{kind}",
+                failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3')),
+                recovery_timeout=float(os.getenv('CIRCUIT_RECOVERY_SECONDS', '60'))
+            )
+            for provider in providers
+            for kind in self.KINDS
+        }
+
+    def breaker(self, provider: MarketDataProvider, kind: str = 'daily') -> CircuitBreaker:
+        """Circuit breaker of provider for one request kind (see KINDS)"""
+        return self.breakers[(provider.name, kind)]
+
+    def route(self, kind: str = 'daily') -> List[MarketDataProvider]:
+        """
+        Providers to try for one request kind, fastest healthy one first
+
+        Providers without latency history keep their configured priority
+        ahead of measured ones so each gets sampled. Callers must still call
+        allow_request() on the provider's breaker for the same kind right
+        before using it.
+        """
+        candidates = []
+        for priority, provider in enumerate(self.providers):
+            if not provider.is_configured():
+                continue
+            breaker = self.breaker(provider, kind)
+            latency = breaker.avg_latency if breaker.avg_latency is not None else -1.0
+            candidates.append((latency, priority, provider))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        return [provider for _, _, provider in candidates if self.breaker(provider, kind).is_available()]
+
+    def snapshot(self) -> dict:
+        """Daily-bar breaker state of each provider, with the other kinds nested under their names"""
+        return {
+            provider.name: {
+                'configured': provider.is_configured(),
+                **self.breaker(provider).snapshot(),
+                **{kind: self.breaker(provider, kind).snapshot() for kind in self.KINDS if kind != 'daily'}
+            }
+            for provider in self.providers
+        }
+
+# Vectorized technical indicators
+class BarResampler:
+    """
+    Incremental, vectorized aggregation of minute bars into coarser OHLCV bars
+
+    Chunks of minute bars (e.g. provider pages) are fed in time order with
+    add(). Each chunk is reduced at once with NumPy reduceat over its bucket
+    boundaries and only the aggregated bars plus the still open last bucket
+    are kept, so memory stays bounded by one chunk plus the output.
+
+    Intraday buckets are aligned to the 09:30 session open in market time
+    (a 1h bar covers 09:30-10:29); daily buckets are labeled at midnight like
+    the daily bar series. Bars outside regular trading hours are dropped
+    unless regular_hours is False.
+    """
+
+    SESSION_OPEN = MARKET_OPEN_TIME.hour * 60 + MARKET_OPEN_TIME.minute
+    SESSION_CLOSE = MARKET_CLOSE_TIME.hour * 60 + MARKET_CLOSE_TIME.minute
+    COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+    def __init__(self, interval: str, regular_hours: bool = True):
+        if interval not in BAR_INTERVALS:
+            raise ValueError(f"Unknown bar interval '{interval}'")
+        self.interval = interval
+        self.minutes = BAR_INTERVALS[interval]
+        self.regular_hours = regular_hours
+        self._keys = []
+        self._bars = []
+        self._pending = None
+
+    @staticmethod
+    def periods_per_year(interval: str) -> float:
+        """Bars per year at interval, for annualizing volatility (252 sessions of 390 minutes)"""
+        minutes = BAR_INTERVALS[interval]
+        return 252.0 if minutes is None else 252.0 * math.ceil(390 / minutes)
+
+    def _bucket_keys(self, minutes: np.ndarray) -> np.ndarray:
+        if self.minutes is None:
+            return minutes // 1440
+        return (minutes - self.SESSION_OPEN) // self.minutes
+
+    def add(self, bars: pd.DataFrame):
+        """Aggregate one time-ordered chunk of minute bars (any timezone; lowercase or capitalized columns)"""
+        if bars.empty:
+            return
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is not None:
+            index = index.tz_convert(MARKET_TZ).tz_localize(None)
+        minutes = index.to_numpy().astype('datetime64[m]').astype(np.int64)
+        values = [np.asarray(bars[name if name in bars.columns else name.lower()], dtype=np.float64)
+                  for name in self.COLUMNS]
+
+        keep = ~np.isnan(values[3])
+        if self.regular_hours:
+            minute_of_day = minutes % 1440
+            keep &= (minute_of_day >= self.SESSION_OPEN) & (minute_of_day < self.SESSION_CLOSE)
+        if not keep.all():
+            minutes = minutes[keep]
+            values = [column[keep] for column in values]
+        if not len(minutes):
+            return
+        if np.any(minutes[1:] < minutes[:-1]):
+            order = np.argsort(minutes, kind='stable')
+            minutes = minutes[order]
+            values = [column[order] for column in values]
+
+        keys = self._bucket_keys(minutes)
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        ends = np.append(starts[1:], len(keys)) - 1
+        open_, high, low, close, volume = values
+        aggregated = np.column_stack([
+            open_[starts],
+            np.maximum.reduceat(high, starts),
+            np.minimum.reduceat(low, starts),
+            close[ends],
+            np.add.reduceat(np.nan_to_num(volume), starts)
+        ])
+        bucket_keys = keys[starts]
+
+        if self._pending is not None:
+            pending_key, pending = self._pending
+            if bucket_keys[0] == pending_key:
+                # The chunk continues the last bucket of the previous one
+                first = aggregated[0]
+                first[0] = pending[0]
+                first[1] = max(first[1], pending[1])
+                first[2] = min(first[2], pending[2])
+                first[4] += pending[4]
+            else:
+                self._keys.append(np.array([pending_key]))
+                self._bars.append(pending[np.newaxis])
+        self._keys.append(bucket_keys[:-1])
+        self._bars.append(aggregated[:-1])
+        self._pending = (bucket_keys[-1], aggregated[-1])
+
+    def result(self) -> pd.DataFrame:
+        """Aggregated bars so far, including the last (possibly still incomplete) bucket"""
+        keys, bars = list(self._keys), list(self._bars)
+        if self._pending is not None:
+            keys.append(np.array([self._pending[0]]))
+            bars.append(self._pending[1][np.newaxis])
+        if not keys:
+            return pd.DataFrame(columns=list(self.COLUMNS), index=pd.DatetimeIndex([]))
+        keys = np.concatenate(keys)
+        minutes = keys * 1440 if self.minutes is None else keys * self.minutes + self.SESSION_OPEN
+        index = pd.DatetimeIndex(minutes.astype('datetime64[m]').astype('datetime64[ns]'))
+        return pd.DataFrame(np.concatenate(bars), index=index, columns=list(self.COLUMNS))
+
+    @classmethod
+    def resample(cls, bars: pd.DataFrame, interval: str, chunk_size: int = 100_000,
+                 regular_hours: bool = True) -> pd.DataFrame:
+        """Aggregate a frame of minute bars to interval, chunk_size rows at a time"""
+        resampler = cls(interval, regular_hours)
+        for start in range(0, len(bars), chunk_size):
+            resampler.add(bars.iloc[start:start + chunk_size])
+        return resampler.result()
+
+class IndicatorEngine:
+    """
+    Technical indicators on contiguous float64 arrays
+
+    Every function works along axis 0, so a 1-D price series and a 2-D
+    (dates x symbols) panel go through the same code. Rolling statistics are
+    O(n) differences of cumulative sums; a NaN anywhere in a window makes that
+    window NaN, matching pandas' rolling(window) with the default min_periods.
+    """
+
+    @staticmethod
+    def _window_sums(values: np.ndarray, window: int, powers=(1,)) -> tuple:
+        """
+        Rolling sums of values**p for each p in powers, plus the count of valid values per window
+
+        Values are shifted by their first valid observation before summing,
+        which keeps the cumulative sums small and the variance numerically stable.
+        """
+        valid = ~np.isnan(values)
+        first_valid = np.expand_dims(valid.argmax(axis=0), 0)
+        shift = np.nan_to_num(np.take_along_axis(values, first_valid, axis=0)[0]) if len(values) else 0.0
+        centered = np.where(valid, values - shift, 0.0)
+
+        def rolling(x):
+            cs = np.cumsum(x, axis=0)
+            out = cs.copy()
+            out[window:] -= cs[:-window]
+            return out
+
+        counts = rolling(valid.astype(np.int64))
+        return shift, counts, [rolling(centered ** p) for p in powers]
+
+    @staticmethod
+    def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+        shift, counts, (sums,) = IndicatorEngine._window_sums(values, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums / window + shift
+        mean[counts < window] = np.nan
+        return mean
+
+    @staticmethod
+    def rolling_mean_std(values: np.ndarray, window: int) -> tuple:
+        """Rolling mean and sample standard deviation (ddof=1) from one pass of cumulative sums"""
+        shift, counts, (sums, squares) = IndicatorEngine._window_sums(values, window, powers=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centered_mean = sums / window
+            variance = (squares - sums * centered_mean) / (window - 1)
+        np.maximum(variance, 0.0, out=variance)
+        mean = centered_mean + shift
+        std = np.sqrt(variance)
+        incomplete = counts < window
+        mean[incomplete] = np.nan
+        std[incomplete] = np.nan
+        return mean, std
+
+    @staticmethod
+    def ema(values: np.ndarray, span: int) -> np.ndarray:
+        """
+        Exponential moving average, equal to pandas ewm(span=span).mean() (adjust=True)
+
+        Both the weighted sum and the sum of weights are first-order IIR
+        filters, evaluated in C by scipy.signal.lfilter.
+        """
+        decay = 1.0 - 2.0 / (span + 1.0)
+        valid = ~np.isnan(values)
+        numerator = lfilter([1.0], [1.0, -decay], np.where(valid, values, 0.0), axis=0)
+        denominator = lfilter([1.0], [1.0, -decay], valid.astype(np.float64), axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return numerator / denominator
+
+    @staticmethod
+    def diff(values: np.ndarray) -> np.ndarray:
+        out = np.empty_like(values)
+        out[:1] = np.nan
+        np.subtract(values[1:], values[:-1], out=out[1:])
+        return out
+
+    @staticmethod
+    def pct_change(values: np.ndarray) -> np.ndarray:
+        out = np.empty_like(values)
+        out[:1] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            np.divide(values[1:], values[:-1], out=out[1:])
+        out[1:] -= 1.0
+        return out
+
+    @staticmethod
+    def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+        """Relative Strength Index over simple rolling means of gains and losses"""
+        delta = IndicatorEngine.diff(values)
+        gain = IndicatorEngine.rolling_mean(np.where(delta > 0, delta, 0.0), period)
+        loss = IndicatorEngine.rolling_mean(np.where(delta < 0, -delta, 0.0), period)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    # Dashboard indicators in /api/stock response order
+    INDICATORS = ('sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi', 'macd', 'macd_signal', 'bb_upper', 'bb_lower',
+                  'volatility', 'volume_sma', 'price_change', 'volume_change', 'high_low_ratio')
+
+    # Indicators and shared intermediates each one is derived from; '_close_20'
+    # is the single 20-day mean/std pass behind SMA_20 and the Bollinger bands
+    DEPENDENCIES = {
+        'sma_20': ('_close_20',),
+        'bb_upper': ('_close_20',),
+        'bb_lower': ('_close_20',),
+        'macd': ('ema_12', 'ema_26'),
+        'macd_signal': ('macd',),
+        'volatility': ('price_change',)
+    }
+
+    # name -> builder(columns, computed) for each indicator and intermediate
+    BUILDERS = {
+        '_close_20': lambda c, v: IndicatorEngine.rolling_mean_std(c['close'], 20),
+        'sma_20': lambda c, v: v['_close_20'][0],
+        'sma_50': lambda c, v: IndicatorEngine.rolling_mean(c['close'], 50),
+        'ema_12': lambda c, v: IndicatorEngine.ema(c['close'], 12),
+        'ema_26': lambda c, v: IndicatorEngine.ema(c['close'], 26),
+        'rsi': lambda c, v: IndicatorEngine.rsi(c['close'], 14),
+        'macd': lambda c, v: v['ema_12'] - v['ema_26'],
+        'macd_signal': lambda c, v: IndicatorEngine.ema(v['macd'], 9),
+        'bb_upper': lambda c, v: v['_close_20'][0] + 2 * v['_close_20'][1],
+        'bb_lower': lambda c, v: v['_close_20'][0] - 2 * v['_close_20'][1],
+        'volatility': lambda c, v: (IndicatorEngine.rolling_mean_std(v['price_change'], 20)[1]
+                                    * np.sqrt(c.get('periods_per_year', 252))),
+        'volume_sma': lambda c, v: IndicatorEngine.rolling_mean(c['volume'], 20),
+        'price_change': lambda c, v: IndicatorEngine.pct_change(c['close']),
+        'volume_change': lambda c, v: IndicatorEngine.pct_change(c['volume']),
+        'high_low_ratio': lambda c, v: IndicatorEngine._divide(c['high'], c['low'])
+    }
+
+    @staticmethod
+    def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return numerator / denominator
+
+    @classmethod
+    def resolve(cls, names) -> list:
+        """Names plus everything they depend on, ordered so dependencies come first"""
+        ordered = []
+
+        def visit(name):
+            if name in ordered:
+                return
+            for dependency in cls.DEPENDENCIES.get(name, ()):
+                visit(dependency)
+            ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    @staticmethod
+    def compute(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                volume: np.ndarray, names=None, periods_per_year: float = 252) -> dict:
+        """
+        Dashboard indicators in one pass
+
+        Args:
+            open_, high, low, close, volume: Bar columns as float arrays
+            names: Indicators to compute (default all of INDICATORS); their
+                dependencies are computed once and shared, but not returned
+            periods_per_year: Bars per year, for annualizing volatility
+
+        Returns:
+            dict of arrays keyed like the /api/stock response
+        """
+        names = IndicatorEngine.INDICATORS if names is None else names
+        columns = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume,
+                   'periods_per_year': periods_per_year}
+        computed = {}
+        for name in IndicatorEngine.resolve(names):
+            computed[name] = IndicatorEngine.BUILDERS[name](columns, computed)
+        return {name: computed[name] for name in names}
+
+    @staticmethod
+    def macd(values: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
+        line = IndicatorEngine.ema(values, fast) - IndicatorEngine.ema(values, slow)
+        signal_line = IndicatorEngine.ema(line, signal)
+        return {'macd': line, 'signal': signal_line, 'histogram': line - signal_line}
+
+    @staticmethod
+    def bollinger(values: np.ndarray, window: int = 20, num_std: float = 2.0) -> dict:
+        mean, std = IndicatorEngine.rolling_mean_std(values, window)
+        return {'middle': mean, 'upper': mean + num_std * std, 'lower': mean - num_std * std}
+
+    # Request-configurable indicators: name -> (parameter names, defaults, function(columns, *params)
+    # returning a dict of output arrays); the defaults are the dashboard windows
+    PARAMETERIZED = {
+        'sma': (('window',), (20,),
+                lambda c, window: {'sma': IndicatorEngine.rolling_mean(c['close'], window)}),
+        'ema': (('span',), (12,),
+                lambda c, span: {'ema': IndicatorEngine.ema(c['close'], span)}),
+        'rsi': (('period',), (14,),
+                lambda c, period: {'rsi': IndicatorEngine.rsi(c['close'], period)}),
+        'macd': (('fast', 'slow', 'signal'), (12, 26, 9),
+                 lambda c, fast, slow, signal: IndicatorEngine.macd(c['close'], fast, slow, signal)),
+        'bollinger': (('window', 'num_std'), (20, 2.0),
+                      lambda c, window, num_std: IndicatorEngine.bollinger(c['close'], window, num_std)),
+        'volatility': (('window',), (20,),
+                       lambda c, window: {'volatility': IndicatorEngine.rolling_mean_std(
+                           IndicatorEngine.pct_change(c['close']), window)[1]
+                           * np.sqrt(c.get('periods_per_year', 252))}),
+        'volume_sma': (('window',), (20,),
+                       lambda c, window: {'volume_sma': IndicatorEngine.rolling_mean(c['volume'], window)})
+    }
+
+    # Smallest window of indicators built on a sample standard deviation (ddof=1 needs two values)
+    MIN_WINDOW = {'bollinger': 2, 'volatility': 2}
+
+    @staticmethod
+    def compute_parameterized(columns: dict, name: str, params: tuple) -> dict:
+        """
+        One request-configurable indicator (see PARAMETERIZED)
+
+        Args:
+            columns: Bar columns as float arrays keyed open/high/low/close/volume,
+                optionally with periods_per_year (default 252)
+            name: Indicator name
+            params: Parameter values in PARAMETERIZED order
+
+        Returns:
+            dict of output arrays, e.g. macd/signal/histogram for 'macd'
+        """
+        return IndicatorEngine.PARAMETERIZED[name][2](columns, *params)
+
+    @staticmethod
+    def pack_observed(values: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        """
+        Move each column's observed rows to the bottom of a (dates x symbols) array, NaN above them
+        
+        Dates on which only other symbols traded would otherwise leave NaN gaps
+        inside a column's rolling windows; packed, every column holds just its
+        own bars in order, as when the symbol is computed on its own.
+        
+        Args:
+            values: 2-D array aligned with observed
+            observed: Which rows each column has a bar for (e.g. close is not NaN)
+        """
+        # Stable sort puts the unobserved rows first and keeps the observed ones in date order
+        order = np.argsort(observed, axis=0, kind='stable')
+        packed = np.take_along_axis(values, order, axis=0)
+        packed[~np.take_along_axis(observed, order, axis=0)] = np.nan
+        return packed
+
+    @staticmethod
+    def latest(values: np.ndarray, reference: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Value of each column of a (dates x symbols) array at its last observed date
+        
+        Args:
+            values: 2-D indicator array
+            reference: Array whose last non-NaN row defines each column's last
+                observed date (default values itself), e.g. the close panel
+        """
+        reference = values if reference is None else reference
+        observed = ~np.isnan(reference)
+        last = len(reference) - 1 - np.argmax(observed[::-1], axis=0)
+        latest = values[last, np.arange(values.shape[1])]
+        return np.where(observed.any(axis=0), latest, np.nan)
+
+    @staticmethod
+    def to_list(values: np.ndarray, fill: float = 0.0) -> list:
+        """NaN-filled Python list, the JSON form of a series"""
+        return np.where(np.isnan(values), fill, values).tolist()
+
+class RollingWindow:
+    def __init__(self, size: int):
+        """
+        Fixed-size ring buffer with a running sum and sum of squares
+
+        Pushing a value is O(1); the sums are recomputed from the buffer
+        every time it wraps around so floating point drift cannot build up.
+        Values are summed relative to the first value seen, as in
+        IndicatorEngine, to keep the variance numerically stable.
+
+        Args:
+            size: Number of most recent values the window holds
+        """
+        self.size = size
+        self.buffer = np.full(size, np.nan)
+        self.pos = 0
+        self.filled = 0
+        self.anchor = None
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.nan_count = 0
+
+    def push(self, value: float):
+        value = float(value)
+        if self.filled == self.size:
+            self._remove(float(self.buffer[self.pos]))
+        else:
+            self.filled += 1
+        self.buffer[self.pos] = value
+        self._add(value)
+        self.pos = (self.pos + 1) % self.size
+        if self.pos == 0:
+            self._resum()
+
+    def _add(self, value: float):
+        if math.isnan(value):
+            self.nan_count += 1
+            return
+        if self.anchor is None:
+            self.anchor = value
+        self.total += value - self.anchor
+        self.total_sq += (value - self.anchor) ** 2
+
+    def _remove(self, value: float):
+        if math.isnan(value):
+            self.nan_count -= 1
+            return
+        self.total -= value - self.anchor
+        self.total_sq -= (value - self.anchor) ** 2
+
+    def _resum(self):
+        if self.anchor is None:
+            return
+        centered = self.buffer[~np.isnan(self.buffer)] - self.anchor
+        self.total = float(centered.sum())
+        self.total_sq = float((centered ** 2).sum())
+
+    @property
+    def complete(self) -> bool:
+        """Whether the window holds size values and none of them is NaN"""
+        return self.filled == self.size and self.nan_count == 0
+
+    def mean(self) -> float:
+        if not self.complete:
+            return np.nan
+        return self.total / self.size + self.anchor
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1) of the window"""
+        if not self.complete:
+            return np.nan
+        variance = (self.total_sq - self.total * self.total / self.size) / (self.size - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def to_dict(self) -> dict:
+        return {
+            'size': self.size,
+            'values': [None if np.isnan(value) else value for value in self.buffer.tolist()],
+            'pos': self.pos,
+            'filled': self.filled,
+            'anchor': self.anchor
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'RollingWindow':
+        window = cls(state['size'])
+        window.buffer = np.array([np.nan if value is None else value for value in state['values']], dtype=np.float64)
+        window.pos = state['pos']
+        window.filled = state['filled']
+        window.anchor = state['anchor']
+        window.nan_count = int(np.isnan(window.buffer[:window.filled]).sum()) if window.filled < window.size \
+            else int(np.isnan(window.buffer).sum())
+        window._resum()
+        return window
+
+    @classmethod
+    def from_values(cls, size: int, values: np.ndarray) -> 'RollingWindow':
+        """Window as if every value of the series had been pushed in order"""
+        window = cls(size)
+        tail = np.asarray(values, dtype=np.float64)[-size:]
+        window.filled = len(tail)
+        window.buffer[:len(tail)] = tail
+        window.pos = len(tail) % size
+        window.nan_count = int(np.isnan(tail).sum())
+        valid = tail[~np.isnan(tail)]
+        window.anchor = float(valid[0]) if len(valid) else None
+        window._resum()
+        return window
+
+class IndicatorState:
+    """
+    Incrementally updated indicators of one symbol's bar series
+
+    Holds just enough of the recent past (rolling windows, EMA accumulators,
+    the previous bar) to add a bar in constant time with the same values
+    IndicatorEngine.compute would give for the whole series. The state is a
+    plain dict away from JSON via to_dict()/from_dict().
+    """
+
+    EMA_SPANS = {'ema_12': 12, 'ema_26': 26, 'macd_signal': 9}
+
+    def __init__(self):
+        self.windows = {
+            'close_20': RollingWindow(20),
+            'close_50': RollingWindow(50),
+            'gain_14': RollingWindow(14),
+            'loss_14': RollingWindow(14),
+            'returns_20': RollingWindow(20),
+            'volume_20': RollingWindow(20)
+        }
+        # Weighted sum and sum of weights of each adjusted EMA
+        self.emas = {name: [0.0, 0.0] for name in self.EMA_SPANS}
+        self.last_bar = None
+        self.prev_close = None
+        self.prev_volume = None
+        self.price_change = np.nan
+        self.volume_change = np.nan
+        self.last_date = None
+        self.count = 0
+
+    @staticmethod
+    def _decay(span: int) -> float:
+        return 1.0 - 2.0 / (span + 1.0)
+
+    @staticmethod
+    def _ratio(numerator: float, denominator: float) -> float:
+        """numerator / denominator with NumPy semantics (inf or NaN instead of ZeroDivisionError)"""
+        if denominator == 0:
+            if numerator == 0 or math.isnan(numerator):
+                return np.nan
+            return math.copysign(np.inf, numerator)
+        return numerator / denominator
+
+    def _ema(self, name: str) -> float:
+        weighted, weights = self.emas[name]
+        return weighted / weights if weights else np.nan
+
+    def _push_ema(self, name: str, value: float):
+        decay = self._decay(self.EMA_SPANS[name])
+        accumulator = self.emas[name]
+        valid = not math.isnan(value)
+        accumulator[0] = decay * accumulator[0] + (value if valid else 0.0)
+        accumulator[1] = decay * accumulator[1] + (1.0 if valid else 0.0)
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float,
+               date: Optional[str] = None) -> dict:
+        """
+        Append one bar and return the indicator values at that bar
+
+        Args:
+            open_, high, low, close, volume: The new bar
+            date: Optional ISO date or timestamp of the bar, kept as last_date
+        """
+        close, volume = float(close), float(volume)
+        if self.prev_close is None:
+            delta = self.price_change = self.volume_change = np.nan
+        else:
+            delta = close - self.prev_close
+            self.price_change = self._ratio(close, self.prev_close) - 1.0
+            self.volume_change = self._ratio(volume, self.prev_volume) - 1.0
+
+        self.windows['close_20'].push(close)
+        self.windows['close_50'].push(close)
+        self.windows['gain_14'].push(delta if delta > 0 else 0.0)
+        self.windows['loss_14'].push(-delta if delta < 0 else 0.0)
+        self.windows['returns_20'].push(self.price_change)
+        self.windows['volume_20'].push(volume)
+
+        self._push_ema('ema_12', close)
+        self._push_ema('ema_26', close)
+        self._push_ema('macd_signal', self._ema('ema_12') - self._ema('ema_26'))
+
+        self.last_bar = [float(open_), float(high), float(low), close, volume]
+        self.prev_close, self.prev_volume = close, volume
+        self.last_date = date
+        self.count += 1
+        return self.values()
+
+    def values(self) -> dict:
+        """Indicator values at the last bar, keyed like IndicatorEngine.compute"""
+        if self.last_bar is None:
+            return {}
+        windows = self.windows
+        sma_20, std_20 = windows['close_20'].mean(), windows['close_20'].std()
+        ema_12, ema_26 = self._ema('ema_12'), self._ema('ema_26')
+        gain, loss = windows['gain_14'].mean(), windows['loss_14'].mean()
+        rsi = 100.0 - 100.0 / (1.0 + self._ratio(gain, loss))
+        return {
+            'sma_20': sma_20,
+            'sma_50': windows['close_50'].mean(),
+            'ema_12': ema_12,
+            'ema_26': ema_26,
+            'rsi': rsi,
+            'macd': ema_12 - ema_26,
+            'macd_signal': self._ema('macd_signal'),
+            'bb_upper': sma_20 + 2 * std_20,
+            'bb_lower': sma_20 - 2 * std_20,
+            'volatility': windows['returns_20'].std() * np.sqrt(252),
+            'volume_sma': windows['volume_20'].mean(),
+            'price_change': self.price_change,
+            'volume_change': self.volume_change,
+            'high_low_ratio': self._ratio(self.last_bar[1], self.last_bar[2])
+        }
+
+    def copy(self) -> 'IndicatorState':
+        return IndicatorState.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        """JSON-serializable snapshot of the state (NaN becomes None)"""
+        def clean(value):
+            return None if value is None or np.isnan(value) else value
+        return {
+            'windows': {name: window.to_dict() for name, window in self.windows.items()},
+            'emas': {name: list(accumulator) for name, accumulator in self.emas.items()},
+            'last_bar': self.last_bar,
+            'prev_close': self.prev_close,
+            'prev_volume': self.prev_volume,
+            'price_change': clean(self.price_change),
+            'volume_change': clean(self.volume_change),
+            'last_date': self.last_date,
+            'count': self.count
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'IndicatorState':
+        state = cls()
+        state.windows = {name: RollingWindow.from_dict(window) for name, window in data['windows'].items()}
+        state.emas = {name: list(accumulator) for name, accumulator in data['emas'].items()}
+        state.last_bar = list(data['last_bar']) if data['last_bar'] is not None else None
+        state.prev_close = data['prev_close']
+        state.prev_volume = data['prev_volume']
+        state.price_change = np.nan if data['price_change'] is None else data['price_change']
+        state.volume_change = np.nan if data['volume_change'] is None else data['volume_change']
+        state.last_date = data['last_date']
+        state.count = data['count']
+        return state
+
+    @classmethod
+    def from_bars(cls, hist: pd.DataFrame) -> 'IndicatorState':
+        """
+        State after ingesting every bar of an OHLCV frame, built vectorized
+
+        Windows are seeded from the tail of each series and the EMA
+        accumulators from decay-weighted sums, so seeding is O(n) in NumPy
+        rather than n Python-level updates.
+        """
+        state = cls()
+        if hist.empty:
+            return state
+        open_, high, low, close, volume = (hist[column].to_numpy(dtype=np.float64)
+                                           for column in ('Open', 'High', 'Low', 'Close', 'Volume'))
+        delta = IndicatorEngine.diff(close)
+        price_change = IndicatorEngine.pct_change(close)
+        volume_change = IndicatorEngine.pct_change(volume)
+        state.windows = {
+            'close_20': RollingWindow.from_values(20, close),
+            'close_50': RollingWindow.from_values(50, close),
+            'gain_14': RollingWindow.from_values(14, np.where(delta > 0, delta, 0.0)),
+            'loss_14': RollingWindow.from_values(14, np.where(delta < 0, -delta, 0.0)),
+            'returns_20': RollingWindow.from_values(20, price_change),
+            'volume_20': RollingWindow.from_values(20, volume)
+        }
+
+        macd = IndicatorEngine.ema(close, 12) - IndicatorEngine.ema(close, 26)
+        for name, series in (('ema_12', close), ('ema_26', close), ('macd_signal', macd)):
+            weights = cls._decay(cls.EMA_SPANS[name]) ** np.arange(len(series) - 1, -1, -1, dtype=np.float64)
+            valid = ~np.isnan(series)
+            state.emas[name] = [float(weights[valid] @ series[valid]), float(weights[valid].sum())]
+
+        state.last_bar = [float(open_[-1]), float(high[-1]), float(low[-1]), float(close[-1]), float(volume[-1])]
+        state.prev_close, state.prev_volume = float(close[-1]), float(volume[-1])
+        state.price_change, state.volume_change = float(price_change[-1]), float(volume_change[-1])
+        state.last_date = hist.index[-1].strftime('%Y-%m-%d') if isinstance(hist.index, pd.DatetimeIndex) else None
+        state.count = len(hist)
+        return state
+
+# Binary columnar encodings of time-series responses
+class ColumnarFormat:
+    """
+    Content negotiation and encoders for binary time-series responses
+
+    Two encodings are offered next to the default JSON:
+
+    - Arrow IPC stream (application/vnd.apache.arrow.stream), when pyarrow
+      is installed. Float64 columns are handed to Arrow without copying.
+    - A packed format (application/x-columnar, also served for
+      application/octet-stream), laid out as:
+      b"COL1", a little-endian uint32 header length, a UTF-8 JSON header,
+      zero padding to an 8-byte boundary, then the column buffers. The
+      header's "columns" entries give each buffer's name, NumPy dtype string,
+      byte offset (from the start of the data section) and length. Dates
+      are int64 milliseconds since the epoch, volume is int64 and every
+      other series float32.
+
+    Undefined indicator values are NaN in both encodings, unlike JSON
+    where they are filled. Non-series fields (symbol, current_price,
+    company_info) travel in the header or the Arrow schema metadata.
+    """
+
+    ARROW = 'application/vnd.apache.arrow.stream'
+    PACKED = 'application/x-columnar'
+    MEDIA_TYPES = {ARROW: ARROW, PACKED: PACKED, 'application/octet-stream': PACKED}
+    MAGIC = b'COL1'
+
+    @staticmethod
+    def arrow_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @classmethod
+    def negotiate(cls, accept: Optional[str]) -> Optional[str]:
+        """
+        Binary media type to answer an Accept header with, or None for JSON
+
+        Media types are considered by descending q value; JSON wins whenever
+        it (or a wildcard) ranks at least as high as a binary type.
+        """
+        if not accept:
+            return None
+        ranked = []
+        for position, item in enumerate(accept.split(',')):
+            parts = [part.strip() for part in item.split(';')]
+            quality = 1.0
+            for param in parts[1:]:
+                if param.startswith('q='):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            if parts[0] and quality > 0:
+                ranked.append((-quality, position, parts[0].lower()))
+        for _, _, media_type in sorted(ranked):
+            if media_type in ('application/json', '*/*', 'application/*'):
+                return None
+            if media_type == cls.ARROW and not cls.arrow_available():
+                continue
+            if media_type in cls.MEDIA_TYPES:
+                return cls.MEDIA_TYPES[media_type]
+        return None
+
+    @classmethod
+    def encode(cls, media_type: str, columns: dict, metadata: dict) -> bytes:
+        if media_type == cls.ARROW:
+            return cls.to_arrow(columns, metadata)
+        return cls.pack(columns, metadata)
+
+    @staticmethod
+    def _packed_column(name: str, values: np.ndarray) -> np.ndarray:
+        if name == 'dates':
+            return values.astype('datetime64[ms]').view(np.int64).astype('<i8', copy=False)
+        if name == 'volume':
+            return np.nan_to_num(values, nan=0).astype('<i8', copy=False)
+        return np.ascontiguousarray(values, dtype='<f4')
+
+    @classmethod
+    def pack(cls, columns: dict, metadata: dict) -> bytes:
+        """Encode columns into the packed layout described on the class"""
+        buffers, layout, offset = [], [], 0
+        for name, values in columns.items():
+            buffer = cls._packed_column(name, values)
+            layout.append({'name': name, 'dtype': buffer.dtype.str, 'offset': offset, 'length': len(buffer)})
+            buffers.append(buffer)
+            padding = -buffer.nbytes % 8
+            if padding:
+                buffers.append(bytes(padding))
+            offset += buffer.nbytes + padding
+
+        rows = len(next(iter(columns.values()))) if columns else 0
+        header = json.dumps({**metadata, 'rows': rows, 'columns': layout}, default=str).encode('utf-8')
+        prefix = cls.MAGIC + len(header).to_bytes(4, 'little') + header
+        prefix += bytes(-len(prefix) % 8)
+        # One copy of each array buffer straight into the body, no per-element conversion
+        return b''.join([prefix, *buffers])
+
+    @staticmethod
+    def to_arrow(columns: dict, metadata: dict) -> bytes:
+        """Encode columns as an Arrow IPC stream with one record batch"""
+        import pyarrow as pa
+        # Arrow has day and second-or-finer units only; intraday bar times are minutes
+        arrays = [pa.array(values.astype('datetime64[s]') if values.dtype == np.dtype('datetime64[m]') else values)
+                  for values in columns.values()]
+        schema_metadata = {key: json.dumps(value, default=str) for key, value in metadata.items()}
+        batch = pa.RecordBatch.from_arrays(arrays, names=list(columns)).replace_schema_metadata(schema_metadata)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+
+class Downsampler:
+    """
+    Shape-preserving selection of at most max_points rows of a series, for charts
+
+    Both methods return sorted row indices that always include the first and
+    last rows, so every other series of the same dates (indicators, volume)
+    is downsampled consistently by indexing it with them.
+
+    - lttb: Largest-Triangle-Three-Buckets. Interior rows are split into
+      max_points - 2 buckets and from each the row forming the largest
+      triangle with its neighbouring buckets is kept. Classic LTTB anchors
+      each triangle on the row picked in the previous bucket, which makes it
+      sequential; here every bucket is scored at once against the previous
+      bucket's average, then rescored once against the rows picked in that
+      first pass.
+    - minmax: the lowest and highest row of each of (max_points - 2) / 2
+      buckets, so every spike survives.
+    """
+
+    METHODS = ('lttb', 'minmax')
+    MIN_POINTS = 3
+
+    @staticmethod
+    def indices(values: np.ndarray, max_points: int, method: str = 'lttb') -> np.ndarray:
+        n = len(values)
+        if n <= max_points:
+            return np.arange(n)
+        values = np.asarray(values, dtype=np.float64)
+        if method == 'minmax':
+            return Downsampler.minmax(values, max_points)
+        return Downsampler.lttb(values, max_points)
+
+    @staticmethod
+    def _buckets(start: int, stop: int, count: int) -> tuple:
+        """Starts and sizes of count contiguous, near-equal, non-empty buckets covering [start, stop)"""
+        edges = np.linspace(start, stop, count + 1).astype(np.int64)
+        return edges[:-1], np.diff(edges)
+
+    @staticmethod
+    def _argmax_per_bucket(scores: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        """Index of the first maximum of each bucket of scores (NaN never wins over a number)"""
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+        best = np.maximum.reduceat(scores, starts)
+        bucket_of = np.repeat(np.arange(len(starts)), sizes)
+        hits = np.flatnonzero(scores == best[bucket_of])
+        first = np.ones(len(hits), dtype=bool)
+        first[1:] = bucket_of[hits[1:]] != bucket_of[hits[:-1]]
+        return hits[first]
+
+    @staticmethod
+    def lttb(values: np.ndarray, max_points: int) -> np.ndarray:
+        n = len(values)
+        starts, sizes = Downsampler._buckets(1, n - 1, max_points - 2)
+        x = np.arange(n, dtype=np.float64)
+        y = np.where(np.isnan(values), np.nanmean(values) if not np.isnan(values).all() else 0.0, values)
+        mean_x = np.add.reduceat(x[:-1], starts) / sizes
+        mean_y = np.add.reduceat(y[:-1], starts) / sizes
+        # Right anchor: next bucket's average (the last row for the final bucket)
+        right_x = np.append(mean_x[1:], x[-1])
+        right_y = np.append(mean_y[1:], y[-1])
+        bucket_of = np.repeat(np.arange(len(starts)), sizes)
+        interior_x, interior_y = x[1:-1], y[1:-1]
+
+        def pick(left_x, left_y):
+            lx, ly, rx, ry = left_x[bucket_of], left_y[bucket_of], right_x[bucket_of], right_y[bucket_of]
+            area = np.abs((lx - rx) * (interior_y - ly) - (lx - interior_x) * (ry - ly))
+            return Downsampler._argmax_per_bucket(area, starts - 1, sizes) + 1
+
+        picked = pick(np.append(x[0], mean_x[:-1]), np.append(y[0], mean_y[:-1]))
+        picked = pick(np.append(x[0], x[picked[:-1]]), np.append(y[0], y[picked[:-1]]))
+        return np.concatenate(([0], picked, [n - 1]))
+
+    @staticmethod
+    def minmax(values: np.ndarray, max_points: int) -> np.ndarray:
+        n = len(values)
+        count = (max_points - 2) // 2
+        if count < 1:
+            return np.array([0, n - 1])
+        starts, sizes = Downsampler._buckets(1, n - 1, count)
+        interior = values[1:-1]
+        lows = Downsampler._argmax_per_bucket(-interior, starts - 1, sizes) + 1
+        highs = Downsampler._argmax_per_bucket(interior, starts - 1, sizes) + 1
+        return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+    @staticmethod
+    def take(columns: dict, indices: np.ndarray, length: int) -> dict:
+        """Rows indices of every array in columns that has length rows; other values are kept as is"""
+        return {name: values[indices] if isinstance(values, np.ndarray) and len(values) == length else values
+                for name, values in columns.items()}
+
+class StockAnalysis:
+    def __init__(self, analyzer: 'FinancialAnalyzer', symbol: str, hist: pd.DataFrame, version: str,
+                 fields: Optional[tuple] = None, interval: str = '1d'):
+        """
+        Memoized analysis of one symbol's bar series at one data version
+
+        The indicator arrays are computed once; the JSON payload and the
+        technical summary are derived from them on first use and kept, so
+        every endpoint showing this series reads the same results.
+
+        Args:
+            analyzer: FinancialAnalyzer providing the computations
+            symbol: Stock symbol
+            hist: OHLCV bars
+            version: Data version of hist (see FinancialAnalyzer.data_version)
+            fields: Restrict the analysis to these response fields; all when None
+            interval: Bar interval of hist (see BAR_INTERVALS)
+        """
+        self.analyzer = analyzer
+        self.symbol = symbol
+        self.version = version
+        self.fields = fields
+        self.interval = interval
+        self.columns = analyzer.compute_stock_columns(hist, fields, interval)
+        self.current_price = float(hist['Close'].iloc[-1]) if len(hist) else 0
+        self.close = hist['Close'].to_numpy(dtype=np.float64)
+        self._downsampled = {}
+
+    @functools.cached_property
+    def payload(self) -> dict:
+        """JSON form of /api/stock, without company info"""
+        return self.analyzer.stock_payload(self.symbol, self.columns, self.current_price, self.fields)
+
+    @functools.cached_property
+    def technical(self) -> dict:
+        """The /api/technical-analysis summary"""
+        return self.analyzer.technical_summary(self.symbol, self.payload)
+
+    def downsampled(self, downsample: tuple) -> tuple:
+        """
+        Columns and JSON payload reduced to at most max_points dates
+
+        Rows are picked from the close series (see Downsampler) and applied
+        to every series alike. The last few reductions are kept, since a
+        chart keeps asking for the same size.
+
+        Args:
+            downsample: (max_points, method)
+
+        Returns:
+            tuple of (columns, payload)
+        """
+        if len(self.close) <= downsample[0]:
+            return self.columns, self.payload
+        result = self._downsampled.get(downsample)
+        if result is None:
+            indices = Downsampler.indices(self.close, *downsample)
+            columns = Downsampler.take(self.columns, indices, len(self.close))
+            result = (columns, self.analyzer.stock_payload(self.symbol, columns, self.current_price, self.fields))
+            if len(self._downsampled) >= 8:
+                self._downsampled.pop(next(iter(self._downsampled)))
+            self._downsampled[downsample] = result
+        return result
+
+class ReturnsPanel:
+    def __init__(self, prices: pd.DataFrame, version: str):
+        """
+        Memoized daily returns of a set of symbols at one data version
+
+        Returns are taken on the trading dates every symbol has a close for,
+        so histories of different lengths are aligned by date. The annualized
+        moments and the portfolio built from them are computed on first use
+        and shared by every Markowitz endpoint asking for the same symbols.
+
+        Args:
+            prices: Date-aligned close panel (see FinancialAnalyzer.get_price_panel)
+            version: Data version of prices (see FinancialAnalyzer.panel_version)
+        """
+        self.version = version
+        self.returns = prices.dropna().pct_change().dropna()
+        self.symbols = self.returns.columns.tolist()
+        self._covariances = {}
+        self._portfolios = {}
+
+    @functools.cached_property
+    def expected_returns(self) -> pd.Series:
+        """Annualized mean daily returns"""
+        return self.returns.mean() * 252
+
+    @functools.cached_property
+    def cov_matrix(self) -> pd.DataFrame:
+        """Annualized sample covariance of daily returns"""
+        return pd.DataFrame(self.covariance('sample'), index=self.symbols, columns=self.symbols)
+
+    @functools.cached_property
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Correlation of daily returns, derived from the covariance matrix"""
+        std = np.sqrt(np.diag(self.cov_matrix.to_numpy()))
+        corr = self.cov_matrix.to_numpy() / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    def covariance(self, method: str = 'sample', n_factors: Optional[int] = None):
+        """Annualized covariance by the given estimator (see CovarianceEstimator), computed once per estimator"""
+        key = (method, n_factors if method == 'factor' else None)
+        cov = self._covariances.get(key)
+        if cov is None:
+            cov = CovarianceEstimator.estimate(self.returns.to_numpy(), method, n_factors)
+            self._covariances[key] = cov
+        return cov
+
+    def portfolio(self, cov_method: str = 'sample', n_factors: Optional[int] = None) -> 'MarkowitzPortfolio':
+        """MarkowitzPortfolio over these returns, built from the memoized moments"""
+        key = (cov_method, n_factors if cov_method == 'factor' else None)
+        portfolio = self._portfolios.get(key)
+        if portfolio is None:
+            portfolio = MarkowitzPortfolio.from_moments(self.expected_returns.to_numpy(dtype=np.float64),
+                                                        self.covariance(cov_method, n_factors), self.symbols)
+            portfolio.returns = self.returns
+            self._portfolios[key] = portfolio
+        return portfolio
+
+# Financial Analysis Class
+class FinancialAnalyzer:
+    # Per-date series of the /api/stock response, and all of its selectable fields in order
+    SERIES_FIELDS = ('open', 'high', 'low', 'close', 'volume') + IndicatorEngine.INDICATORS
+    STOCK_FIELDS = ('dates',) + SERIES_FIELDS + ('current_price', 'company_info')
+    
+    def __init__(self):
+        # Supported stocks
+        self.supported_stocks = [
+            'AAPL', 'GOOGL', 'MSFT', 'AMZN', 'TSLA', 'META', 'NVDA', 'NFLX',
+            'AMD', 'INTC', 'CRM', 'ADBE', 'PYPL', 'UBER', 'LYFT', 'SQ',
+            'ROKU', 'ZM', 'DOCU', 'OKTA', 'SNOW', 'PLTR', 'CRWD', 'NET'
+        ]
+        
+        # Initialize Alpaca API
+        try:
+            import alpaca_trade_api as tradeapi
+            self.alpaca_api = tradeapi.REST(
+                os.getenv('APCA_API_KEY_ID'),
+                os.getenv('APCA_SECRET_KEY'),
+                os.getenv('APCA_API_BASE_URL'),
+                api_version='v2'
+            )
+        except ImportError:
+            self.alpaca_api = None
+            logger.warning("Alpaca API not available - install alpaca-trade-api")
+        except Exception as e:
+            self.alpaca_api = None
+            logger.warning(f"Alpaca API initialization failed: {e}")
+        
+        # Polygon.io configuration
+        self.polygon_api_key = os.getenv('POLYGON_API_KEY')
+        self.polygon_base_url = os.getenv('POLYGON_BASE_URL')
+        
+        # Only use Alpaca and Polygon.io APIs
+        self.alpaca = AlpacaProvider(self.alpaca_api)
+        self.polygon = PolygonProvider(self.polygon_api_key, self.polygon_base_url)
+        self.yahoo = YahooProvider()
+        
+        # Circuit breakers and latency-aware ordering of the fallback chain
+        self.router = ProviderRouter([self.alpaca, self.polygon, self.yahoo])
+        
+        # Deduplication of concurrent identical fetches
+        self.inflight = SingleFlight()
+        
+        # Incremental indicator state of each symbol's daily series, up to the last completed session
+        self.indicator_states = {}
+        
+        # Company metadata changes rarely, so it gets its own long-lived cache
+        self.reference_cache = TTLCache(
+            max_entries=int(os.getenv('REFERENCE_CACHE_MAX_ENTRIES', '1024')),
+            ttl=float(os.getenv('REFERENCE_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        )
+        self.reference_miss_cache = TTLCache(max_entries=1024, ttl=300)
+        
+        # In-process cache of raw daily bars, shared by every endpoint
+        self.bar_cache = BarCache(
+            max_entries=int(os.getenv('BAR_CACHE_MAX_ENTRIES', '512')),
+            ttl=float(os.getenv('BAR_CACHE_TTL_SECONDS', '300'))
+        )
+        
+        # Memoized analyses keyed by (symbol, period, data version), so warmed symbols and parallel
+        # dashboard requests skip recomputation; new data changes the key, the TTL only bounds memory
+        self.analysis_cache = TTLCache(
+            max_entries=int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', str(self.bar_cache.max_entries))),
+            ttl=float(os.getenv('ANALYSIS_CACHE_TTL_SECONDS', '3600'))
+        )
+        
+        # Intraday bars aggregated from minute bars, refreshed often since the current bar keeps changing
+        self.intraday_cache = TTLCache(
+            max_entries=int(os.getenv('INTRADAY_CACHE_MAX_ENTRIES', '256')),
+            ttl=float(os.getenv('INTRADAY_CACHE_TTL_SECONDS', '60'))
+        )
+        
+        # Memoized parameterized indicators keyed by (symbol, period, interval, data version, indicator, params),
+        # so parameter sweeps only compute the combinations not requested before
+        self.indicator_cache = TTLCache(
+            max_entries=int(os.getenv('INDICATOR_CACHE_MAX_ENTRIES', '4096')),
+            ttl=float(os.getenv('ANALYSIS_CACHE_TTL_SECONDS', '3600'))
+        )
+        
+        # Returns panels and their moments keyed by (symbols, period, data version), shared by the Markowitz endpoints
+        self.returns_cache = TTLCache(
+            max_entries=int(os.getenv('RETURNS_CACHE_MAX_ENTRIES', '128')),
+            ttl=float(os.getenv('ANALYSIS_CACHE_TTL_SECONDS', '3600'))
+        )
+        
+        # Persistent bar store so restarts and new workers only fetch missing days
+        bar_store_dir = os.getenv('BAR_STORE_DIR', os.path.join(current_dir, 'data_store'))
+        try:
+            self.bar_store = BarStore(bar_store_dir) if bar_store_dir else None
+        except OSError as e:
+            self.bar_store = None
+            logger.warning(f"Bar store disabled, cannot use {bar_store_dir}: {e}")
+    
+    async def get_stock_data(self, symbol: str, period: str = "1y", include_company_info: bool = True,
+                             fields: Optional[tuple] = None, downsample: Optional[tuple] = None,
+                             interval: str = '1d') -> dict:
+        """
+        Fetch stock data using Alpaca and Polygon.io APIs with Yahoo Finance fallback
+        
+        Concurrent requests for the same (symbol, period) share one fetch and
+        one indicator computation, so callers must treat the result as read-only.
+        
+        Args:
+            symbol: Stock symbol
+            period: Time period for data
+            include_company_info: Embed Polygon.io company info (served from the reference-data cache)
+            fields: Only compute and return these fields (see resolve_stock_fields); all when None
+            downsample: (max_points, method) to reduce the series for charting (see resolve_downsampling)
+            interval: Bar interval (see BAR_INTERVALS); intraday bars are aggregated from minute bars
+        """
+        if fields is not None and 'company_info' not in fields:
+            include_company_info = False
+        if not include_company_info:
+            return await self._get_price_data(symbol, period, fields, downsample, interval)
+        
+        # Price data and company info are independent, so fetch them concurrently
+        data, polygon_info = await asyncio.gather(
+            self._get_price_data(symbol, period, fields, downsample, interval),
+            self.get_polygon_data(symbol, "1y")
+        )
+        if 'company_info' in data:
+            # Mock data carries its own placeholder company info
+            return data
+        return {**data, 'company_info': polygon_info.get('results', {}) if polygon_info else {}}
+    
+    async def _get_price_data(self, symbol: str, period: str, fields: Optional[tuple] = None,
+                              downsample: Optional[tuple] = None, interval: str = '1d') -> dict:
+        try:
+            analysis = await self.get_analysis(symbol, period, fields, interval)
+            if analysis is not None:
+                payload = analysis.payload if downsample is None else analysis.downsampled(downsample)[1]
+                return self.project_stock_data(payload, fields)
+            
+            # Final fallback: generate mock data for testing
+            return self.project_stock_data(
+                self.downsample_payload(self.mock_stock_data(symbol, period, interval), downsample), fields)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error for {symbol}: {e}")
+            raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
+    
+    async def get_analysis(self, symbol: str, period: str = "1y", fields: Optional[tuple] = None,
+                           interval: str = '1d') -> Optional[StockAnalysis]:
+        """
+        Memoized analysis of symbol's current bars, shared by every endpoint
+        
+        Keyed by (symbol, period, interval, data version): an analysis is
+        reused for as long as the underlying bars are unchanged. A full
+        analysis also answers requests restricted to fields; otherwise only
+        those fields are computed.
+        
+        Returns:
+            StockAnalysis, or None if no source could serve the bars
+        """
+        hist = await self.get_bars_shared(symbol, period, interval)
+        if hist is None:
+            return None
+        key = (symbol, period, interval, self.data_version(hist))
+        analysis = self.analysis_cache.get(key)
+        if analysis is None and fields is not None:
+            analysis = self.analysis_cache.get(key + (fields,))
+        if analysis is None:
+            analysis = StockAnalysis(self, symbol, hist, key[3], fields, interval)
+            self.analysis_cache.set(key if fields is None else key + (fields,), analysis)
+        return analysis
+    
+    async def get_bars_shared(self, symbol: str, period: str = "1y", interval: str = '1d') -> Optional[pd.DataFrame]:
+        """get_stock_bars (or get_intraday_bars) with concurrent identical calls coalesced into one"""
+        if interval != '1d':
+            return await self.inflight.do(('intraday', symbol, period, interval),
+                                          lambda: self.get_intraday_bars(symbol, period, interval))
+        return await self.inflight.do(('bars', symbol, period), lambda: self.get_stock_bars(symbol, period))
+    
+    async def get_intraday_bars(self, symbol: str, period: str = "1mo", interval: str = '5m') -> Optional[pd.DataFrame]:
+        """
+        Intraday OHLCV bars aggregated from upstream minute bars
+        
+        Minute bars are streamed from the first healthy provider in chunks
+        and folded into interval bars as they arrive (see BarResampler), so
+        the full minute series is never held in memory. Results are kept in
+        a short-lived cache; unlike daily bars they are not persisted.
+        
+        Returns:
+            DataFrame with Open/High/Low/Close/Volume columns indexed by bar
+            start in market time, or None if every source failed
+        """
+        key = (symbol, period, interval)
+        hist = self.intraday_cache.get(key)
+        if hist is not None:
+            return hist
+        
+        start_date, end_date = period_date_range(period)
+        for provider in self.router.route('intraday'):
+            breaker = self.router.breaker(provider, 'intraday')
+            if not breaker.allow_request():
+                continue
+            started = time.monotonic()
+            resampler = BarResampler(interval)
+            try:
+                async for chunk in provider.iter_minute_bars(symbol, start_date, end_date):
+                    resampler.add(chunk)
+            except NotImplementedError:
+                continue
+            except Exception as e:
+                breaker.record_failure(time.monotonic() - started, e)
+                logger.warning(f"{provider.name} minute bars failed for {symbol}: {e}")
+                continue
+            
+            # The provider answered; an empty result only means it has no
+            # minute bars for this range (plan or lookback limits), not that
+            # it is unhealthy
+            breaker.record_success(time.monotonic() - started)
+            hist = resampler.result()
+            if hist.empty:
+                logger.info(f"{provider.name} has no minute data for {symbol}")
+                continue
+            
+            logger.info(f"Got {len(hist)} {interval} bars for {symbol} from {provider.name}")
+            self.intraday_cache.set(key, hist)
+            return hist
+        
+        return None
+    
+    @staticmethod
+    def data_version(hist: pd.DataFrame) -> str:
+        """Identifier of a bar series' contents: last date, length and a checksum of closes and volumes"""
+        if hist.empty:
+            return 'empty'
+        checksum = zlib.crc32(np.ascontiguousarray(hist[['Close', 'Volume']].to_numpy(dtype=np.float64)).tobytes())
+        last = hist.index[-1]
+        return f"{last.strftime('%Y-%m-%d' if last == last.normalize() else '%Y-%m-%dT%H:%M')}-{len(hist)}-{checksum:08x}"
+    
+    @staticmethod
+    def panel_version(prices: pd.DataFrame) -> str:
+        """Identifier of a price panel's contents: last date, shape and a checksum of the prices"""
+        if prices.empty:
+            return 'empty'
+        checksum = zlib.crc32(np.ascontiguousarray(prices.to_numpy(dtype=np.float64)).tobytes())
+        return f"{prices.index[-1].strftime('%Y-%m-%d')}-{prices.shape[0]}x{prices.shape[1]}-{checksum:08x}"
+    
+    async def get_stock_bars(self, symbol: str, period: str = "1y") -> Optional[pd.DataFrame]:
+        """
+        Fetch raw daily OHLCV bars through the bar cache and the on-disk bar store
+        
+        Only the trailing days missing from the bar store are fetched from
+        upstream, together with the last stored final day to check that the
+        stored history is still on the provider's price scale; a full fetch
+        replaces the stored history when it is not, or when the store does
+        not reach back to the start of the requested period.
+        
+        Returns:
+            DataFrame with Open/High/Low/Close/Volume columns, or None if every source failed
+        """
+        start_date, end_date = period_date_range(period)
+        hist = self.bar_cache.get_range(symbol, start_date, end_date)
+        if hist is not None:
+            logger.info(f"Got {len(hist)} data points for {symbol} from bar cache")
+            return hist
+        
+        covered, gap_start = self._store_coverage(symbol, start_date)
+        if covered:
+            consistent = True
+            if gap_start is not None:
+                fetch_start = await asyncio.to_thread(self._gap_fill_start, symbol, gap_start)
+                fetched = await self.fetch_bars(symbol, period, datetime.combine(fetch_start, dt_time()), end_date)
+                if fetched is not None:
+                    consistent = await asyncio.to_thread(self._store_gap_fill, symbol, fetched[0], fetched[2],
+                                                         gap_start)
+            if consistent:
+                hist = await self._load_stored_bars(symbol, start_date, end_date)
+                if hist is not None:
+                    return hist
+        
+        fetched = await self.fetch_bars(symbol, period)
+        if fetched is None:
+            return None
+        hist, covered_start, provider = fetched
+        await self._save_bars(symbol, hist, covered_start, end_date, provider)
+        return hist
+    
+    async def get_stock_bars_batch(self, symbols: List[str], period: str = "1y") -> dict:
+        """
+        Fetch raw daily bars for many symbols at once
+        
+        Cache and store hits are served locally; the remaining symbols are
+        fetched with the providers' multi-symbol calls (Alpaca multi-symbol
+        bars, yf.download with a ticker list, concurrent Polygon.io requests)
+        instead of one round trip per symbol.
+        
+        Returns:
+            dict: {symbol: bars} for every symbol some source could serve
+        """
+        start_date, end_date = period_date_range(period)
+        bars = {}
+        gaps = {}
+        stored = []
+        full_fetch = []
+        
+        for symbol in dict.fromkeys(symbols):
+            hist = self.bar_cache.get_range(symbol, start_date, end_date)
+            if hist is not None:
+                bars[symbol] = hist
+                continue
+            covered, gap_start = self._store_coverage(symbol, start_date)
+            if not covered:
+                full_fetch.append(symbol)
+            elif gap_start is None:
+                stored.append(symbol)
+            else:
+                gaps[symbol] = gap_start
+        
+        # Store lookups and writes run in worker threads side by side
+        fetch_starts = await asyncio.gather(
+            *(asyncio.to_thread(self._gap_fill_start, symbol, gap_start) for symbol, gap_start in gaps.items())
+        )
+        gap_groups = {}
+        for (symbol, gap_start), fetch_start in zip(gaps.items(), fetch_starts):
+            gap_groups.setdefault(fetch_start, []).append((symbol, gap_start))
+        
+        async def fill_gaps(fetch_start, group):
+            gap_starts = dict(group)
+            fetched = await self.fetch_bars_batch(list(gap_starts), datetime.combine(fetch_start, dt_time()),
+                                                  end_date, explicit_range=True)
+            appended = await asyncio.gather(
+                *(asyncio.to_thread(self._store_gap_fill, symbol, hist, provider, gap_starts[symbol])
+                  for symbol, (hist, provider) in fetched.items())
+            )
+            return [symbol for symbol, ok in zip(fetched, appended) if not ok]
+        
+        async def fetch_full():
+            return await self.fetch_bars_batch(full_fetch, start_date, end_date) if full_fetch else {}
+        
+        # Gap fills (one batch per distinct fetch start) and full fetches run concurrently
+        *rebuilds, fetched = await asyncio.gather(
+            *(fill_gaps(fetch_start, group) for fetch_start, group in gap_groups.items()),
+            fetch_full()
+        )
+        
+        # Stored histories no longer on the providers' price scale are replaced by a full fetch
+        rebuild = [symbol for group in rebuilds for symbol in group]
+        if rebuild:
+            fetched.update(await self.fetch_bars_batch(rebuild, start_date, end_date))
+            full_fetch.extend(rebuild)
+        
+        to_load = [symbol for symbol in stored + list(gaps) if symbol not in rebuild]
+        loaded = await asyncio.gather(*(self._load_stored_bars(symbol, start_date, end_date) for symbol in to_load))
+        for symbol, hist in zip(to_load, loaded):
+            if hist is not None:
+                bars[symbol] = hist
+            else:
+                full_fetch.append(symbol)
+        
+        await asyncio.gather(
+            *(self._save_bars(symbol, hist, start_date, end_date, provider) for symbol, (hist, provider) in fetched.items())
+        )
+        bars.update({symbol: hist for symbol, (hist, _) in fetched.items()})
+        
+        # Symbols no batch call could serve go through the single-symbol chain and its retries
+        leftovers = [symbol for symbol in full_fetch if symbol not in bars]
+        if leftovers:
+            results = await asyncio.gather(*(self.get_stock_bars(symbol, period) for symbol in leftovers))
+            bars.update({symbol: hist for symbol, hist in zip(leftovers, results) if hist is not None})
+        
+        return {symbol: bars[symbol] for symbol in dict.fromkeys(symbols) if symbol in bars}
+    
+    async def get_price_panel(self, symbols: List[str], period: str = "1y", field: str = 'Close',
+                              mock_fallback: bool = True) -> pd.DataFrame:
+        """
+        Fetch one bar field for many symbols as a date-aligned panel
+        
+        Args:
+            symbols: Stock symbols
+            period: Time period for data
+            field: Bar column to extract (Open, High, Low, Close, Volume)
+            mock_fallback: Fill symbols no source could serve with mock data, like get_stock_data
+            
+        Returns:
+            DataFrame indexed by trading date with one column per symbol (NaN where a symbol has no bar)
+        """
+        panels = await self.get_bar_panels(symbols, period, fields=(field,), mock_fallback=mock_fallback)
+        return panels.get(field, pd.DataFrame())
+    
+    async def get_returns_panel(self, symbols: List[str], period: str = "1y",
+                                min_observations: int = 30) -> ReturnsPanel:
+        """
+        Date-aligned daily returns of symbols with memoized moments
+        
+        Panels are cached by (symbols, period, data version), so the Markowitz
+        endpoints share one returns matrix, mean vector and covariance matrix
+        per symbol set until new bars arrive.
+        
+        Args:
+            symbols: Stock symbols (duplicates are ignored)
+            period: Time period for data
+            min_observations: Fewest common return dates accepted
+            
+        Returns:
+            ReturnsPanel
+        """
+        symbols = list(dict.fromkeys(symbols))
+        prices = await self.get_price_panel(symbols, period)
+        if prices.empty:
+            raise HTTPException(status_code=404, detail="No data found for any symbols")
+        
+        key = (tuple(symbols), period, self.panel_version(prices))
+        panel = self.returns_cache.get(key)
+        if panel is None:
+            panel = ReturnsPanel(prices, key[2])
+            self.returns_cache.set(key, panel)
+        
+        if len(panel.returns) < min_observations:
+            raise HTTPException(status_code=400, detail="Insufficient data for analysis")
+        return panel
+    
+    async def get_bar_panels(self, symbols: List[str], period: str = "1y",
+                             fields: tuple = ('Open', 'High', 'Low', 'Close', 'Volume'),
+                             mock_fallback: bool = True) -> dict:
+        """
+        Fetch several bar fields for many symbols as date-aligned panels
+        
+        Returns:
+            dict: {field: DataFrame indexed by trading date with one column per
+            symbol, NaN where a symbol has no bar}; empty if no symbol could be served
+        """
+        bars = await self.get_stock_bars_batch(symbols, period)
+        frames = {symbol: hist[list(fields)] for symbol, hist in bars.items()}
+        
+        for symbol in dict.fromkeys(symbols):
+            if symbol not in frames and mock_fallback:
+                logger.warning(f"All data sources failed for {symbol}, using mock data in price panel")
+                mock = self.generate_mock_data(symbol, period)
+                frames[symbol] = pd.DataFrame({field: mock[field.lower()] for field in fields},
+                                              index=pd.to_datetime(mock['dates']), dtype=float)
+        
+        if not frames:
+            return {}
+        order = [symbol for symbol in dict.fromkeys(symbols) if symbol in frames]
+        combined = pd.concat([frames[symbol] for symbol in order], axis=1, keys=order).sort_index()
+        return {field: combined.xs(field, axis=1, level=1) for field in fields}
+    
+    # Operators accepted by screen filters
+    SCREEN_OPERATORS = {'<=': operator.le, '>=': operator.ge, '==': operator.eq, '!=': operator.ne,
+                        '<': operator.lt, '>': operator.gt}
+    SCREEN_FILTER_PATTERN = re.compile(r'^\s*([a-z_0-9]+)\s*(<=|>=|==|!=|<|>)\s*([a-z_0-9.+-]+)\s*$')
+    
+    def parse_screen_filters(self, filters: Optional[str]) -> list:
+        """
+        Parse comma-separated screen conditions such as "rsi<30,sma_20>sma_50"
+        
+        Each condition compares a series (see SERIES_FIELDS) with a number or
+        another series; all conditions must hold.
+        
+        Returns:
+            list of (left field, operator symbol, right field or float)
+        """
+        conditions = []
+        for text in (filters or '').lower().split(','):
+            if not text.strip():
+                continue
+            match = self.SCREEN_FILTER_PATTERN.match(text)
+            if not match:
+                raise HTTPException(status_code=400, detail=f"Invalid filter '{text.strip()}', expected e.g. rsi<30")
+            left, op, right = match.groups()
+            try:
+                right = float(right)
+            except ValueError:
+                if right not in self.SERIES_FIELDS:
+                    raise HTTPException(status_code=400, detail=f"Unknown field '{right}' in filter")
+            if left not in self.SERIES_FIELDS:
+                raise HTTPException(status_code=400, detail=f"Unknown field '{left}' in filter")
+            conditions.append((left, op, right))
+        return conditions
+    
+    async def screen(self, symbols: List[str], period: str = "1y", conditions: Optional[list] = None,
+                     fields: tuple = ('close',)) -> dict:
+        """
+        Evaluate screen conditions on the latest values of many symbols at once
+        
+        Bars are fetched in one batch and every needed indicator is computed a
+        single time on (dates x symbols) arrays, instead of one pipeline per symbol.
+        Each symbol's bars are packed together first (see IndicatorEngine.pack_observed),
+        so dates a symbol did not trade do not break its rolling windows.
+        
+        Args:
+            symbols: Stock symbols to screen
+            period: History used for the indicators
+            conditions: Parsed filters (see parse_screen_filters); no filtering when empty
+            fields: Series whose latest values are returned for each match
+        """
+        conditions = conditions or []
+        needed = list(dict.fromkeys([*fields, *(c[0] for c in conditions),
+                                     *(c[2] for c in conditions if isinstance(c[2], str))]))
+        panels = await self.get_bar_panels(symbols, period, mock_fallback=False)
+        if not panels:
+            return {'as_of': None, 'screened': 0, 'matched': [], 'results': {}, 'missing': list(symbols)}
+        
+        observed = panels['Close'].notna().to_numpy()
+        arrays = {field: IndicatorEngine.pack_observed(panel.to_numpy(dtype=np.float64), observed)
+                  for field, panel in panels.items()}
+        columns = list(panels['Close'].columns)
+        series = {field.lower(): values for field, values in arrays.items() if field.lower() in needed}
+        series.update(IndicatorEngine.compute(arrays['Open'], arrays['High'], arrays['Low'], arrays['Close'],
+                                              arrays['Volume'],
+                                              names=[name for name in IndicatorEngine.INDICATORS if name in needed]))
+        latest = {name: IndicatorEngine.latest(values, arrays['Close']) for name, values in series.items()}
+        
+        mask = np.ones(len(columns), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            for left, op, right in conditions:
+                mask &= self.SCREEN_OPERATORS[op](latest[left], latest[right] if isinstance(right, str) else right)
+        
+        dates = panels['Close'].index
+        last_rows = len(dates) - 1 - np.argmax(observed[::-1], axis=0)
+        matched = [columns[i] for i in np.flatnonzero(mask)]
+        return {
+            'as_of': dates[-1].strftime('%Y-%m-%d'),
+            'screened': len(columns),
+            'matched': matched,
+            'results': {
+                columns[i]: {'as_of': dates[last_rows[i]].strftime('%Y-%m-%d'),
+                             **{name: latest[name][i] for name in fields}}
+                for i in np.flatnonzero(mask)
+            },
+            'missing': [symbol for symbol in dict.fromkeys(symbols) if symbol not in panels['Close'].columns]
+        }
+    
+    async def get_indicator_state(self, symbol: str) -> Optional[IndicatorState]:
+        """
+        Indicator state of symbol's 1y daily series as of the last completed session
+        
+        An existing state is advanced by just the bars appended since it was
+        built (e.g. after a bar store gap fill); it is only rebuilt from the
+        full series when the stored history no longer matches it.
+        """
+        hist = await self.get_bars_shared(symbol, "1y")
+        if hist is None or hist.empty:
+            return None
+        hist = hist[hist.index <= pd.Timestamp(last_completed_session())]
+        if hist.empty:
+            return None
+        
+        state = self.indicator_states.get(symbol)
+        last_date = hist.index[-1].strftime('%Y-%m-%d')
+        if state is not None and state.last_date == last_date:
+            return state
+        
+        if state is not None and state.last_date is not None:
+            anchor = pd.Timestamp(state.last_date)
+            if anchor in hist.index and np.isclose(hist.at[anchor, 'Close'], state.prev_close):
+                state = state.copy()
+                for date, bar in hist[hist.index > anchor].iterrows():
+                    state.update(bar['Open'], bar['High'], bar['Low'], bar['Close'], bar['Volume'],
+                                 date=date.strftime('%Y-%m-%d'))
+                self.indicator_states[symbol] = state
+                return state
+        
+        state = IndicatorState.from_bars(hist)
+        self.indicator_states[symbol] = state
+        return state
+    
+    def _store_coverage(self, symbol: str, start_date: datetime) -> tuple:
+        """
+        Check the bar store against a requested range
+        
+        Returns:
+            tuple: (whether the store reaches back to start_date, first day to gap-fill or None if up to date)
+        """
+        coverage = self.bar_store.coverage(symbol) if self.bar_store else None
+        if not coverage or coverage[0] > start_date.date():
+            return False, None
+        gap_start = coverage[1] + timedelta(days=1)
+        return True, (gap_start if gap_start <= latest_expected_session() else None)
+    
+    def _gap_fill_start(self, symbol: str, gap_start):
+        """First day of a gap fill: the last stored final day, so the fetch overlaps the stored history"""
+        anchor = self.bar_store.last_bar(symbol, gap_start - timedelta(days=1))
+        return anchor[0] if anchor else gap_start
+    
+    def _store_gap_fill(self, symbol: str, hist: pd.DataFrame, provider: MarketDataProvider, gap_start) -> bool:
+        """
+        Append gap-fill bars to the bar store if they are on the stored bars' price scale
+        
+        The stored bars must have the provider's adjustment type, and the
+        last stored final day (fetched again by the gap fill, see
+        _gap_fill_start) must still close at the stored price; a split or
+        dividend adjusted since the bars were stored changes it.
+        
+        Returns:
+            bool: False, with the store unchanged, when the stored history has to be rebuilt
+        """
+        meta = self.bar_store.metadata(symbol) or {}
+        if meta.get('adjustment') != provider.adjustment:
+            logger.info(f"Stored bars of {symbol} are {meta.get('adjustment') or 'of unknown adjustment'}, "
+                        f"{provider.name} serves {provider.adjustment}-adjusted bars; rebuilding")
+            return False
+        anchor = self.bar_store.last_bar(symbol, gap_start - timedelta(days=1))
+        if anchor is not None:
+            close = hist['Close'].get(pd.Timestamp(anchor[0]))
+            if close is None or not math.isclose(close, anchor[1], rel_tol=1e-6):
+                logger.info(f"Stored close of {symbol} on {anchor[0]} no longer matches {provider.name}; rebuilding")
+                return False
+        self.bar_store.write(symbol, hist, gap_start, last_completed_session(), provider.name, provider.adjustment)
+        return True
+    
+    async def _load_stored_bars(self, symbol: str, start_date: datetime,
+                                end_date: datetime) -> Optional[pd.DataFrame]:
+        """Read bars from the bar store and put them in the bar cache"""
+        hist = await asyncio.to_thread(self.bar_store.load, symbol, start_date)
+        if hist is None or hist.empty:
+            return None
+        logger.info(f"Got {len(hist)} data points for {symbol} from bar store")
+        self.bar_cache.put(symbol, start_date, end_date, hist)
+        return hist
+    
+    async def _save_bars(self, symbol: str, hist: pd.DataFrame, covered_start: datetime, end_date: datetime,
+                         provider: MarketDataProvider):
+        """Persist freshly fetched bars to the bar cache, replacing the stored history of symbol"""
+        if self.bar_store:
+            await asyncio.to_thread(self.bar_store.write, symbol, hist, covered_start.date(), last_completed_session(),
+                                    provider.name, provider.adjustment, True)
+        self.bar_cache.put(symbol, covered_start, end_date, hist)
+    
+    async def fetch_bars(self, symbol: str, period: str, start_date: Optional[datetime] = None,
+                   end_date: Optional[datetime] = None) -> Optional[tuple]:
+        """
+        Fetch daily bars from upstream, walking the healthy providers in routing order
+        
+        Args:
+            symbol: Stock symbol
+            period: Time period, used when no explicit date range is given
+            start_date: Optional start of an explicit date range (e.g. a gap to fill)
+            end_date: Optional end of an explicit date range
+            
+        Returns:
+            tuple: (normalized bars, start date actually requested, provider), or None if every source failed
+        """
+        explicit_range = start_date is not None
+        if not explicit_range:
+            start_date, end_date = period_date_range(period)
+        
+        # Healthy providers only, fastest first (see ProviderRouter)
+        for provider in self.router.route():
+            breaker = self.router.breaker(provider)
+            if not breaker.allow_request():
+                continue
+            started = time.monotonic()
+            try:
+                if provider is self.yahoo:
+                    hist, covered_start = await self.get_yahoo_data(symbol, start_date, end_date, explicit_range)
+                else:
+                    hist, covered_start = await provider.get_bars(symbol, start_date, end_date), start_date
+            except Exception as e:
+                breaker.record_failure(time.monotonic() - started, e)
+                logger.warning(f"{provider.name} failed for {symbol}: {e}")
+                continue
+            
+            if hist.empty:
+                if explicit_range:
+                    # A healthy provider with nothing in a short gap means there are no new sessions yet
+                    breaker.record_success(time.monotonic() - started)
+                    return None
+                breaker.record_failure(time.monotonic() - started, f"no data for {symbol}")
+                logger.warning(f"{provider.name} returned no data for {symbol}")
+                continue
+            
+            breaker.record_success(time.monotonic() - started)
+            logger.info(f"Got {len(hist)} data points for {symbol} from {provider.name}")
+            return self.normalize_bars(hist), covered_start, provider
+        
+        return None
+    
+    async def fetch_bars_batch(self, symbols: List[str], start_date: datetime, end_date: datetime,
+                               explicit_range: bool = False) -> dict:
+        """
+        Fetch daily bars for several symbols from upstream, walking the healthy providers in routing order
+        
+        Each provider is asked only for the symbols earlier providers could not serve.
+        
+        Returns:
+            dict: {symbol: (normalized bars, provider)}
+        """
+        remaining = list(symbols)
+        fetched = {}
+        for provider in self.router.route():
+            if not remaining:
+                break
+            breaker = self.router.breaker(provider)
+            if not breaker.allow_request():
+                continue
+            started = time.monotonic()
+            try:
+                batch = await provider.get_bars_batch(remaining, start_date, end_date)
+            except Exception as e:
+                breaker.record_failure(time.monotonic() - started, e)
+                logger.warning(f"{provider.name} batch failed for {len(remaining)} symbols: {e}")
+                continue
+            
+            batch = {symbol: hist for symbol, hist in batch.items() if not hist.empty}
+            if not batch and not explicit_range:
+                breaker.record_failure(time.monotonic() - started, f"no data for {len(remaining)} symbols")
+                logger.warning(f"{provider.name} returned no data for {remaining}")
+                continue
+            
+            breaker.record_success(time.monotonic() - started)
+            logger.info(f"Got bars for {len(batch)} of {len(remaining)} symbols from {provider.name}")
+            for symbol, hist in batch.items():
+                fetched[symbol] = self.normalize_bars(hist), provider
+            if explicit_range:
+                # Symbols a healthy provider has nothing for in a short gap have no new sessions yet
+                break
+            remaining = [symbol for symbol in remaining if symbol not in fetched]
+        
+        return fetched
+    
+    async def get_yahoo_data(self, symbol: str, start_date: datetime, end_date: datetime,
+                             explicit_range: bool = False) -> tuple:
+        """
+        Fetch daily bars from Yahoo Finance, retrying with shorter periods and yf.download
+        
+        Returns:
+            tuple: (bars, start date actually requested); bars are empty if every attempt failed
+        """
+        attempts = [
+            {'start': start_date, 'end': end_date, 'interval': '1d'},
+            {'period': '1y', 'interval': '1d'},
+            {'period': '6mo', 'interval': '1d'},
+            {'period': '3mo', 'interval': '1d'},
+            {'period': '1mo', 'interval': '1d'},
+        ]
+        
+        for attempt in attempts:
+            try:
+                if 'period' in attempt:
+                    if explicit_range:
+                        # Fixed-period retries only make sense for full-history fetches
+                        continue
+                    attempt_start = period_date_range(attempt['period'], end_date)[0]
+                    hist = await self.yahoo.history(symbol, period=attempt['period'], interval=attempt['interval'])
+                    min_rows = 10
+                else:
+                    attempt_start = start_date
+                    hist = await self.yahoo.get_bars(symbol, attempt['start'], attempt['end'])
+                    min_rows = 0 if explicit_range else 10
+                if not hist.empty and len(hist) > min_rows:
+                    return hist, attempt_start
+            except Exception as e:
+                logger.warning(f"Yahoo Finance attempt failed for {symbol} with {attempt}: {e}")
+                continue
+        
+        # Last resort: try Yahoo Finance download
+        try:
+            hist = await self.yahoo.download(symbol, start=start_date.strftime('%Y-%m-%d'),
+                                             end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'))
+            if not hist.empty:
+                return hist, start_date
+        except Exception as e:
+            logger.warning(f"Yahoo Finance download failed for {symbol}: {e}")
+        
+        return pd.DataFrame(), start_date
+    
+    def normalize_bars(self, hist: pd.DataFrame) -> pd.DataFrame:
+        """
+        Bring provider-specific bar frames into one shape
+        
+        Alpaca returns lowercase columns with a UTC index, Yahoo Finance a
+        New York index (and MultiIndex columns from yf.download), Polygon.io
+        a New York (MARKET_TZ) index built from its millisecond timestamps.
+        The result has Open/High/Low/Close/Volume columns and a sorted, naive,
+        date-normalized DatetimeIndex without duplicates.
+        """
+        hist = hist.copy()
+        if isinstance(hist.columns, pd.MultiIndex):
+            hist.columns = hist.columns.get_level_values(0)
+        hist = hist.rename(columns={'open': 'Open', 'high': 'High', 'low': 'Low',
+                                    'close': 'Close', 'volume': 'Volume'})
+        hist = hist[['Open', 'High', 'Low', 'Close', 'Volume']]
+        
+        index = pd.DatetimeIndex(hist.index)
+        if index.tz is not None:
+            index = index.tz_convert('America/New_York').tz_localize(None)
+        hist.index = index.normalize()
+        
+        hist = hist[~hist.index.duplicated(keep='last')].sort_index()
+        return hist.dropna(subset=['Close'])
+    
+    async def get_polygon_data(self, symbol: str, period: str) -> dict:
+        """Fetch additional data from Polygon.io, cached as long-lived reference data"""
+        if not self.polygon.is_configured():
+            return {}
+        return await self.get_reference_data(('polygon_ticker', symbol),
+                                              lambda: self.polygon.get_ticker_details(symbol))
+    
+    async def get_yahoo_info(self, symbol: str) -> dict:
+        """Fetch yf.Ticker(symbol).info, cached as long-lived reference data"""
+        return await self.get_reference_data(('yahoo_info', symbol), lambda: self.yahoo.info(symbol))
+    
+    async def get_company_name(self, symbol: str) -> str:
+        """Company name from Polygon.io, else Yahoo Finance's longName, else the symbol itself"""
+        info = await self.get_polygon_data(symbol, "1y")
+        name = (info.get('results') or {}).get('name') if info else None
+        if name:
+            return name
+        try:
+            info = await self.get_yahoo_info(symbol)
+        except Exception as e:
+            logger.warning(f"Yahoo Finance info failed for {symbol}: {e}")
+            return symbol
+        return info.get('longName') or info.get('shortName') or symbol
+    
+    async def get_reference_data(self, key: tuple, loader) -> dict:
+        """
+        Serve company metadata from the reference-data cache, loading it once on a miss
+        
+        Empty results are remembered for a short time only, so a symbol
+        without metadata does not cost an upstream round trip on every request.
+        """
+        cached = self.reference_cache.get(key)
+        if cached is None:
+            cached = self.reference_miss_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        data = await self.inflight.do(key, loader)
+        (self.reference_cache if data else self.reference_miss_cache).set(key, data or {})
+        return data or {}
+    
+    def compute_stock_columns(self, hist: pd.DataFrame, fields: Optional[tuple] = None, interval: str = '1d') -> dict:
+        """
+        Series of the /api/stock response as NumPy arrays, keyed like the response
+        
+        Dates are datetime64[D] for daily bars and datetime64[m] bar start
+        times otherwise; indicators keep NaN where they are undefined (the
+        JSON encoding fills those, binary encodings keep them).
+        
+        Args:
+            hist: OHLCV bars
+            fields: Response fields to compute (see resolve_stock_fields); all when None
+            interval: Bar interval of hist (see BAR_INTERVALS); windows count bars, volatility is annualized for it
+        """
+        wanted = set(self.STOCK_FIELDS if fields is None else fields)
+        bars = {column: np.ascontiguousarray(hist[column].to_numpy(dtype=np.float64))
+                for column in ('Open', 'High', 'Low', 'Close', 'Volume')}
+        
+        columns = {}
+        if 'dates' in wanted:
+            columns['dates'] = hist.index.to_numpy().astype('datetime64[D]' if interval == '1d' else 'datetime64[m]')
+        for column in ('Open', 'High', 'Low', 'Close'):
+            if column.lower() in wanted:
+                columns[column.lower()] = bars[column]
+        if 'volume' in wanted:
+            columns['volume'] = hist['Volume'].to_numpy()
+        columns.update(IndicatorEngine.compute(bars['Open'], bars['High'], bars['Low'], bars['Close'], bars['Volume'],
+                                               names=[name for name in IndicatorEngine.INDICATORS if name in wanted],
+                                               periods_per_year=BarResampler.periods_per_year(interval)))
+        return columns
+    
+    def process_stock_data(self, hist: pd.DataFrame, symbol: str, polygon_info: Optional[dict] = None,
+                           fields: Optional[tuple] = None, interval: str = '1d') -> dict:
+        """
+        Process and enhance stock data with technical indicators
+        
+        Args:
+            hist: Daily OHLCV bars
+            symbol: Stock symbol
+            polygon_info: Company info to embed, if any
+            fields: Response fields to compute and serialize (see resolve_stock_fields); all when None
+            interval: Bar interval of hist (see BAR_INTERVALS)
+        """
+        current_price = float(hist['Close'].iloc[-1]) if len(hist) else 0
+        data = self.stock_payload(symbol, self.compute_stock_columns(hist, fields, interval), current_price, fields)
+        if polygon_info is not None:
+            data['company_info'] = polygon_info.get('results', {})
+        
+        return data
+    
+    def stock_payload(self, symbol: str, columns: dict, current_price: float, fields: Optional[tuple] = None) -> dict:
+        """Convert compute_stock_columns arrays to the JSON-serializable /api/stock payload"""
+        fills = {'rsi': 50, 'high_low_ratio': 1}
+        data = {'symbol': symbol}
+        for name, values in columns.items():
+            if name == 'dates':
+                data['dates'] = np.datetime_as_string(values, unit=np.datetime_data(values.dtype)[0]).tolist()
+            else:
+                data[name] = IndicatorEngine.to_list(values, fills.get(name, 0))
+        if fields is None or 'current_price' in fields:
+            data['current_price'] = current_price
+        return data
+    
+    def technical_summary(self, symbol: str, stock_data: dict) -> dict:
+        """
+        Momentum, volume, support/resistance and trend summary of an /api/stock payload
+        
+        Works on the JSON payload (rather than the arrays) so mock data is
+        summarized exactly like real data.
+        """
+        if not stock_data or not stock_data.get('close'):
+            raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
+        closes = np.asarray(stock_data['close'], dtype=np.float64)
+        volumes = np.asarray(stock_data['volume'], dtype=np.float64)
+        
+        # Price momentum: daily percent change over the last 10 days
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price_momentum = (np.diff(closes) / closes[:-1] * 100)[-10:]
+        
+        # Volume analysis
+        avg_volume = float(volumes.mean()) if len(volumes) else 0
+        current_volume = stock_data['volume'][-1] if len(volumes) else 0
+        volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1
+        
+        # Support and resistance levels
+        recent_highs = float(closes[-20:].max())
+        recent_lows = float(closes[-20:].min())
+        
+        # Trend analysis
+        sma_20 = stock_data.get('sma_20', [])
+        sma_50 = stock_data.get('sma_50', [])
+        
+        trend_direction = "neutral"
+        if sma_20 and sma_50:
+            if sma_20[-1] > sma_50[-1]:
+                trend_direction = "bullish"
+            elif sma_20[-1] < sma_50[-1]:
+                trend_direction = "bearish"
+        
+        return {
+            'symbol': symbol,
+            'current_price': stock_data.get('current_price', 0),
+            'price_momentum': price_momentum,  # Last 10 days
+            'volume_analysis': {
+                'current_volume': current_volume,
+                'average_volume': avg_volume,
+                'volume_ratio': round(volume_ratio, 2)
+            },
+            'support_resistance': {
+                'recent_high': recent_highs,
+                'recent_low': recent_lows,
+                'resistance_level': recent_highs * 1.02,  # 2% above recent high
+                'support_level': recent_lows * 0.98  # 2% below recent low
+            },
+            'trend_analysis': {
+                'direction': trend_direction,
+                'sma_20': sma_20[-1] if sma_20 else 0,
+                'sma_50': sma_50[-1] if sma_50 else 0
+            },
+            'rsi': stock_data['rsi'][-1] if stock_data.get('rsi') else 50,
+            'volatility': stock_data['volatility'][-1] if stock_data.get('volatility') else 0
+        }
+    
+    async def get_technical_analysis(self, symbol: str, period: str = "1y", interval: str = '1d') -> dict:
+        """Technical summary of symbol, read from the shared memoized analysis"""
+        analysis = await self.get_analysis(symbol, period, interval=interval)
+        if analysis is not None:
+            return analysis.technical
+        return self.technical_summary(symbol, self.mock_stock_data(symbol, period, interval))
+    
+    def mock_stock_data(self, symbol: str, period: str, interval: str = '1d') -> dict:
+        """Mock /api/stock payload for when every source failed; there is no intraday mock data"""
+        if interval != '1d':
+            raise HTTPException(status_code=404, detail=f"No {interval} data available for {symbol}")
+        logger.warning(f"All data sources failed for {symbol}, generating mock data for testing")
+        return self.generate_mock_data(symbol, period)
+    
+    async def get_dashboard(self, symbol: str, period: str = "1y", include_company_info: bool = True,
+                            downsample: Optional[tuple] = None, interval: str = '1d') -> dict:
+        """
+        Series, technical summary and company info of symbol from one memoized analysis
+        
+        The technical summary always reflects the full series; only the
+        returned series are reduced when downsample is given.
+        """
+        if include_company_info:
+            analysis, polygon_info = await asyncio.gather(self.get_analysis(symbol, period, interval=interval),
+                                                          self.get_polygon_data(symbol, "1y"))
+        else:
+            analysis, polygon_info = await self.get_analysis(symbol, period, interval=interval), None
+        
+        if analysis is None:
+            stock = self.mock_stock_data(symbol, period, interval)
+            if not include_company_info:
+                stock.pop('company_info', None)
+            return {'symbol': symbol, 'period': period, 'interval': interval, 'data_version': None,
+                    'stock': self.downsample_payload(stock, downsample),
+                    'technical_analysis': self.technical_summary(symbol, stock)}
+        
+        stock = analysis.payload if downsample is None else analysis.downsampled(downsample)[1]
+        if include_company_info:
+            stock = {**stock, 'company_info': polygon_info.get('results', {}) if polygon_info else {}}
+        return {'symbol': symbol, 'period': period, 'interval': interval, 'data_version': analysis.version,
+                'stock': stock,
+                'technical_analysis': analysis.technical}
+    
+    # Largest window or span accepted for a parameterized indicator
+    MAX_INDICATOR_WINDOW = 1000
+    MAX_INDICATOR_SPECS = 50
+    
+    def parse_indicator_specs(self, indicators: Optional[str]) -> list:
+        """
+        Parse comma-separated indicator specs such as "sma:10,macd:5:35:5,bollinger:20:2.5"
+        
+        Each spec is an indicator name (see IndicatorEngine.PARAMETERIZED)
+        followed by colon-separated parameters; omitted trailing parameters
+        take their defaults.
+        
+        Returns:
+            list of (name, params tuple), duplicates removed
+        """
+        specs = []
+        for text in (indicators or '').lower().split(','):
+            if not text.strip():
+                continue
+            name, *values = [part.strip() for part in text.split(':')]
+            if name not in IndicatorEngine.PARAMETERIZED:
+                raise HTTPException(status_code=400, detail=f"Unknown indicator '{name}', expected one of "
+                                                            f"{', '.join(IndicatorEngine.PARAMETERIZED)}")
+            param_names, defaults, _ = IndicatorEngine.PARAMETERIZED[name]
+            if len(values) > len(defaults):
+                raise HTTPException(status_code=400,
+                                    detail=f"{name} takes at most {len(defaults)} parameters ({', '.join(param_names)})")
+            params = []
+            for param, default, value in zip(param_names, defaults, values + [None] * len(defaults)):
+                try:
+                    value = default if value is None else type(default)(value)
+                except ValueError:
+                    raise HTTPException(status_code=400, detail=f"Invalid {param} '{value}' for {name}")
+                minimum = IndicatorEngine.MIN_WINDOW.get(name, 1) if param == 'window' else 1
+                if isinstance(default, int) and not minimum <= value <= self.MAX_INDICATOR_WINDOW:
+                    raise HTTPException(status_code=400, detail=f"{name} {param} must be between {minimum} "
+                                                                f"and {self.MAX_INDICATOR_WINDOW}")
+                if isinstance(default, float) and not (math.isfinite(value) and value > 0):
+                    raise HTTPException(status_code=400, detail=f"{name} {param} must be a positive number")
+                params.append(value)
+            specs.append((name, tuple(params)))
+        specs = list(dict.fromkeys(specs))
+        if not specs:
+            raise HTTPException(status_code=400, detail="At least one indicator required, e.g. sma:50")
+        if len(specs) > self.MAX_INDICATOR_SPECS:
+            raise HTTPException(status_code=400, detail=f"At most {self.MAX_INDICATOR_SPECS} indicators per request")
+        return specs
+    
+    @staticmethod
+    def indicator_label(name: str, params: tuple) -> str:
+        """Canonical spec of a parameterized indicator, e.g. 'bollinger:20:2.5'"""
+        return ':'.join([name, *(format(value, 'g') for value in params)])
+    
+    async def get_indicators(self, symbol: str, period: str, specs: list,
+                             downsample: Optional[tuple] = None, interval: str = '1d') -> dict:
+        """
+        Parameterized indicators of symbol, memoized per (symbol, period, data version, indicator, params)
+        
+        Only specs missing from the indicator cache are computed, so repeated
+        or overlapping parameter sweeps are served from cache until new bars
+        change the data version.
+        
+        Args:
+            symbol: Stock symbol
+            period: Time period for data
+            specs: Parsed specs (see parse_indicator_specs)
+            downsample: (max_points, method) to reduce the returned series, picked from the close series
+            interval: Bar interval (see BAR_INTERVALS)
+        
+        Returns:
+            dict with dates and, per canonical spec, its output arrays (NaN
+            where the indicator is undefined)
+        """
+        hist = await self.get_bars_shared(symbol, period, interval)
+        if hist is None or hist.empty:
+            raise HTTPException(status_code=404, detail=f"No data available for {symbol}")
+        version = self.data_version(hist)
+        
+        bars = None
+        results, computed = {}, 0
+        for name, params in specs:
+            key = (symbol, period, interval, version, name, params)
+            outputs = self.indicator_cache.get(key)
+            if outputs is None:
+                if bars is None:
+                    bars = {column.lower(): np.ascontiguousarray(hist[column].to_numpy(dtype=np.float64))
+                            for column in ('Open', 'High', 'Low', 'Close', 'Volume')}
+                    bars['periods_per_year'] = BarResampler.periods_per_year(interval)
+                outputs = IndicatorEngine.compute_parameterized(bars, name, params)
+                self.indicator_cache.set(key, outputs)
+                computed += 1
+            results[self.indicator_label(name, params)] = outputs
+        
+        dates = hist.index
+        if downsample is not None and len(hist) > downsample[0]:
+            indices = Downsampler.indices(hist['Close'].to_numpy(dtype=np.float64), *downsample)
+            dates = dates[indices]
+            results = {label: Downsampler.take(outputs, indices, len(hist)) for label, outputs in results.items()}
+        
+        return {
+            'symbol': symbol,
+            'period': period,
+            'data_version': version,
+            'interval': interval,
+            'dates': dates.strftime('%Y-%m-%d' if interval == '1d' else '%Y-%m-%dT%H:%M').tolist(),
+            'indicators': results,
+            'cache_hits': len(specs) - computed
+        }
+    
+    async def get_stock_columns(self, symbol: str, period: str = "1y", fields: Optional[tuple] = None,
+                                downsample: Optional[tuple] = None, interval: str = '1d') -> dict:
+        """
+        Stock series as NumPy arrays for the binary response formats
+        
+        Returns:
+            dict: the compute_stock_columns arrays plus 'current_price', built
+            from mock data when every source failed (like get_stock_data)
+        """
+        analysis = await self.get_analysis(symbol, period, fields, interval)
+        if analysis is None:
+            mock = self.mock_stock_data(symbol, period, interval)
+            columns = {'dates': np.array(mock['dates'], dtype='datetime64[D]')}
+            for name in self.SERIES_FIELDS:
+                columns[name] = np.asarray(mock[name], dtype=np.float64)
+            if downsample is not None:
+                columns = Downsampler.take(columns, Downsampler.indices(columns['close'], *downsample),
+                                           len(columns['close']))
+            columns['current_price'] = mock['current_price']
+            return self._select_columns(columns, fields)
+        columns = analysis.columns if downsample is None else analysis.downsampled(downsample)[0]
+        return self._select_columns({**columns, 'current_price': analysis.current_price}, fields)
+    
+    def resolve_interval(self, interval: str) -> str:
+        """Validate the interval query parameter of the series endpoints"""
+        interval = interval.lower()
+        if interval not in BAR_INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Unknown interval '{interval}', expected one of "
+                                                        f"{', '.join(BAR_INTERVALS)}")
+        return interval
+    
+    def resolve_downsampling(self, max_points: Optional[int], method: str = 'lttb') -> Optional[tuple]:
+        """
+        Validate the max_points / downsample query parameters of the series endpoints
+        
+        Returns:
+            (max_points, method), or None when no limit was requested
+        """
+        method = method.lower()
+        if method not in Downsampler.METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown downsample method '{method}', expected one of "
+                                                        f"{', '.join(Downsampler.METHODS)}")
+        if max_points is None:
+            return None
+        if max_points < Downsampler.MIN_POINTS:
+            raise HTTPException(status_code=400, detail=f"max_points must be at least {Downsampler.MIN_POINTS}")
+        return max_points, method
+    
+    def resolve_covariance(self, cov_method: str = 'sample', factors: Optional[int] = None) -> tuple:
+        """
+        Validate the cov_method / factors query parameters of the Markowitz endpoints
+        
+        Returns:
+            (cov_method, n_factors)
+        """
+        cov_method = cov_method.lower()
+        if cov_method not in CovarianceEstimator.METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown cov_method '{cov_method}', expected one of "
+                                                        f"{', '.join(CovarianceEstimator.METHODS)}")
+        if factors is not None and factors < 1:
+            raise HTTPException(status_code=400, detail="factors must be at least 1")
+        return cov_method, factors or CovarianceEstimator.DEFAULT_FACTORS
     
-    def process_stock_data(self, hist: pd.DataFrame, symbol: str) -> dict:
-        """Process and enhance stock data with technical indicators"""
-        # Calculate technical indicators manually (without ta library)
-        hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
-        hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-        hist['EMA_12'] = hist['Close'].ewm(span=12).mean()
-        hist['EMA_26'] = hist['Close'].ewm(span=26).mean()
-        hist['RSI'] = self.calculate_rsi(hist['Close'], 14)
-        hist['MACD'] = hist['EMA_12'] - hist['EMA_26']
-        hist['MACD_signal'] = hist['MACD'].ewm(span=9).mean()
-        hist['BB_upper'] = hist['SMA_20'] + (hist['Close'].rolling(window=20).std() * 2)
-        hist['BB_lower'] = hist['SMA_20'] - (hist['Close'].rolling(window=20).std() * 2)
-        hist['Volatility'] = hist['Close'].pct_change().rolling(window=20).std() * np.sqrt(252)
-        hist['Volume_SMA'] = hist['Volume'].rolling(window=20).mean()
-        
-        # Calculate additional metrics
-        hist['Price_Change'] = hist['Close'].pct_change()
-        hist['Volume_Change'] = hist['Volume'].pct_change()
-        hist['High_Low_Ratio'] = hist['High'] / hist['Low']
-        
-        # Get additional info from Polygon
-        polygon_info = self.get_polygon_data(symbol, "1y")
-        
-        # Convert to JSON-serializable format
-        data = {
-            'symbol': symbol,
-            'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-            'open': hist['Open'].fillna(0).tolist(),
-            'high': hist['High'].fillna(0).tolist(),
-            'low': hist['Low'].fillna(0).tolist(),
-            'close': hist['Close'].fillna(0).tolist(),
-            'volume': hist['Volume'].fillna(0).tolist(),
-            'sma_20': hist['SMA_20'].fillna(0).tolist(),
-            'sma_50': hist['SMA_50'].fillna(0).tolist(),
-            'ema_12': hist['EMA_12'].fillna(0).tolist(),
-            'ema_26': hist['EMA_26'].fillna(0).tolist(),
-            'rsi': hist['RSI'].fillna(50).tolist(),
-            'macd': hist['MACD'].fillna(0).tolist(),
-            'macd_signal': hist['MACD_signal'].fillna(0).tolist(),
-            'bb_upper': hist['BB_upper'].fillna(0).tolist(),
-            'bb_lower': hist['BB_lower'].fillna(0).tolist(),
-            'volatility': hist['Volatility'].fillna(0).tolist(),
-            'volume_sma': hist['Volume_SMA'].fillna(0).tolist(),
-            'price_change': hist['Price_Change'].fillna(0).tolist(),
-            'volume_change': hist['Volume_Change'].fillna(0).tolist(),
-            'high_low_ratio': hist['High_Low_Ratio'].fillna(1).tolist(),
-            'current_price': hist['Close'].iloc[-1] if not hist.empty else 0,
-            'company_info': polygon_info.get('results', {}) if polygon_info else {}
-        }
+    def downsample_payload(self, data: dict, downsample: Optional[tuple]) -> dict:
+        """Reduce the per-date lists of a JSON /api/stock payload, picking rows from its close series"""
+        if downsample is None or len(data.get('dates', ())) <= downsample[0]:
+            return data
+        indices = Downsampler.indices(np.asarray(data['close'], dtype=np.float64), *downsample).tolist()
+        per_date = ('dates',) + self.SERIES_FIELDS
+        return {key: [value[i] for i in indices] if key in per_date else value for key, value in data.items()}
+    
+    @staticmethod
+    def _select_columns(columns: dict, fields: Optional[tuple]) -> dict:
+        return {name: values for name, values in columns.items() if fields is None or name in fields}
+    
+    def resolve_stock_fields(self, fields: Optional[str]) -> Optional[tuple]:
+        """
+        Parse a comma-separated fields parameter of /api/stock
         
-        return data
+        Returns:
+            tuple of field names in response order (with 'dates' added when any
+            series is requested), or None for all fields
+        """
+        if fields is None or not fields.strip():
+            return None
+        requested = {field.strip().lower() for field in fields.split(',') if field.strip()}
+        unknown = requested - set(self.STOCK_FIELDS) - {'symbol'}
+        if unknown:
+            raise HTTPException(status_code=400,
+                                detail=f"Unknown fields: {', '.join(sorted(unknown))}. "
+                                       f"Valid fields: {', '.join(self.STOCK_FIELDS)}")
+        if requested & set(self.SERIES_FIELDS):
+            requested.add('dates')
+        return tuple(field for field in self.STOCK_FIELDS if field in requested)
+    
+    @classmethod
+    def project_stock_data(cls, data: dict, fields: Optional[tuple]) -> dict:
+        """Restrict a full /api/stock payload to fields"""
+        if fields is None:
+            return data
+        return {key: value for key, value in data.items() if key == 'symbol' or key in fields}
     
     def generate_mock_data(self, symbol: str, period: str = "1y") -> dict:
         """Generate mock stock data for testing when real APIs fail"""
@@ -361,17 +3159,7 @@ class FinancialAnalyzer:
         from datetime import datetime, timedelta
         
         # Generate date range
-        end_date = datetime.now()
-        if period == "1y":
-            start_date = end_date - timedelta(days=365)
-        elif period == "6mo":
-            start_date = end_date - timedelta(days=180)
-        elif period == "3mo":
-            start_date = end_date - timedelta(days=90)
-        elif period == "1mo":
-            start_date = end_date - timedelta(days=30)
-        else:
-            start_date = end_date - timedelta(days=365)
+        start_date, end_date = period_date_range(period)
         
         # Generate dates (weekdays only)
         dates = []
@@ -445,16 +3233,7 @@ class FinancialAnalyzer:
         logger.info(f"Generated {len(dates)} mock data points for {symbol}")
         return data
     
-    def calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calculate Relative Strength Index"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-    
-    def get_portfolio_analysis(self, symbols: List[str], weights: Optional[List[float]] = None) -> dict:
+    async def get_portfolio_analysis(self, symbols: List[str], weights: Optional[List[float]] = None) -> dict:
         """Analyze a portfolio of stocks"""
         if weights is None:
             weights = [1.0 / len(symbols)] * len(symbols)
@@ -462,30 +3241,21 @@ class FinancialAnalyzer:
         if len(symbols) != len(weights):
             raise HTTPException(status_code=400, detail="Number of symbols and weights must match")
         
-        portfolio_data = {}
-        returns_data = {}
+        # One batched fetch, aligned on the dates every symbol traded
+        prices = (await self.get_price_panel(symbols, "1y")).dropna()
         
-        for symbol, weight in zip(symbols, weights):
-            try:
-                stock_data = self.get_stock_data(symbol, "1y")
-                prices = stock_data['close']
-                returns = [0] + [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))]
-                returns_data[symbol] = returns
-                portfolio_data[symbol] = {
-                    'weight': weight,
-                    'current_price': prices[-1],
-                    'returns': returns
+        if not prices.empty:
+            returns_df = prices.pct_change().fillna(0)
+            weight_map = dict(zip(symbols, weights))
+            portfolio_data = {
+                symbol: {
+                    'weight': weight_map[symbol],
+                    'current_price': float(prices[symbol].iloc[-1]),
+                    'returns': returns_df[symbol].tolist()
                 }
-            except:
-                continue
-        
-        # Calculate portfolio metrics
-        if returns_data:
-            portfolio_returns = []
-            for i in range(len(list(returns_data.values())[0])):
-                daily_return = sum(returns_data[symbol][i] * weights[j] 
-                                 for j, symbol in enumerate(returns_data.keys()))
-                portfolio_returns.append(daily_return)
+                for symbol in returns_df.columns
+            }
+            portfolio_returns = returns_df.to_numpy() @ np.array([weight_map[symbol] for symbol in returns_df.columns])
             
             # Calculate portfolio statistics
             portfolio_volatility = np.std(portfolio_returns) * np.sqrt(252)
@@ -497,12 +3267,250 @@ class FinancialAnalyzer:
                 'portfolio_volatility': portfolio_volatility,
                 'sharpe_ratio': sharpe_ratio,
                 'stocks': portfolio_data,
-                'daily_returns': portfolio_returns
+                'daily_returns': portfolio_returns.tolist()
             }
         
         return {'error': 'No valid stock data found'}
 
-analyzer = FinancialAnalyzer()
+# Background prefetching
+class PrefetchScheduler:
+    def __init__(self, analyzer: FinancialAnalyzer):
+        """
+        Keeps bars and indicators of the supported universe warm
+
+        Warms everything at startup, refreshes on an intraday cadence while
+        the market is open and once more shortly after the close, so user
+        requests almost always hit warm caches.
+
+        Args:
+            analyzer: FinancialAnalyzer whose caches are warmed
+        """
+        self.analyzer = analyzer
+        self.periods = [p.strip() for p in os.getenv('PREFETCH_PERIODS', '1y').split(',') if p.strip()]
+        self.interval = timedelta(minutes=float(os.getenv('PREFETCH_INTERVAL_MINUTES', '15')))
+        self.post_close_delay = timedelta(minutes=float(os.getenv('PREFETCH_POST_CLOSE_DELAY_MINUTES', '15')))
+        self.concurrency = int(os.getenv('PREFETCH_CONCURRENCY', '4'))
+        self._task = None
+        self.runs = 0
+        self.last_run = None
+        self.last_reason = None
+        self.last_duration = None
+        self.last_errors = {}
+        self.next_run = None
+        self.next_reason = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await self.warm('startup')
+        while True:
+            run_at, reason = self.next_schedule()
+            self.next_run, self.next_reason = run_at, reason
+            await asyncio.sleep(max(0.0, (run_at - datetime.now(MARKET_TZ)).total_seconds()))
+            await self.warm(reason)
+
+    def next_schedule(self, now: Optional[datetime] = None) -> tuple:
+        """Return (run time, reason) of the next refresh after now"""
+        now = market_now(now)
+        day = now.date()
+        while True:
+            if day.weekday() < 5:
+                market_open = datetime.combine(day, MARKET_OPEN_TIME, MARKET_TZ)
+                market_close = datetime.combine(day, MARKET_CLOSE_TIME, MARKET_TZ)
+                post_close = market_close + self.post_close_delay
+                if now < market_open:
+                    return market_open, 'intraday'
+                if now < market_close and now + self.interval < post_close:
+                    return now + self.interval, 'intraday'
+                if now < post_close:
+                    return post_close, 'post_close'
+            day += timedelta(days=1)
+            now = datetime.combine(day, dt_time(0, 0), MARKET_TZ)
+
+    async def warm(self, reason: str = 'manual'):
+        """Refresh bars and indicators for every supported symbol and configured period"""
+        started = time.monotonic()
+        universe = list(self.analyzer.supported_stocks)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        errors = {}
+
+        async def warm_symbol(symbol, period):
+            async with semaphore:
+                try:
+                    await self.analyzer.get_stock_data(symbol, period, include_company_info=False)
+                except Exception as e:
+                    errors[f"{symbol}:{period}"] = str(e)
+
+        # Drop only the cached bars so they are re-read from the store and gap-filled; processed results
+        # are keyed by data version, so they refresh by themselves when the bars change
+        for symbol in universe:
+            self.analyzer.bar_cache.invalidate(symbol)
+        for period in self.periods:
+            # One batched bar fetch per period, then indicators per symbol from the warm bar cache
+            try:
+                await self.analyzer.get_stock_bars_batch(universe, period)
+            except Exception as e:
+                errors[f"batch:{period}"] = str(e)
+            await asyncio.gather(*(warm_symbol(symbol, period) for symbol in universe))
+
+        self.runs += 1
+        self.last_run = datetime.now(MARKET_TZ).isoformat()
+        self.last_reason = reason
+        self.last_duration = round(time.monotonic() - started, 3)
+        self.last_errors = errors
+        logger.info(f"Prefetch ({reason}) warmed {len(universe)} symbols in {self.last_duration}s "
+                    f"with {len(errors)} errors")
+
+    def status(self) -> dict:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'periods': self.periods,
+            'interval_minutes': self.interval.total_seconds() / 60,
+            'concurrency': self.concurrency,
+            'runs': self.runs,
+            'last_run': self.last_run,
+            'last_reason': self.last_reason,
+            'last_duration_seconds': self.last_duration,
+            'last_errors': self.last_errors,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'next_reason': self.next_reason
+        }
+
+class MarketSnapshot:
+    def __init__(self, analyzer: FinancialAnalyzer):
+        """
+        In-memory price overview of the whole supported universe
+
+        Refreshed in the background so /api/market-overview answers
+        instantly; every entry carries the time it was last refreshed.
+
+        Args:
+            analyzer: FinancialAnalyzer providing bars, latest bars and company names
+        """
+        self.analyzer = analyzer
+        self.entries = {}
+        self.refresh_interval = float(os.getenv('MARKET_SNAPSHOT_REFRESH_SECONDS', '60'))
+        self.idle_refresh_interval = float(os.getenv('MARKET_SNAPSHOT_IDLE_REFRESH_SECONDS', '900'))
+        self.last_refresh = None
+        self.last_duration = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def concurrency(self) -> int:
+        """Refresh concurrency, growing with the universe size"""
+        configured = os.getenv('MARKET_SNAPSHOT_CONCURRENCY')
+        if configured:
+            return int(configured)
+        return max(4, min(32, -(-len(self.analyzer.supported_stocks) // 4)))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Market snapshot refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval if is_market_open() else self.idle_refresh_interval)
+
+    async def refresh(self):
+        """Rebuild the entries of every supported symbol"""
+        async with self._lock:
+            started = time.monotonic()
+            universe = list(self.analyzer.supported_stocks)
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def company_name(symbol):
+                async with semaphore:
+                    return await self.analyzer.get_company_name(symbol)
+
+            latest_bars = {}
+            if self.analyzer.alpaca.is_configured():
+                try:
+                    latest_bars = await self.analyzer.alpaca.get_latest_bars(universe)
+                except Exception as e:
+                    logger.warning(f"Alpaca latest bars failed for market snapshot: {e}")
+
+            daily_bars, names = await asyncio.gather(
+                self.analyzer.get_stock_bars_batch(universe, "1mo"),
+                asyncio.gather(*(company_name(symbol) for symbol in universe))
+            )
+
+            for symbol, name in zip(universe, names):
+                entry = self._build_entry(symbol, name, daily_bars.get(symbol), latest_bars.get(symbol))
+                if entry:
+                    self.entries[symbol] = entry
+
+            self.last_refresh = datetime.now(MARKET_TZ).isoformat()
+            self.last_duration = round(time.monotonic() - started, 3)
+
+    def _build_entry(self, symbol: str, name: str, hist: Optional[pd.DataFrame], latest_bar) -> Optional[dict]:
+        if hist is None or hist.empty:
+            return None
+        closes = hist['Close']
+
+        if latest_bar is not None:
+            # Compare the live bar with the last daily close before its session
+            bar_day = pd.Timestamp(latest_bar.t).tz_convert(MARKET_TZ).tz_localize(None).normalize()
+            previous = closes[closes.index < bar_day]
+            previous_close = previous.iloc[-1] if not previous.empty else latest_bar.o
+            current_price, volume = latest_bar.c, latest_bar.v
+            high, low, source = latest_bar.h, latest_bar.l, 'alpaca'
+            as_of = bar_day
+        else:
+            last = hist.iloc[-1]
+            previous_close = closes.iloc[-2] if len(closes) > 1 else last['Open']
+            current_price, volume = last['Close'], last['Volume']
+            high, low, source = last['High'], last['Low'], 'daily_bars'
+            as_of = hist.index[-1]
+
+        change = current_price - previous_close
+        return {
+            'symbol': symbol,
+            'name': name,
+            'current_price': round(float(current_price), 2),
+            'change': round(float(change), 2),
+            'change_percent': round(float(change / previous_close * 100), 2) if previous_close else 0.0,
+            'volume': int(volume),
+            'high': round(float(high), 2),
+            'low': round(float(low), 2),
+            'source': source,
+            'as_of': as_of.strftime('%Y-%m-%d'),
+            'updated_at': datetime.now(MARKET_TZ).isoformat()
+        }
+
+    def as_dict(self) -> dict:
+        return dict(self.entries)
+
+# Frontier workers of an app started with `python main.py` re-run this script as
+# __mp_main__; they only need portfolio.py, not the app's data sources
+if __name__ != '__mp_main__':
+    analyzer = FinancialAnalyzer()
+    prefetch_scheduler = PrefetchScheduler(analyzer)
+    market_snapshot = MarketSnapshot(analyzer)
 
 @app.get("/")
 async def read_root():
@@ -530,12 +3538,45 @@ async def get_supported_stocks():
     return {"stocks": analyzer.supported_stocks}
 
 @app.get("/api/stock/{symbol}")
-async def get_stock(symbol: str, period: str = "1y"):
-    """Get stock data and analysis for a specific symbol"""
+async def get_stock(request: Request, symbol: str, period: str = "1y", include_company_info: bool = True,
+                    fields: Optional[str] = None, max_points: Optional[int] = None, downsample: str = "lttb",
+                    interval: str = "1d"):
+    """
+    Get stock data and analysis for a specific symbol
+    
+    interval selects daily bars (1d, the default) or intraday bars (1m, 5m,
+    15m, 30m, 1h) aggregated from minute bars; indicator windows count bars.
+    fields is an optional comma-separated list (e.g. close,rsi,macd); only
+    those series are computed and returned, plus dates and symbol. With
+    max_points, every series is reduced to at most that many dates, picked
+    from the close series by the downsample method (lttb or minmax). JSON is
+    the default; clients can ask for a binary columnar encoding through the
+    Accept header (see ColumnarFormat).
+    """
     if symbol.upper() not in analyzer.supported_stocks:
         raise HTTPException(status_code=400, detail=f"Stock {symbol} not supported")
+    symbol = symbol.upper()
+    fields = analyzer.resolve_stock_fields(fields)
+    downsample = analyzer.resolve_downsampling(max_points, downsample)
+    interval = analyzer.resolve_interval(interval)
+    
+    # Every representation of this URL depends on the Accept header, so shared caches must key on it
+    media_type = ColumnarFormat.negotiate(request.headers.get('accept'))
+    if media_type is None:
+        data = await analyzer.get_stock_data(symbol, period, include_company_info=include_company_info,
+                                             fields=fields, downsample=downsample, interval=interval)
+        return NumpyJSONResponse(data, headers={'Vary': 'Accept'})
     
-    return analyzer.get_stock_data(symbol.upper(), period)
+    columns = await analyzer.get_stock_columns(symbol, period, fields, downsample, interval)
+    metadata = {'symbol': symbol}
+    current_price = columns.pop('current_price', None)
+    if current_price is not None:
+        metadata['current_price'] = current_price
+    if include_company_info and (fields is None or 'company_info' in fields):
+        polygon_info = await analyzer.get_polygon_data(symbol, "1y")
+        metadata['company_info'] = polygon_info.get('results', {}) if polygon_info else {}
+    body = ColumnarFormat.encode(media_type, columns, metadata)
+    return Response(content=body, media_type=media_type, headers={'Vary': 'Accept'})
 
 @app.post("/api/portfolio")
 async def analyze_portfolio(request: dict):
@@ -546,69 +3587,15 @@ async def analyze_portfolio(request: dict):
     if not symbols:
         raise HTTPException(status_code=400, detail="At least one stock symbol required")
     
-    return analyzer.get_portfolio_analysis(symbols, weights)
+    return await analyzer.get_portfolio_analysis(symbols, weights)
 
 @app.get("/api/market-overview")
 async def get_market_overview():
-    """Get overview of all supported stocks with enhanced data"""
-    overview = {}
-    
-    # Use thread pool for concurrent API calls
-    def get_stock_overview(symbol):
-        try:
-            # Try to get real-time data from Alpaca first
-            if analyzer.alpaca_api:
-                try:
-                    latest_bar = analyzer.alpaca_api.get_latest_bar(symbol)
-                    if latest_bar:
-                        return {
-                            'symbol': symbol,
-                            'current_price': round(latest_bar.c, 2),
-                            'change': round(latest_bar.c - latest_bar.o, 2),
-                            'change_percent': round(((latest_bar.c - latest_bar.o) / latest_bar.o) * 100, 2),
-                            'volume': latest_bar.v,
-                            'high': round(latest_bar.h, 2),
-                            'low': round(latest_bar.l, 2),
-                            'source': 'alpaca'
-                        }
-                except:
-                    pass
-            
-            # Fallback to Yahoo Finance
-            stock = yf.Ticker(symbol)
-            info = stock.info
-            hist = stock.history(period="5d")
-            
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                change = hist['Close'].iloc[-1] - hist['Close'].iloc[-2]
-                change_percent = (change / hist['Close'].iloc[-2]) * 100
-                
-                return {
-                    'symbol': symbol,
-                    'name': info.get('longName', symbol),
-                    'current_price': round(current_price, 2),
-                    'change': round(change, 2),
-                    'change_percent': round(change_percent, 2),
-                    'volume': hist['Volume'].iloc[-1],
-                    'high': round(hist['High'].iloc[-1], 2),
-                    'low': round(hist['Low'].iloc[-1], 2),
-                    'source': 'yahoo'
-                }
-        except:
-            return None
-    
-    # Get data for all stocks concurrently
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = [executor.submit(get_stock_overview, symbol) for symbol in analyzer.supported_stocks[:8]]
-        results = [future.result() for future in futures if future.result() is not None]
-    
-    # Convert to dictionary format
-    for result in results:
-        if result:
-            overview[result['symbol']] = result
-    
-    return overview
+    """Get overview of all supported stocks, served from the background-refreshed market snapshot"""
+    if not market_snapshot.entries:
+        # Nothing refreshed yet (e.g. background tasks disabled), build the snapshot once inline
+        await market_snapshot.refresh()
+    return market_snapshot.as_dict()
 
 @app.get("/api/market-status")
 async def get_market_status():
@@ -625,19 +3612,12 @@ async def get_market_status():
         }
         
         # Check if market is open (simplified - US market hours)
-        from datetime import datetime, time
-        now = datetime.now()
-        market_open_time = time(9, 30)  # 9:30 AM
-        market_close_time = time(16, 0)  # 4:00 PM
-        
-        # Check if it's a weekday and within market hours
-        if now.weekday() < 5 and market_open_time <= now.time() <= market_close_time:
-            status['market_open'] = True
+        status['market_open'] = is_market_open()
         
         # Test Alpaca API
         if analyzer.alpaca_api:
             try:
-                latest_bar = analyzer.alpaca_api.get_latest_bar('AAPL')
+                latest_bar = await analyzer.alpaca.get_latest_bar('AAPL')
                 if latest_bar:
                     status['alpaca_status'] = 'online'
                     status['primary_source'] = 'alpaca'
@@ -648,10 +3628,9 @@ async def get_market_status():
         # Test Polygon.io API
         if analyzer.polygon_api_key:
             try:
-                import requests
                 url = f"{analyzer.polygon_base_url}/v2/aggs/ticker/AAPL/range/1/day/2024-01-01/2024-01-31"
                 params = {'apikey': analyzer.polygon_api_key}
-                response = requests.get(url, params=params, timeout=5)
+                response = await get_http_client().get(url, params=params, timeout=5)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -666,8 +3645,7 @@ async def get_market_status():
         
         # Test Yahoo Finance
         try:
-            stock = yf.Ticker('AAPL')
-            hist = stock.history(period="1d")
+            hist = await analyzer.yahoo.history('AAPL', period="1d")
             if not hist.empty:
                 status['yahoo_status'] = 'online'
                 if status['primary_source'] == 'unknown':
@@ -700,16 +3678,58 @@ async def get_market_status():
             'error': str(e)
         }
 
+@app.get("/api/providers/health")
+async def get_provider_health():
+    """Get circuit breaker state, failure counts and latency of each market data provider"""
+    return {
+        'routing_order': [provider.name for provider in analyzer.router.route()],
+        'providers': analyzer.router.snapshot()
+    }
+
+@app.get("/api/prefetch/status")
+async def get_prefetch_status():
+    """Get state of the background prefetch scheduler"""
+    return prefetch_scheduler.status()
+
+@app.get("/api/screener")
+async def screen_stocks(filters: Optional[str] = None, symbols: Optional[str] = None, period: str = "1y",
+                        fields: str = "close,rsi,sma_20,sma_50"):
+    """
+    Screen many symbols on their latest indicator values
+    
+    Args:
+        filters: Comma-separated conditions that must all hold, e.g. rsi<30,sma_20>sma_50
+        symbols: Comma-separated symbols (default: all supported stocks)
+        period: History used for the indicators
+        fields: Series whose latest values are returned for each match
+    """
+    symbol_list = ([s.strip().upper() for s in symbols.split(',') if s.strip()] if symbols
+                   else analyzer.supported_stocks)
+    max_symbols = int(os.getenv('SCREENER_MAX_SYMBOLS', '5000'))
+    if len(symbol_list) > max_symbols:
+        raise HTTPException(status_code=400, detail=f"At most {max_symbols} symbols can be screened at once")
+    conditions = analyzer.parse_screen_filters(filters)
+    field_list = tuple(dict.fromkeys(f.strip().lower() for f in fields.split(',') if f.strip()))
+    unknown = [field for field in field_list if field not in analyzer.SERIES_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    result = await analyzer.screen(symbol_list, period, conditions, field_list)
+    filter_texts = [f"{left}{op}{right if isinstance(right, str) else format(right, 'g')}"
+                    for left, op, right in conditions]
+    return {'period': period, 'filters': filter_texts, **result}
+
 @app.get("/api/real-time/{symbol}")
 async def get_real_time_data(symbol: str):
     """Get real-time data for a specific symbol"""
     try:
+        data = None
         # Get latest bar from Alpaca
         if analyzer.alpaca_api:
-            latest_bar = analyzer.alpaca_api.get_latest_bar(symbol)
+            latest_bar = await analyzer.alpaca.get_latest_bar(symbol)
             
             if latest_bar:
-                return {
+                data = {
                     'symbol': symbol,
                     'timestamp': latest_bar.t.isoformat(),
                     'open': round(latest_bar.o, 2),
@@ -719,14 +3739,17 @@ async def get_real_time_data(symbol: str):
                     'volume': latest_bar.v,
                     'vwap': round(latest_bar.vw, 2) if hasattr(latest_bar, 'vw') else None
                 }
+                bar = (latest_bar.o, latest_bar.h, latest_bar.l, latest_bar.c, latest_bar.v)
+                session = pd.Timestamp(latest_bar.t).tz_convert(MARKET_TZ).strftime('%Y-%m-%d')
         
-        # Fallback to Yahoo Finance
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="1d")
-        
-        if not hist.empty:
+        if data is None:
+            # Fallback to Yahoo Finance
+            hist = await analyzer.yahoo.history(symbol, period="1d")
+            
+            if hist.empty:
+                raise HTTPException(status_code=404, detail=f"No real-time data available for {symbol}")
             latest = hist.iloc[-1]
-            return {
+            data = {
                 'symbol': symbol,
                 'timestamp': hist.index[-1].isoformat(),
                 'open': round(latest['Open'], 2),
@@ -736,8 +3759,23 @@ async def get_real_time_data(symbol: str):
                 'volume': int(latest['Volume']),
                 'vwap': None
             }
-        else:
-            raise HTTPException(status_code=404, detail=f"No real-time data available for {symbol}")
+            bar = (latest['Open'], latest['High'], latest['Low'], latest['Close'], latest['Volume'])
+            session = hist.index[-1].strftime('%Y-%m-%d')
+        
+        # Live indicators: the daily state advanced by the in-progress bar, without touching the stored state
+        try:
+            state = await analyzer.get_indicator_state(symbol)
+            if state is not None:
+                if session > state.last_date:
+                    state = state.copy()
+                    state.update(*bar, date=session)
+                data['indicators'] = {name: (round(value, 4) if np.isfinite(value) else None)
+                                      for name, value in state.values().items()}
+        except Exception as e:
+            logger.warning(f"Live indicators failed for {symbol}: {e}")
+        return data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching real-time data: {str(e)}")
 
@@ -745,7 +3783,7 @@ async def get_real_time_data(symbol: str):
 async def get_company_info(symbol: str):
     """Get detailed company information from Polygon.io"""
     try:
-        polygon_info = analyzer.get_polygon_data(symbol, "1y")
+        polygon_info = await analyzer.get_polygon_data(symbol, "1y")
         
         if polygon_info and 'results' in polygon_info:
             company_data = polygon_info['results']
@@ -763,8 +3801,7 @@ async def get_company_info(symbol: str):
             }
         else:
             # Fallback to Yahoo Finance
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            info = await analyzer.get_yahoo_info(symbol)
             return {
                 'symbol': symbol,
                 'name': info.get('longName', symbol),
@@ -781,277 +3818,98 @@ async def get_company_info(symbol: str):
         raise HTTPException(status_code=500, detail=f"Error fetching company info: {str(e)}")
 
 @app.get("/api/technical-analysis/{symbol}")
-async def get_technical_analysis(symbol: str, period: str = "1y"):
+async def get_technical_analysis(symbol: str, period: str = "1y", interval: str = "1d"):
     """Get comprehensive technical analysis for a symbol"""
     try:
-        stock_data = analyzer.get_stock_data(symbol, period)
-        
-        if not stock_data or not stock_data.get('close'):
-            raise HTTPException(status_code=404, detail=f"No data found for {symbol}")
-        
-        # Calculate additional technical metrics
-        closes = stock_data['close']
-        volumes = stock_data['volume']
-        
-        # Price momentum
-        price_momentum = []
-        for i in range(1, len(closes)):
-            momentum = (closes[i] - closes[i-1]) / closes[i-1] * 100
-            price_momentum.append(momentum)
-        
-        # Volume analysis
-        avg_volume = np.mean(volumes) if volumes else 0
-        current_volume = volumes[-1] if volumes else 0
-        volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1
-        
-        # Support and resistance levels
-        recent_highs = max(closes[-20:]) if len(closes) >= 20 else max(closes)
-        recent_lows = min(closes[-20:]) if len(closes) >= 20 else min(closes)
-        
-        # Trend analysis
-        sma_20 = stock_data.get('sma_20', [])
-        sma_50 = stock_data.get('sma_50', [])
-        
-        trend_direction = "neutral"
-        if sma_20 and sma_50 and len(sma_20) > 0 and len(sma_50) > 0:
-            if sma_20[-1] > sma_50[-1]:
-                trend_direction = "bullish"
-            elif sma_20[-1] < sma_50[-1]:
-                trend_direction = "bearish"
-        
-        return {
-            'symbol': symbol,
-            'current_price': stock_data.get('current_price', 0),
-            'price_momentum': price_momentum[-10:] if price_momentum else [],  # Last 10 days
-            'volume_analysis': {
-                'current_volume': current_volume,
-                'average_volume': avg_volume,
-                'volume_ratio': round(volume_ratio, 2)
-            },
-            'support_resistance': {
-                'recent_high': recent_highs,
-                'recent_low': recent_lows,
-                'resistance_level': recent_highs * 1.02,  # 2% above recent high
-                'support_level': recent_lows * 0.98  # 2% below recent low
-            },
-            'trend_analysis': {
-                'direction': trend_direction,
-                'sma_20': sma_20[-1] if sma_20 else 0,
-                'sma_50': sma_50[-1] if sma_50 else 0
-            },
-            'rsi': stock_data.get('rsi', [])[-1] if stock_data.get('rsi') else 50,
-            'volatility': stock_data.get('volatility', [])[-1] if stock_data.get('volatility') else 0
-        }
+        return await analyzer.get_technical_analysis(symbol, period, analyzer.resolve_interval(interval))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in technical analysis: {str(e)}")
 
-# Markowitz Portfolio Theory Functions
-class MarkowitzPortfolio:
-    def __init__(self, returns_data):
-        """
-        Initialize Markowitz Portfolio Theory calculations
-        
-        Args:
-            returns_data: DataFrame with stock returns (columns = stocks, rows = time periods)
-        """
-        self.returns = returns_data
-        self.n_assets = len(returns_data.columns)
-        self.asset_names = returns_data.columns.tolist()
-        
-        # Calculate expected returns and covariance matrix
-        self.expected_returns = returns_data.mean() * 252  # Annualized
-        self.cov_matrix = returns_data.cov() * 252  # Annualized
-        
-    def portfolio_performance(self, weights):
-        """
-        Calculate portfolio expected return and volatility
-        
-        Args:
-            weights: Portfolio weights (must sum to 1)
-            
-        Returns:
-            tuple: (expected_return, volatility)
-        """
-        portfolio_return = np.sum(weights * self.expected_returns)
-        portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
-        return portfolio_return, portfolio_volatility
-    
-    def negative_sharpe_ratio(self, weights, risk_free_rate=0.02):
-        """
-        Calculate negative Sharpe ratio for optimization
-        
-        Args:
-            weights: Portfolio weights
-            risk_free_rate: Risk-free rate (default 2%)
-            
-        Returns:
-            float: Negative Sharpe ratio
-        """
-        portfolio_return, portfolio_volatility = self.portfolio_performance(weights)
-        sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_volatility
-        return -sharpe_ratio
+@app.get("/api/dashboard/{symbol}")
+async def get_dashboard(symbol: str, period: str = "1y", include_company_info: bool = True,
+                        max_points: Optional[int] = None, downsample: str = "lttb", interval: str = "1d"):
+    """Get stock series, technical analysis and company info for a symbol in one round trip"""
+    if symbol.upper() not in analyzer.supported_stocks:
+        raise HTTPException(status_code=400, detail=f"Stock {symbol} not supported")
+    downsample = analyzer.resolve_downsampling(max_points, downsample)
+    interval = analyzer.resolve_interval(interval)
     
-    def portfolio_variance(self, weights):
-        """
-        Calculate portfolio variance
-        
-        Args:
-            weights: Portfolio weights
-            
-        Returns:
-            float: Portfolio variance
-        """
-        return np.dot(weights.T, np.dot(self.cov_matrix, weights))
+    return await analyzer.get_dashboard(symbol.upper(), period, include_company_info=include_company_info,
+                                        downsample=downsample, interval=interval)
+
+@app.get("/api/indicators/{symbol}")
+async def get_indicators(symbol: str, indicators: str, period: str = "1y", max_points: Optional[int] = None,
+                         downsample: str = "lttb", interval: str = "1d"):
+    """
+    Compute indicators with request-chosen parameters
     
-    def optimize_portfolio(self, target_return=None, risk_free_rate=0.02):
-        """
-        Optimize portfolio using Markowitz theory
-        
-        Args:
-            target_return: Target return (if None, maximizes Sharpe ratio)
-            risk_free_rate: Risk-free rate
-            
-        Returns:
-            dict: Optimization results
-        """
-        # Constraints: weights sum to 1
-        constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-        
-        # Bounds: weights between 0 and 1 (no short selling)
-        bounds = tuple((0, 1) for _ in range(self.n_assets))
-        
-        # Initial guess: equal weights
-        initial_weights = np.array([1/self.n_assets] * self.n_assets)
-        
-        if target_return is not None:
-            # Minimize variance for given return
-            constraints = [
-                {'type': 'eq', 'fun': lambda x: np.sum(x) - 1},
-                {'type': 'eq', 'fun': lambda x: np.sum(x * self.expected_returns) - target_return}
-            ]
-            result = minimize(self.portfolio_variance, initial_weights, 
-                            method='SLSQP', bounds=bounds, constraints=constraints)
-        else:
-            # Maximize Sharpe ratio
-            result = minimize(self.negative_sharpe_ratio, initial_weights,
-                            method='SLSQP', bounds=bounds, constraints=constraints,
-                            args=(risk_free_rate,))
-        
-        if result.success:
-            optimal_weights = result.x
-            portfolio_return, portfolio_volatility = self.portfolio_performance(optimal_weights)
-            sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_volatility
-            
-            return {
-                'weights': optimal_weights,
-                'expected_return': portfolio_return,
-                'volatility': portfolio_volatility,
-                'sharpe_ratio': sharpe_ratio,
-                'success': True
-            }
-        else:
-            return {'success': False, 'message': result.message}
+    indicators is a comma-separated list of name:param:... specs, e.g.
+    sma:10,sma:200,rsi:7,macd:5:35:5,bollinger:20:2.5; omitted parameters
+    default to the dashboard windows. Results are memoized per data version.
+    max_points / downsample reduce the series and interval selects the bars
+    like /api/stock.
+    """
+    if symbol.upper() not in analyzer.supported_stocks:
+        raise HTTPException(status_code=400, detail=f"Stock {symbol} not supported")
     
-    def efficient_frontier(self, num_portfolios=100, risk_free_rate=0.02):
-        """
-        Generate efficient frontier
-        
-        Args:
-            num_portfolios: Number of portfolios to generate
-            risk_free_rate: Risk-free rate
-            
-        Returns:
-            dict: Efficient frontier data
-        """
-        # Get min and max returns
-        min_ret = self.expected_returns.min()
-        max_ret = self.expected_returns.max()
-        
-        # Generate target returns
-        target_returns = np.linspace(min_ret, max_ret, num_portfolios)
-        
-        # Calculate efficient frontier
-        efficient_portfolios = []
-        
-        for target_return in target_returns:
-            result = self.optimize_portfolio(target_return=target_return)
-            if result['success']:
-                efficient_portfolios.append({
-                    'return': result['expected_return'],
-                    'volatility': result['volatility'],
-                    'sharpe_ratio': result['sharpe_ratio'],
-                    'weights': result['weights']
-                })
-        
-        # Find optimal portfolio (max Sharpe ratio)
-        optimal_result = self.optimize_portfolio()
-        if optimal_result['success']:
-            optimal_portfolio = {
-                'return': optimal_result['expected_return'],
-                'volatility': optimal_result['volatility'],
-                'sharpe_ratio': optimal_result['sharpe_ratio'],
-                'weights': optimal_result['weights']
-            }
-        else:
-            optimal_portfolio = None
-        
-        return {
-            'efficient_frontier': efficient_portfolios,
-            'optimal_portfolio': optimal_portfolio,
-            'asset_names': self.asset_names
-        }
+    specs = analyzer.parse_indicator_specs(indicators)
+    downsample = analyzer.resolve_downsampling(max_points, downsample)
+    interval = analyzer.resolve_interval(interval)
+    return await analyzer.get_indicators(symbol.upper(), period, specs, downsample, interval)
 
+# Markowitz Portfolio Theory endpoints (the portfolio math lives in portfolio.py)
 @app.get("/api/markowitz/efficient-frontier")
-async def get_efficient_frontier(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", period: str = "1y"):
+async def get_efficient_frontier(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", period: str = "1y",
+                                 num_portfolios: int = 100, parallel: bool = False,
+                                 cov_method: str = "sample", factors: Optional[int] = None):
     """
     Generate efficient frontier for given stocks using Markowitz theory
     
     Args:
         symbols: Comma-separated stock symbols
         period: Time period for data
+        num_portfolios: Number of frontier points (at most FRONTIER_MAX_PORTFOLIOS, default 2000)
+        parallel: Solve the frontier points on the frontier process pool instead of in this process
+        cov_method: Covariance estimator: sample, ledoit_wolf or factor
+        factors: Number of factors of the factor estimator (default 5)
     
     Returns:
         dict: Efficient frontier data
     """
+    max_portfolios = int(os.getenv('FRONTIER_MAX_PORTFOLIOS', '2000'))
+    if not 2 <= num_portfolios <= max_portfolios:
+        raise HTTPException(status_code=400, detail=f"num_portfolios must be between 2 and {max_portfolios}")
+    cov_method, n_factors = analyzer.resolve_covariance(cov_method, factors)
+    
     try:
-        symbol_list = [s.strip().upper() for s in symbols.split(',')]
-        
-        # Get historical data for all stocks
-        returns_data = {}
-        
-        for symbol in symbol_list:
-            stock_data = analyzer.get_stock_data(symbol, period)
-            if stock_data and stock_data.get('close'):
-                prices = stock_data['close']
-                # Calculate daily returns
-                returns = pd.Series(prices).pct_change().dropna()
-                returns_data[symbol] = returns
-        
-        if not returns_data:
-            raise HTTPException(status_code=404, detail="No data found for any symbols")
-        
-        # Create DataFrame with aligned dates
-        returns_df = pd.DataFrame(returns_data)
-        returns_df = returns_df.dropna()  # Remove any rows with NaN
+        symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',')))
         
-        if len(returns_df) < 30:  # Need sufficient data
-            raise HTTPException(status_code=400, detail="Insufficient data for analysis")
+        # Date-aligned daily returns and their moments, shared with the other Markowitz endpoints
+        panel = await analyzer.get_returns_panel(symbol_list, period)
         
-        # Initialize Markowitz portfolio
-        markowitz = MarkowitzPortfolio(returns_df)
+        markowitz = panel.portfolio(cov_method, n_factors)
         
         # Generate efficient frontier
-        frontier_data = markowitz.efficient_frontier()
+        if parallel:
+            frontier_data = await markowitz.efficient_frontier_parallel(get_frontier_pool(), num_portfolios)
+        else:
+            # The SLSQP sweep is CPU-bound, so it runs off the event loop
+            frontier_data = await asyncio.to_thread(markowitz.efficient_frontier, num_portfolios)
         
         return {
             'symbols': symbol_list,
             'period': period,
-            'data_points': len(returns_df),
+            'data_points': len(panel.returns),
+            'cov_method': cov_method,
             'efficient_frontier': frontier_data['efficient_frontier'],
             'optimal_portfolio': frontier_data['optimal_portfolio'],
             'asset_names': frontier_data['asset_names']
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating efficient frontier: {str(e)}")
 
@@ -1059,7 +3917,9 @@ async def get_efficient_frontier(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", per
 async def optimize_portfolio(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", 
                            period: str = "1y", 
                            target_return: Optional[float] = None,
-                           risk_free_rate: float = 0.02):
+                           risk_free_rate: float = 0.02,
+                           cov_method: str = "sample",
+                           factors: Optional[int] = None):
     """
     Optimize portfolio using Markowitz theory
     
@@ -1068,45 +3928,28 @@ async def optimize_portfolio(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA",
         period: Time period for data
         target_return: Target return (if None, maximizes Sharpe ratio)
         risk_free_rate: Risk-free rate
+        cov_method: Covariance estimator: sample, ledoit_wolf or factor
+        factors: Number of factors of the factor estimator (default 5)
         
     Returns:
         dict: Optimization results
     """
+    cov_method, n_factors = analyzer.resolve_covariance(cov_method, factors)
+    
     try:
-        symbol_list = [s.strip().upper() for s in symbols.split(',')]
-        
-        # Get historical data for all stocks
-        returns_data = {}
-        
-        for symbol in symbol_list:
-            stock_data = analyzer.get_stock_data(symbol, period)
-            if stock_data and stock_data.get('close'):
-                prices = stock_data['close']
-                # Calculate daily returns
-                returns = pd.Series(prices).pct_change().dropna()
-                returns_data[symbol] = returns
-        
-        if not returns_data:
-            raise HTTPException(status_code=404, detail="No data found for any symbols")
+        symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',')))
         
-        # Create DataFrame with aligned dates
-        returns_df = pd.DataFrame(returns_data)
-        returns_df = returns_df.dropna()
+        # Date-aligned daily returns and their moments, shared with the other Markowitz endpoints
+        panel = await analyzer.get_returns_panel(symbol_list, period)
         
-        if len(returns_df) < 30:
-            raise HTTPException(status_code=400, detail="Insufficient data for analysis")
-        
-        # Initialize Markowitz portfolio
-        markowitz = MarkowitzPortfolio(returns_df)
+        markowitz = panel.portfolio(cov_method, n_factors)
         
-        # Optimize portfolio
-        result = markowitz.optimize_portfolio(target_return, risk_free_rate)
+        # Optimize portfolio, off the event loop since SLSQP is CPU-bound
+        result = await asyncio.to_thread(markowitz.optimize_portfolio, target_return, risk_free_rate)
         
         if result['success']:
             # Format weights with asset names
-            weights_dict = {}
-            for i, asset in enumerate(markowitz.asset_names):
-                weights_dict[asset] = float(result['weights'][i])
+            weights_dict = dict(zip(markowitz.asset_names, result['weights']))
             
             return {
                 'symbols': symbol_list,
@@ -1114,10 +3957,11 @@ async def optimize_portfolio(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA",
                 'optimization_type': 'target_return' if target_return else 'max_sharpe',
                 'target_return': target_return,
                 'risk_free_rate': risk_free_rate,
+                'cov_method': cov_method,
                 'weights': weights_dict,
-                'expected_return': float(result['expected_return']),
-                'volatility': float(result['volatility']),
-                'sharpe_ratio': float(result['sharpe_ratio']),
+                'expected_return': result['expected_return'],
+                'volatility': result['volatility'],
+                'sharpe_ratio': result['sharpe_ratio'],
                 'success': True
             }
         else:
@@ -1126,9 +3970,70 @@ async def optimize_portfolio(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA",
                 'message': result['message']
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error optimizing portfolio: {str(e)}")
 
+@app.get("/api/markowitz/random-portfolios")
+async def get_random_portfolios(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", period: str = "1y",
+                                num_portfolios: int = 10000, max_points: int = 5000, risk_free_rate: float = 0.02,
+                                concentration: float = 1.0, seed: Optional[int] = None,
+                                cov_method: str = "sample", factors: Optional[int] = None):
+    """
+    Random long-only portfolios showing the feasible set around the efficient frontier
+    
+    Args:
+        symbols: Comma-separated stock symbols
+        period: Time period for data
+        num_portfolios: Number of portfolios to draw (at most RANDOM_PORTFOLIOS_MAX, default 250000)
+        max_points: Most portfolios returned, thinned on a volatility x return grid
+            (at most RANDOM_PORTFOLIOS_MAX_POINTS, default 10000)
+        risk_free_rate: Risk-free rate
+        concentration: Dirichlet concentration of the weights (1 = uniform)
+        seed: Random seed, for a reproducible cloud
+        cov_method: Covariance estimator: sample, ledoit_wolf or factor
+        factors: Number of factors of the factor estimator (default 5)
+    
+    Returns:
+        dict: Return, volatility and Sharpe ratio of the returned portfolios, and the best draws
+    """
+    max_portfolios = int(os.getenv('RANDOM_PORTFOLIOS_MAX', '250000'))
+    if not 1 <= num_portfolios <= max_portfolios:
+        raise HTTPException(status_code=400, detail=f"num_portfolios must be between 1 and {max_portfolios}")
+    max_points_limit = int(os.getenv('RANDOM_PORTFOLIOS_MAX_POINTS', '10000'))
+    if not 1 <= max_points <= max_points_limit:
+        raise HTTPException(status_code=400, detail=f"max_points must be between 1 and {max_points_limit}")
+    if not concentration > 0:
+        raise HTTPException(status_code=400, detail="concentration must be positive")
+    cov_method, n_factors = analyzer.resolve_covariance(cov_method, factors)
+    
+    try:
+        symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',')))
+        
+        # Date-aligned daily returns and their moments, shared with the other Markowitz endpoints
+        panel = await analyzer.get_returns_panel(symbol_list, period)
+        
+        markowitz = panel.portfolio(cov_method, n_factors)
+        # Sampling and scoring are CPU-bound, so they run off the event loop
+        cloud = await asyncio.to_thread(markowitz.random_portfolios, num_portfolios, risk_free_rate,
+                                        concentration, seed, max_points)
+        
+        return {
+            'symbols': symbol_list,
+            'period': period,
+            'data_points': len(panel.returns),
+            'cov_method': cov_method,
+            'num_portfolios': num_portfolios,
+            'points': len(cloud['returns']),
+            **cloud
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating random portfolios: {str(e)}")
+
 @app.get("/api/markowitz/correlation-matrix")
 async def get_correlation_matrix(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", period: str = "1y"):
     """
@@ -1142,39 +4047,22 @@ async def get_correlation_matrix(symbols: str = "AAPL,GOOGL,MSFT,AMZN,TSLA", per
         dict: Correlation matrix data
     """
     try:
-        symbol_list = [s.strip().upper() for s in symbols.split(',')]
+        symbol_list = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',')))
         
-        # Get historical data for all stocks
-        returns_data = {}
+        # Date-aligned daily returns and their moments, shared with the other Markowitz endpoints
+        panel = await analyzer.get_returns_panel(symbol_list, period)
         
-        for symbol in symbol_list:
-            stock_data = analyzer.get_stock_data(symbol, period)
-            if stock_data and stock_data.get('close'):
-                prices = stock_data['close']
-                # Calculate daily returns
-                returns = pd.Series(prices).pct_change().dropna()
-                returns_data[symbol] = returns
-        
-        if not returns_data:
-            raise HTTPException(status_code=404, detail="No data found for any symbols")
-        
-        # Create DataFrame with aligned dates
-        returns_df = pd.DataFrame(returns_data)
-        returns_df = returns_df.dropna()
-        
-        if len(returns_df) < 30:
-            raise HTTPException(status_code=400, detail="Insufficient data for analysis")
-        
-        # Calculate correlation matrix
-        correlation_matrix = returns_df.corr()
+        correlation_matrix = panel.correlation_matrix
         
         return {
             'symbols': symbol_list,
             'period': period,
             'correlation_matrix': correlation_matrix.to_dict(),
-            'data_points': len(returns_df)
+            'data_points': len(panel.returns)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating correlation matrix: {str(e)}")
 
@@ -1367,7 +4255,7 @@ async def train_hmm_model(symbols: str, period: str = "1y"):
         
         # Get historical data for the first symbol (primary stock)
         primary_symbol = symbol_list[0]
-        stock_data = analyzer.get_stock_data(primary_symbol, period)
+        stock_data = await analyzer.get_stock_data(primary_symbol, period, include_company_info=False)
         
         if not stock_data or not stock_data.get('close'):
             raise HTTPException(status_code=404, detail=f"No data found for {primary_symbol}")
@@ -1392,8 +4280,8 @@ async def train_hmm_model(symbols: str, period: str = "1y"):
             'primary_symbol': primary_symbol,
             'period': period,
             'model_parameters': training_results,
-            'state_probabilities': {str(k): float(v) for k, v in state_probabilities.items()},  # Convert to float for JSON serialization
-            'data_points': int(len(returns))  # Convert to int for JSON serialization
+            'state_probabilities': {str(k): v for k, v in state_probabilities.items()},
+            'data_points': len(returns)
         }
         
     except Exception as e:
@@ -1417,7 +4305,7 @@ async def predict_with_hmm(symbols: str, period: str = "1y", n_days: int = 30):
             # Auto-train the model if not trained
             symbol_list = [s.strip().upper() for s in symbols.split(',')]
             primary_symbol = symbol_list[0]
-            stock_data = analyzer.get_stock_data(primary_symbol, period)
+            stock_data = await analyzer.get_stock_data(primary_symbol, period, include_company_info=False)
             
             if not stock_data or not stock_data.get('close'):
                 raise HTTPException(status_code=404, detail=f"No data found for {primary_symbol}")
@@ -1436,7 +4324,7 @@ async def predict_with_hmm(symbols: str, period: str = "1y", n_days: int = 30):
         
         # Get historical data for the first symbol
         primary_symbol = symbol_list[0]
-        stock_data = analyzer.get_stock_data(primary_symbol, period)
+        stock_data = await analyzer.get_stock_data(primary_symbol, period, include_company_info=False)
         
         if not stock_data or not stock_data.get('close'):
             raise HTTPException(status_code=404, detail=f"No data found for {primary_symbol}")
@@ -1478,9 +4366,9 @@ async def predict_with_hmm(symbols: str, period: str = "1y", n_days: int = 30):
             'symbols': symbol_list,
             'primary_symbol': primary_symbol,
             'period': period,
-            'predictions': {primary_symbol: [float(price) for price in price_predictions]},  # Convert to float for JSON serialization
+            'predictions': {primary_symbol: price_predictions},
             'dates': prediction_dates_str,
-            'n_days': int(n_days)  # Convert to int for JSON serialization
+            'n_days': n_days
         }
         
     except Exception as e:
@@ -1507,7 +4395,7 @@ async def get_hmm_state_transitions(symbols: str, period: str = "1y"):
             # Auto-train the model if not trained
             symbol_list = [s.strip().upper() for s in symbols.split(',')]
             primary_symbol = symbol_list[0]
-            stock_data = analyzer.get_stock_data(primary_symbol, period)
+            stock_data = await analyzer.get_stock_data(primary_symbol, period, include_company_info=False)
             
             if not stock_data or not stock_data.get('close'):
                 raise HTTPException(status_code=404, detail=f"No data found for {primary_symbol}")
@@ -1526,7 +4414,7 @@ async def get_hmm_state_transitions(symbols: str, period: str = "1y"):
         
         # Get historical data for the first symbol
         primary_symbol = symbol_list[0]
-        stock_data = analyzer.get_stock_data(primary_symbol, period)
+        stock_data = await analyzer.get_stock_data(primary_symbol, period, include_company_info=False)
         
         if not stock_data or not stock_data.get('close'):
             raise HTTPException(status_code=404, detail=f"No data found for {primary_symbol}")
@@ -1536,23 +4424,16 @@ async def get_hmm_state_transitions(symbols: str, period: str = "1y"):
         returns = pd.Series(prices).pct_change().dropna().values
         states = hmm_model.predict_states(returns)
         
-        # Get transition matrix
-        transition_matrix = hmm_model.transition_matrix.tolist()
-        
-        # Get state means and covariances
-        state_means = hmm_model.means.tolist()
-        state_covars = hmm_model.covars.tolist()
-        
         return {
             'symbols': symbol_list,
             'primary_symbol': primary_symbol,
             'period': period,
-            'transition_matrix': transition_matrix,
+            'transition_matrix': hmm_model.transition_matrix,
             'states': [f"State {i}" for i in range(hmm_model.n_states)],
-            'state_means': state_means,
-            'state_covars': state_covars,
-            'predicted_states': [int(state) for state in states[-50:]],  # Convert to int for JSON serialization
-            'data_points': int(len(returns))  # Convert to int for JSON serialization
+            'state_means': hmm_model.means,
+            'state_covars': hmm_model.covars,
+            'predicted_states': states[-50:],
+            'data_points': len(returns)
         }
         
     except Exception as e:
@@ -0,0 +1,564 @@
+"""
+Markowitz portfolio math and the process pool that solves efficient frontiers
+
+Kept apart from main.py and free of import-time side effects: frontier
+workers are fresh spawned interpreters that import this module to run
+solve_frontier_shard, and must not build the web app's state (analyzer,
+upstream clients, bar store) to do so.
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+
+class FactorCovariance:
+    """
+    Covariance matrix of a factor model, loadings @ loadings.T + diag(specific)
+
+    The n x n matrix is never formed: products with weight vectors cost
+    O(n * k) for k factors, so risk math on large universes needs memory for
+    the loadings only. `cov @ w`, `w @ cov` and `w @ cov @ w` work as they do
+    with a dense array.
+    """
+
+    # Make ndarray operators defer to __rmatmul__ instead of converting this object
+    __array_ufunc__ = None
+
+    def __init__(self, loadings: np.ndarray, specific: np.ndarray):
+        """
+        Args:
+            loadings: n_assets x n_factors exposures, scaled by the factor volatilities
+            specific: Idiosyncratic variance of each asset
+        """
+        self.loadings = loadings
+        self.specific = specific
+
+    @property
+    def shape(self) -> tuple:
+        n = len(self.specific)
+        return n, n
+
+    @property
+    def n_factors(self) -> int:
+        return self.loadings.shape[1]
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        other = np.asarray(other, dtype=np.float64)
+        specific = self.specific if other.ndim == 1 else self.specific[:, None]
+        return self.loadings @ (self.loadings.T @ other) + specific * other
+
+    def __rmatmul__(self, other: np.ndarray) -> np.ndarray:
+        # Symmetric, so other @ cov is (cov @ other.T).T
+        other = np.asarray(other, dtype=np.float64)
+        return (self @ other.T).T
+
+    def diagonal(self) -> np.ndarray:
+        """Variance of each asset"""
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific
+
+    def to_dense(self) -> np.ndarray:
+        """The full n x n matrix, for small universes and reporting"""
+        cov = self.loadings @ self.loadings.T
+        cov[np.diag_indices_from(cov)] += self.specific
+        return cov
+
+class CovarianceEstimator:
+    """
+    Annualized covariance estimates from a T x n matrix of daily returns
+
+    - sample: the plain sample covariance. Singular once assets outnumber
+      observations, and badly conditioned well before that.
+    - ledoit_wolf: the sample covariance shrunk towards a scaled identity
+      with the Ledoit-Wolf (2004) optimal intensity. Always positive
+      definite; computed in O(T * n * min(T, n)) besides the n x n result.
+    - factor: the first k principal components of the returns plus a
+      diagonal of residual variances, as a FactorCovariance. Computed from a
+      thin SVD of the returns, so no n x n matrix is formed.
+    """
+
+    METHODS = ('sample', 'ledoit_wolf', 'factor')
+    DEFAULT_FACTORS = 5
+
+    @staticmethod
+    def sample(returns: np.ndarray) -> np.ndarray:
+        return np.cov(returns, rowvar=False, ddof=1).reshape(returns.shape[1], returns.shape[1])
+
+    @staticmethod
+    def ledoit_wolf_shrinkage(returns: np.ndarray) -> float:
+        """Optimal weight of the scaled identity target"""
+        t, n = returns.shape
+        x = returns - returns.mean(axis=0)
+        x2 = x ** 2
+        variances = x2.sum(axis=0) / t
+        mu = variances.sum() / n
+        # sum((x.T @ x) ** 2) through whichever Gram matrix is smaller
+        gram = x @ x.T if t < n else x.T @ x
+        delta_sum = np.sum(gram ** 2) / t ** 2
+        # sum(x2.T @ x2) without forming it
+        beta_sum = np.sum(x2.sum(axis=1) ** 2)
+        beta = (beta_sum / t - delta_sum) / (n * t)
+        delta = (delta_sum - 2 * mu * variances.sum() + n * mu ** 2) / n
+        if delta <= 0:
+            return 0.0
+        return float(min(beta, delta) / delta)
+
+    @staticmethod
+    def ledoit_wolf(returns: np.ndarray) -> np.ndarray:
+        cov = CovarianceEstimator.sample(returns)
+        shrinkage = CovarianceEstimator.ledoit_wolf_shrinkage(returns)
+        target = np.trace(cov) / len(cov)
+        cov *= 1 - shrinkage
+        cov[np.diag_indices_from(cov)] += shrinkage * target
+        return cov
+
+    @staticmethod
+    def factor(returns: np.ndarray, n_factors: int = DEFAULT_FACTORS) -> FactorCovariance:
+        t, n = returns.shape
+        x = returns - returns.mean(axis=0)
+        n_factors = max(1, min(n_factors, t - 1, n))
+        _, singular_values, components = np.linalg.svd(x, full_matrices=False)
+        loadings = components[:n_factors].T * (singular_values[:n_factors] / np.sqrt(t - 1))
+        variances = np.einsum('ij,ij->j', x, x) / (t - 1)
+        specific = variances - np.einsum('ij,ij->i', loadings, loadings)
+        # Keep every asset's residual risk strictly positive so the model stays positive definite
+        specific = np.maximum(specific, 1e-6 * variances.mean())
+        return FactorCovariance(loadings, specific)
+
+    @classmethod
+    def estimate(cls, returns: np.ndarray, method: str = 'sample', n_factors: Optional[int] = None,
+                 periods_per_year: int = 252):
+        """
+        Annualized covariance of daily returns
+
+        Returns:
+            n x n ndarray, or FactorCovariance for method 'factor'
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        if method == 'ledoit_wolf':
+            cov = cls.ledoit_wolf(returns)
+        elif method == 'factor':
+            cov = cls.factor(returns, n_factors or cls.DEFAULT_FACTORS)
+            return FactorCovariance(cov.loadings * np.sqrt(periods_per_year), cov.specific * periods_per_year)
+        else:
+            cov = cls.sample(returns)
+        return cov * periods_per_year
+
+class MarkowitzPortfolio:
+    def __init__(self, returns_data, cov_method: str = 'sample', n_factors: Optional[int] = None):
+        """
+        Initialize Markowitz Portfolio Theory calculations
+        
+        Args:
+            returns_data: DataFrame with stock returns (columns = stocks, rows = time periods)
+            cov_method: Covariance estimator (see CovarianceEstimator)
+            n_factors: Number of factors of the 'factor' estimator
+        """
+        self.returns = returns_data
+        self.n_assets = len(returns_data.columns)
+        self.asset_names = returns_data.columns.tolist()
+        
+        # Calculate expected returns and covariance matrix
+        self.expected_returns = returns_data.mean() * 252  # Annualized
+        cov = CovarianceEstimator.estimate(returns_data.to_numpy(), cov_method, n_factors)  # Annualized
+        
+        # Plain arrays (or a FactorCovariance) for the optimizer's objective and gradient evaluations
+        self.mu = self.expected_returns.to_numpy(dtype=np.float64)
+        self.cov = cov
+        self.cov_matrix = self._covariance_frame(cov, self.asset_names)
+    
+    @classmethod
+    def from_moments(cls, expected_returns: np.ndarray, cov_matrix,
+                     asset_names: Optional[list] = None) -> 'MarkowitzPortfolio':
+        """
+        Portfolio from annualized expected returns and covariance matrix, without a returns history
+        
+        The arrays are used as they are (not copied), so they can be views
+        of shared memory. cov_matrix may be a FactorCovariance.
+        """
+        portfolio = cls.__new__(cls)
+        portfolio.returns = None
+        portfolio.n_assets = len(expected_returns)
+        portfolio.asset_names = asset_names or [f"asset_{i}" for i in range(portfolio.n_assets)]
+        portfolio.mu = expected_returns
+        portfolio.cov = cov_matrix
+        portfolio.expected_returns = pd.Series(expected_returns, index=portfolio.asset_names, copy=False)
+        portfolio.cov_matrix = cls._covariance_frame(cov_matrix, portfolio.asset_names)
+        return portfolio
+    
+    @staticmethod
+    def _covariance_frame(cov, asset_names: list):
+        """Labelled covariance matrix; a FactorCovariance is kept as it is rather than expanded"""
+        if isinstance(cov, FactorCovariance):
+            return cov
+        return pd.DataFrame(cov, index=asset_names, columns=asset_names, copy=False)
+        
+    def portfolio_performance(self, weights):
+        """
+        Calculate portfolio expected return and volatility
+        
+        Args:
+            weights: Portfolio weights (must sum to 1)
+            
+        Returns:
+            tuple: (expected_return, volatility)
+        """
+        portfolio_return = float(self.mu @ weights)
+        portfolio_volatility = float(np.sqrt(weights @ self.cov @ weights))
+        return portfolio_return, portfolio_volatility
+    
+    def negative_sharpe_ratio(self, weights, risk_free_rate=0.02):
+        """
+        Calculate negative Sharpe ratio for optimization
+        
+        Args:
+            weights: Portfolio weights
+            risk_free_rate: Risk-free rate (default 2%)
+            
+        Returns:
+            float: Negative Sharpe ratio
+        """
+        portfolio_return, portfolio_volatility = self.portfolio_performance(weights)
+        sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_volatility
+        return -sharpe_ratio
+    
+    def negative_sharpe_ratio_gradient(self, weights, risk_free_rate=0.02):
+        """
+        Analytic gradient of negative_sharpe_ratio
+        
+        With r = mu.w - rf and s = sqrt(w'Cw): d(-r/s)/dw = -mu/s + r * Cw / s^3
+        """
+        cov_weights = self.cov @ weights
+        volatility = np.sqrt(weights @ cov_weights)
+        excess_return = self.mu @ weights - risk_free_rate
+        return -self.mu / volatility + excess_return * cov_weights / volatility ** 3
+    
+    def portfolio_variance(self, weights):
+        """
+        Calculate portfolio variance
+        
+        Args:
+            weights: Portfolio weights
+            
+        Returns:
+            float: Portfolio variance
+        """
+        return weights @ self.cov @ weights
+    
+    def portfolio_variance_gradient(self, weights):
+        """Analytic gradient of portfolio_variance: 2Cw"""
+        return 2.0 * (self.cov @ weights)
+    
+    def optimize_portfolio(self, target_return=None, risk_free_rate=0.02, initial_weights=None):
+        """
+        Optimize portfolio using Markowitz theory
+        
+        Objectives and constraints come with analytic gradients, so SLSQP
+        needs one function and one gradient evaluation per iteration instead
+        of n_assets + 1 finite-difference evaluations.
+        
+        Args:
+            target_return: Target return (if None, maximizes Sharpe ratio)
+            risk_free_rate: Risk-free rate
+            initial_weights: Starting point, e.g. a neighbouring solution (default: equal weights)
+            
+        Returns:
+            dict: Optimization results
+        """
+        ones = np.ones(self.n_assets)
+        
+        # Constraints: weights sum to 1
+        constraints = [{'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: ones}]
+        
+        # Bounds: weights between 0 and 1 (no short selling)
+        bounds = tuple((0, 1) for _ in range(self.n_assets))
+        
+        # Initial guess: equal weights
+        if initial_weights is None:
+            initial_weights = ones / self.n_assets
+        
+        if target_return is not None:
+            # Minimize variance for given return
+            constraints.append({'type': 'eq', 'fun': lambda x: self.mu @ x - target_return,
+                                'jac': lambda x: self.mu})
+            result = minimize(self.portfolio_variance, initial_weights, jac=self.portfolio_variance_gradient,
+                              method='SLSQP', bounds=bounds, constraints=constraints)
+        else:
+            # Maximize Sharpe ratio
+            result = minimize(self.negative_sharpe_ratio, initial_weights, jac=self.negative_sharpe_ratio_gradient,
+                              method='SLSQP', bounds=bounds, constraints=constraints,
+                              args=(risk_free_rate,))
+        
+        if result.success:
+            optimal_weights = result.x
+            portfolio_return, portfolio_volatility = self.portfolio_performance(optimal_weights)
+            sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_volatility
+            
+            return {
+                'weights': optimal_weights,
+                'expected_return': portfolio_return,
+                'volatility': portfolio_volatility,
+                'sharpe_ratio': sharpe_ratio,
+                'success': True
+            }
+        else:
+            return {'success': False, 'message': result.message}
+    
+    def efficient_frontier(self, num_portfolios=100, risk_free_rate=0.02):
+        """
+        Generate efficient frontier
+        
+        Target returns are solved in increasing order, each one starting from
+        the previous solution, which is already close since the optimal
+        weights move continuously along the frontier. The max-Sharpe search
+        starts from the frontier portfolio with the best Sharpe ratio.
+        
+        Args:
+            num_portfolios: Number of portfolios to generate
+            risk_free_rate: Risk-free rate
+            
+        Returns:
+            dict: Efficient frontier data
+        """
+        # Calculate efficient frontier
+        efficient_portfolios = self.frontier_segment(self.target_returns(num_portfolios), risk_free_rate)
+        return self._frontier_result(efficient_portfolios, risk_free_rate)
+    
+    def target_returns(self, num_portfolios: int) -> np.ndarray:
+        """Evenly spaced frontier targets from the lowest to the highest expected asset return"""
+        return np.linspace(self.mu.min(), self.mu.max(), num_portfolios)
+    
+    def frontier_segment(self, target_returns: np.ndarray, risk_free_rate: float = 0.02) -> list:
+        """Minimum-variance portfolios for increasing target returns, each warm-started from the previous one"""
+        efficient_portfolios = []
+        
+        warm_start = None
+        for target_return in target_returns:
+            result = self.optimize_portfolio(target_return=target_return, risk_free_rate=risk_free_rate,
+                                             initial_weights=warm_start)
+            if result['success']:
+                warm_start = result['weights']
+                efficient_portfolios.append({
+                    'return': result['expected_return'],
+                    'volatility': result['volatility'],
+                    'sharpe_ratio': result['sharpe_ratio'],
+                    'weights': result['weights']
+                })
+        return efficient_portfolios
+    
+    async def efficient_frontier_parallel(self, pool: ProcessPoolExecutor, num_portfolios: int = 100,
+                                          risk_free_rate: float = 0.02, shards: Optional[int] = None) -> dict:
+        """
+        Generate the efficient frontier with its target returns sharded across a process pool
+        
+        The expected returns and covariance matrix are written once to a
+        shared memory block that every task maps, so only the block name and
+        each shard's targets are sent to the workers. A FactorCovariance is
+        shared as its specific variances and loadings. Shards are contiguous
+        runs of targets, so warm starts still apply within each shard.
+        
+        Args:
+            pool: Process pool to run the shards on (see get_frontier_pool)
+            num_portfolios: Number of portfolios to generate
+            risk_free_rate: Risk-free rate
+            shards: Number of tasks (default: one per pool worker)
+            
+        Returns:
+            dict: Efficient frontier data, like efficient_frontier
+        """
+        target_returns = self.target_returns(num_portfolios)
+        shards = max(1, min(shards or frontier_workers(), len(target_returns)))
+        
+        n = self.n_assets
+        n_factors = self.cov.n_factors if isinstance(self.cov, FactorCovariance) else 0
+        rows = 1 + (1 + n_factors if n_factors else n)
+        block = shared_memory.SharedMemory(create=True, size=rows * n * 8)
+        try:
+            moments = np.ndarray((rows, n), dtype=np.float64, buffer=block.buf)
+            moments[0] = self.mu
+            if n_factors:
+                moments[1] = self.cov.specific
+                moments[2:] = self.cov.loadings.T
+            else:
+                moments[1:] = self.cov
+            del moments
+            
+            loop = asyncio.get_running_loop()
+            segments = await asyncio.gather(*(
+                loop.run_in_executor(pool, solve_frontier_shard, block.name, n, targets, risk_free_rate, n_factors)
+                for targets in np.array_split(target_returns, shards)
+            ))
+        finally:
+            block.close()
+            block.unlink()
+        
+        efficient_portfolios = [portfolio for segment in segments for portfolio in segment]
+        return self._frontier_result(efficient_portfolios, risk_free_rate)
+    
+    def random_portfolios(self, num_portfolios: int = 10000, risk_free_rate: float = 0.02,
+                          concentration: float = 1.0, seed: Optional[int] = None,
+                          max_points: Optional[int] = None, chunk_elements: int = 1 << 20) -> dict:
+        """
+        Long-only random portfolios, the feasible-set cloud around the efficient frontier
+        
+        Weights are drawn from a symmetric Dirichlet distribution (normalized
+        gamma variates) and scored a chunk at a time with matrix products,
+        so at most about chunk_elements weights are held at once however many
+        portfolios are drawn. Only each portfolio's statistics are kept, plus
+        the weights of the best-Sharpe and lowest-volatility draws. With
+        max_points, the cloud is thinned to the best-Sharpe draw of each cell
+        of a volatility x return grid, which keeps its outline for a chart.
+        
+        Args:
+            num_portfolios: Number of portfolios to draw
+            risk_free_rate: Risk-free rate
+            concentration: Dirichlet concentration; 1 is uniform over all weights,
+                smaller values favour concentrated portfolios, larger ones diversified
+            seed: Random seed, for a reproducible cloud
+            max_points: Most portfolios returned (all draws when None)
+            chunk_elements: Weights held per chunk
+            
+        Returns:
+            dict: returns, volatilities and sharpe_ratios arrays, and the
+            max_sharpe and min_volatility portfolios among the draws
+        """
+        rng = np.random.default_rng(seed)
+        chunk_size = max(1, chunk_elements // self.n_assets)
+        returns = np.empty(num_portfolios)
+        volatilities = np.empty(num_portfolios)
+        sharpe_ratios = np.empty(num_portfolios)
+        max_sharpe = min_volatility = None
+        
+        for start in range(0, num_portfolios, chunk_size):
+            stop = min(start + chunk_size, num_portfolios)
+            weights = rng.standard_gamma(concentration, (stop - start, self.n_assets))
+            weights /= weights.sum(axis=1, keepdims=True)
+            
+            chunk_returns = returns[start:stop]
+            chunk_volatilities = volatilities[start:stop]
+            chunk_sharpe = sharpe_ratios[start:stop]
+            np.matmul(weights, self.mu, out=chunk_returns)
+            chunk_volatilities[:] = np.sqrt(np.einsum('ij,ij->i', weights @ self.cov, weights))
+            np.divide(chunk_returns - risk_free_rate, chunk_volatilities, out=chunk_sharpe)
+            
+            best = int(np.argmax(chunk_sharpe))
+            if max_sharpe is None or chunk_sharpe[best] > sharpe_ratios[max_sharpe[0]]:
+                max_sharpe = (start + best, weights[best].copy())
+            lowest = int(np.argmin(chunk_volatilities))
+            if min_volatility is None or chunk_volatilities[lowest] < volatilities[min_volatility[0]]:
+                min_volatility = (start + lowest, weights[lowest].copy())
+        
+        def summary(draw):
+            if draw is None:
+                return None
+            index, weights = draw
+            return {
+                'return': returns[index],
+                'volatility': volatilities[index],
+                'sharpe_ratio': sharpe_ratios[index],
+                'weights': weights
+            }
+        
+        result = {
+            'max_sharpe': summary(max_sharpe),
+            'min_volatility': summary(min_volatility),
+            'asset_names': self.asset_names
+        }
+        if max_points is not None and num_portfolios > max_points:
+            keep = self.thin_cloud(returns, volatilities, sharpe_ratios, max_points)
+            returns, volatilities, sharpe_ratios = returns[keep], volatilities[keep], sharpe_ratios[keep]
+        return {'returns': returns, 'volatilities': volatilities, 'sharpe_ratios': sharpe_ratios, **result}
+    
+    @staticmethod
+    def thin_cloud(returns: np.ndarray, volatilities: np.ndarray, sharpe_ratios: np.ndarray,
+                   max_points: int) -> np.ndarray:
+        """Indices of the best-Sharpe portfolio in each occupied cell of a grid of at most max_points cells"""
+        cells_per_axis = max(1, math.isqrt(max_points))
+        
+        def cell(values):
+            low, high = values.min(), values.max()
+            scaled = (values - low) / (high - low) * cells_per_axis if high > low else np.zeros_like(values)
+            return np.minimum(scaled.astype(np.int64), cells_per_axis - 1)
+        
+        cells = cell(volatilities) * cells_per_axis + cell(returns)
+        order = np.lexsort((-sharpe_ratios, cells))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = cells[order][1:] != cells[order][:-1]
+        return np.sort(order[first])
+    
+    def _frontier_result(self, efficient_portfolios: list, risk_free_rate: float) -> dict:
+        """Frontier response: the given portfolios plus the max-Sharpe portfolio"""
+        # Find optimal portfolio (max Sharpe ratio)
+        best = max(efficient_portfolios, key=lambda portfolio: portfolio['sharpe_ratio'], default=None)
+        optimal_result = self.optimize_portfolio(risk_free_rate=risk_free_rate,
+                                                 initial_weights=best['weights'] if best else None)
+        if optimal_result['success']:
+            optimal_portfolio = {
+                'return': optimal_result['expected_return'],
+                'volatility': optimal_result['volatility'],
+                'sharpe_ratio': optimal_result['sharpe_ratio'],
+                'weights': optimal_result['weights']
+            }
+        else:
+            optimal_portfolio = None
+        
+        return {
+            'efficient_frontier': efficient_portfolios,
+            'optimal_portfolio': optimal_portfolio,
+            'asset_names': self.asset_names
+        }
+
+# Process pool for parallel efficient frontiers, created on first use and reused across requests
+_frontier_pool: Optional[ProcessPoolExecutor] = None
+
+def frontier_workers() -> int:
+    """Number of frontier worker processes (FRONTIER_WORKERS, default one per CPU)"""
+    return max(1, int(os.getenv('FRONTIER_WORKERS', str(os.cpu_count() or 1))))
+
+def get_frontier_pool() -> ProcessPoolExecutor:
+    """Return the process pool that solves frontier shards, creating it on first use"""
+    global _frontier_pool
+    if _frontier_pool is None:
+        # Fresh interpreters rather than forks of a process running an event loop and client threads
+        _frontier_pool = ProcessPoolExecutor(max_workers=frontier_workers(),
+                                             mp_context=multiprocessing.get_context('spawn'))
+    return _frontier_pool
+
+def shutdown_frontier_pool():
+    """Stop the frontier worker processes, if they were started"""
+    global _frontier_pool
+    if _frontier_pool is not None:
+        _frontier_pool.shutdown(wait=False, cancel_futures=True)
+        _frontier_pool = None
+
+def solve_frontier_shard(block_name: str, n_assets: int, target_returns: np.ndarray, risk_free_rate: float,
+                         n_factors: int = 0) -> list:
+    """
+    Process pool task: frontier portfolios for a run of target returns
+    
+    Reads the expected returns (first row) and covariance matrix (remaining
+    rows) in place from the shared memory block written by
+    MarkowitzPortfolio.efficient_frontier_parallel. With n_factors, the
+    remaining rows are the specific variances followed by the transposed
+    loadings of a FactorCovariance.
+    """
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        rows = 1 + (1 + n_factors if n_factors else n_assets)
+        moments = np.ndarray((rows, n_assets), dtype=np.float64, buffer=block.buf)
+        cov = FactorCovariance(moments[2:].T, moments[1]) if n_factors else moments[1:]
+        portfolio = MarkowitzPortfolio.from_moments(moments[0], cov)
+        segment = portfolio.frontier_segment(target_returns, risk_free_rate)
+        # Release every view of the block before unmapping it
+        del portfolio, cov, moments
+        return segment
+    finally:
+        block.close()